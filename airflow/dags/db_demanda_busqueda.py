@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_busqueda.py
+"""DAG manual de búsqueda paralela de hiperparámetros del LSTM (sólo CPU)."""
+
+import logging
+import os
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.db_operations_prediction import insert_search_trials
+    from scripts.training.dataset_store import materialize_snapshot
+    from scripts.training.search import run_search
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def insert_search_trials(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def materialize_snapshot(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def run_search(*args, **kwargs): raise NotImplementedError("Script no importado")
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+# Mismo almacén que `entrenamiento_demanda_lstm`: si los datos no cambiaron, reutiliza su snapshot
+DATASET_STORE_PATH = os.environ.get("TRAINING_STORE_PATH", "/tmp/training_store")
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 0, # Un re-intento repetiría toda la búsqueda
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="busqueda_hiperparametros_lstm",
+    schedule=None, # Sólo manual
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    max_active_runs=1,
+    default_args=default_args,
+    tags=["energia", "entrenamiento", "manual", "lstm", "busqueda"],
+    params={
+        "n_trials": Param(12, type="integer", minimum=1),
+        "max_epochs": Param(20, type="integer", minimum=1),
+        "threads_per_worker": Param(2, type="integer", minimum=1, description="Hilos de TensorFlow por proceso."),
+        "seed": Param(0, type="integer"),
+    },
+    doc_md="""### DAG Búsqueda de Hiperparámetros
+    1. Materializa (o reutiliza) el snapshot memmap del histórico escalado.
+    2. Reparte ensayos (unidades LSTM, tasa de aprendizaje, tamaño de lote,
+       `STEP_WINDOW`) en un pool de `núcleos // threads_per_worker` procesos
+       que comparten el snapshot. Los ensayos peores que la mediana de los
+       demás en la misma época se podan.
+    3. Registra todos los ensayos en `demanda_busqueda_hiperparametros` y
+       devuelve la mejor configuración (no entrena ni publica el modelo final).
+    """,
+)
+def busqueda_hiperparametros_dag():
+    """Define el DAG y su única tarea."""
+
+    @task
+    def search_and_record(params: dict | None = None) -> dict:
+        """Ejecuta la búsqueda y guarda la tabla de resultados."""
+        params = params or {}
+        snapshot = materialize_snapshot(POSTGRES_CONN_ID, DATASET_STORE_PATH)
+        search = run_search(
+            snapshot,
+            n_trials=params.get("n_trials", 12),
+            max_epochs=params.get("max_epochs", 20),
+            threads_per_worker=params.get("threads_per_worker", 2),
+            seed=params.get("seed", 0),
+        )
+        insert_search_trials(search, POSTGRES_CONN_ID)
+        logging.info(f"Búsqueda {search['search_id']}: mejor configuración {search['best']}")
+        return {"search_id": search["search_id"], "best": search["best"]}
+
+    search_and_record()
+
+# Registrar el DAG
+busqueda_hiperparametros_dag()
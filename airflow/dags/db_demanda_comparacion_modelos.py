@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_comparacion_modelos.py
+"""DAG para puntuar varias versiones de modelo (campeón y retadores) con una sola entrada."""
+
+import logging
+import os
+from datetime import timedelta
+
+import numpy as np
+import pendulum
+from airflow.decorators import dag, task
+from airflow.models import Variable
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import download_artifacts, version_prefix
+    from scripts.db_operations_prediction import (fetch_history_array,
+                                                  fetch_prediction_window,
+                                                  insert_model_scores)
+    from scripts.forecast_engines import BASELINE_ENGINES, build_baseline_engine
+    from scripts.prediction_utils import (create_prediction_output,
+                                          load_forecast_pipeline)
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def version_prefix(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_history_array(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_prediction_window(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def build_baseline_engine(*args, **kwargs): raise NotImplementedError("Script no importado")
+    BASELINE_ENGINES = {}
+    def insert_model_scores(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def create_prediction_output(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_forecast_pipeline(*args, **kwargs): raise NotImplementedError("Script no importado")
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+CHAMPION_VERSION = "lstm_v1" # Artefactos en la raíz del bucket
+# Variable de Airflow (lista JSON) con las versiones a puntuar, p. ej. ["lstm_v1", "lstm_v2"].
+# Puede incluir motores base ("seasonal_naive", "hour_of_week", "gbm_lags") como referencia.
+MODEL_VERSIONS_VARIABLE = "prediccion_model_versions"
+WINDOW_SIZE = 336
+LOCAL_ARTIFACT_PATH = "/tmp/pred_artifacts_modelos" # Dir temporal en worker
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="prediccion_demanda_multi_modelo",
+    schedule="30 3 * * 0", # Domingos 3:30 AM, después de la predicción productiva
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    default_args=default_args,
+    tags=["energia", "prediccion", "semanal", "lstm", "comparacion"],
+    doc_md="""### DAG Predicción Multi-Modelo
+    1. Lee una sola vez la ventana histórica (336, 5).
+    2. Puntúa cada versión de `prediccion_model_versions` en paralelo
+       (mapeo dinámico de tareas) sobre esa misma entrada. Los nombres de
+       motores base se puntúan sin artefactos, como referencia.
+    3. Guarda todas las salidas en un único UPSERT en
+       `demanda_prediccion_modelos`, etiquetadas por versión.
+    """,
+)
+def prediccion_multi_modelo_dag():
+    """Define el DAG y sus tareas."""
+
+    @task
+    def prepare_shared_input() -> dict:
+        """Lee la ventana una vez; todas las versiones la reutilizan."""
+        window, last_ts = fetch_prediction_window(POSTGRES_CONN_ID, WINDOW_SIZE)
+        return {"window": window.tolist(), "last_input_ts": last_ts.isoformat()}
+
+    @task
+    def get_model_versions() -> list[str]:
+        """Versiones configuradas (campeón por defecto)."""
+        versions = Variable.get(MODEL_VERSIONS_VARIABLE, default_var=[CHAMPION_VERSION], deserialize_json=True)
+        logging.info(f"Versiones a puntuar: {versions}")
+        return list(dict.fromkeys(versions)) # Sin duplicados, conserva orden
+
+    @task
+    def score_model(version: str, shared: dict) -> list[dict]:
+        """Descarga los artefactos de `version` y predice sobre la entrada compartida."""
+        window = np.asarray(shared["window"], dtype=np.float32)
+        if version in BASELINE_ENGINES:
+            history = fetch_history_array(POSTGRES_CONN_ID) if version == "gbm_lags" else (None, None)
+            engine = build_baseline_engine(version, *history)
+            records = create_prediction_output(
+                engine.predict(window)[0], shared["last_input_ts"], version, offset_hours=engine.offset_hours
+            )
+            logging.info(f"Motor base {version}: {len(records)} predicciones.")
+            return records
+
+        paths = download_artifacts(
+            MINIO_CONN_ID, os.path.join(LOCAL_ARTIFACT_PATH, version), S3_BUCKET,
+            prefix=version_prefix(version, CHAMPION_VERSION),
+        )
+        pipeline = load_forecast_pipeline(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        preds = pipeline.predict(window)
+        records = create_prediction_output(
+            preds[0], shared["last_input_ts"], version, offset_hours=pipeline.offset_hours
+        )
+        logging.info(f"Versión {version}: {len(records)} predicciones.")
+        return records
+
+    @task
+    def save_all_scores(scores: list[list[dict]], run_ts_iso: str) -> int:
+        """Guarda las salidas de todas las versiones en un único UPSERT."""
+        records = [record for model_records in scores for record in model_records]
+        return insert_model_scores(records, run_ts_iso, POSTGRES_CONN_ID)
+
+    # --- Flujo del DAG ---
+    shared = prepare_shared_input()
+    scores = score_model.partial(shared=shared).expand(version=get_model_versions())
+    save_all_scores(scores, run_ts_iso="{{ ts }}")
+
+# Registrar el DAG
+prediccion_multi_modelo_dag()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_destilacion.py
+"""DAG mensual que destila el modelo en producción en un estudiante liviano."""
+
+import logging
+import os
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import (download_artifacts,
+                                        register_model_version,
+                                        upload_artifacts, version_prefix)
+    from scripts.db_operations_prediction import fetch_history_array
+    from scripts.prediction_utils import load_model_and_scalers
+    from scripts.training import save_bundle
+    from scripts.training.distill import distill_student
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def register_model_version(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def upload_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def version_prefix(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_history_array(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_model_and_scalers(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def save_bundle(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def distill_student(*args, **kwargs): raise NotImplementedError("Script no importado")
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+CHAMPION_VERSION = "lstm_v1" # Maestro: raíz del bucket
+MODEL_VERSIONS_VARIABLE = "prediccion_model_versions"
+LOCAL_ARTIFACT_PATH = "/tmp/distill_artifacts" # Dir temporal en worker
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 0, # Un re-intento re-entrenaría desde cero
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="destilacion_demanda_estudiante",
+    schedule="0 6 2 * *", # Día 2 de cada mes, 6:00 AM: después del re-entrenamiento mensual
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    max_active_runs=1,
+    default_args=default_args,
+    tags=["energia", "entrenamiento", "mensual", "destilacion"],
+    params={
+        "kind": Param("conv", enum=["conv", "gru"], description="Arquitectura del estudiante."),
+        "alpha": Param(0.5, type="number", minimum=0, maximum=1,
+                       description="Peso de los valores reales frente a las salidas del maestro."),
+        "accuracy_budget": Param(0.05, type="number", minimum=0,
+                                 description="MAE relativo extra tolerado frente al maestro."),
+        "max_epochs": Param(30, type="integer", minimum=1),
+        "step_hours": Param(24, type="integer", minimum=1),
+        "seed": Param(0, type="integer"),
+    },
+    doc_md="""### DAG Destilación de Estudiante
+    1. Descarga el campeón (maestro) y sus scalers desde la raíz del bucket.
+    2. Entrena un estudiante (Conv1D dilatadas o GRU pequeña) con objetivos
+       que mezclan las salidas del maestro y los valores reales.
+    3. Reporta exactitud, latencia de una ventana, parámetros y tamaño de
+       ambos modelos, y la reducción lograda.
+    4. Si el MAE del estudiante queda dentro de `accuracy_budget` del
+       maestro, publica el bundle como `student_<tipo>_<fecha>/` y lo
+       registra como versión aparte; si no, no publica nada.
+    """,
+)
+def destilacion_demanda_dag():
+    """Define el DAG y su única tarea."""
+
+    @task
+    def distill_and_publish(ds_nodash: str, params: dict | None = None) -> dict:
+        """Destila, aplica el presupuesto de exactitud y publica condicionalmente."""
+        params = params or {}
+        kind = params.get("kind", "conv")
+        version = f"student_{kind}_{ds_nodash}"
+        paths = download_artifacts(MINIO_CONN_ID, os.path.join(LOCAL_ARTIFACT_PATH, "teacher"), S3_BUCKET)
+        teacher, feature_scaler, target_scaler = load_model_and_scalers(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        epochs, values = fetch_history_array(POSTGRES_CONN_ID)
+        result = distill_student(
+            teacher, feature_scaler, target_scaler, epochs, values,
+            kind=kind,
+            alpha=params.get("alpha", 0.5),
+            step=params.get("step_hours", 24),
+            max_epochs=params.get("max_epochs", 30),
+            accuracy_budget=params.get("accuracy_budget", 0.05),
+            seed=params.get("seed", 0),
+        )
+        metadata = {"model_version": version, "teacher_version": CHAMPION_VERSION, **result["metadata"]}
+        if not metadata["gate"]["passed"]:
+            logging.warning(f"Destilación: {version} fuera del presupuesto de exactitud; no se publica.")
+            return metadata
+
+        bundle = save_bundle(result, os.path.join(LOCAL_ARTIFACT_PATH, version),
+                             extra_metadata={"model_version": version, "teacher_version": CHAMPION_VERSION})
+        upload_artifacts(MINIO_CONN_ID, bundle, S3_BUCKET, prefix=version_prefix(version, CHAMPION_VERSION))
+        register_model_version(version, MODEL_VERSIONS_VARIABLE, CHAMPION_VERSION)
+        return metadata
+
+    distill_and_publish(ds_nodash="{{ ds_nodash }}")
+
+# Registrar el DAG
+destilacion_demanda_dag()
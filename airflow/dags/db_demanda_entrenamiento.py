@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_entrenamiento.py
+"""DAG para re-entrenar el modelo LSTM de demanda y publicar el bundle como candidato."""
+
+import logging
+import os
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import (register_model_version,
+                                        upload_artifacts, version_prefix)
+    from scripts.training import save_bundle, train_model_from_snapshot
+    from scripts.training.crossval import cross_validate, save_cv_summary
+    from scripts.training.dataset_store import materialize_snapshot
+    from scripts.training.snapshot import open_snapshot
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def register_model_version(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def upload_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def version_prefix(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def save_bundle(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def train_model_from_snapshot(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def cross_validate(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def save_cv_summary(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def materialize_snapshot(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def open_snapshot(*args, **kwargs): raise NotImplementedError("Script no importado")
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+CHAMPION_VERSION = "lstm_v1" # Artefactos en la raíz del bucket; nunca se sobrescriben aquí
+# Lista de versiones que puntúa `prediccion_demanda_multi_modelo`
+MODEL_VERSIONS_VARIABLE = "prediccion_model_versions"
+LOCAL_ARTIFACT_PATH = "/tmp/training_artifacts" # Dir temporal en worker
+# Snapshots memmap de features escaladas, reutilizados entre corridas si los datos no cambian
+DATASET_STORE_PATH = os.environ.get("TRAINING_STORE_PATH", "/tmp/training_store")
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 0, # Un re-intento re-entrenaría desde cero
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="entrenamiento_demanda_lstm",
+    schedule="0 5 1 * *", # Día 1 de cada mes, 5:00 AM
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    max_active_runs=1,
+    default_args=default_args,
+    tags=["energia", "entrenamiento", "mensual", "lstm"],
+    params={
+        "max_epochs": Param(50, type="integer", minimum=1),
+        "batch_size": Param(32, type="integer", minimum=1),
+        "step_hours": Param(168, type="integer", minimum=1, description="Separación entre pares de entrenamiento."),
+        "seed": Param(0, type="integer"),
+        "scaler_source": Param("train_split", enum=["train_split", "stats"],
+                               description="Origen de los min/max de los scalers."),
+        "cv_folds": Param(4, type="integer", minimum=1, description="Pliegues de origen móvil."),
+        "cv_test_weeks": Param(4, type="integer", minimum=2, description="Semanas de prueba por pliegue."),
+        "cv_max_regression": Param(0.02, type="number", minimum=0,
+                                   description="Tolerancia frente al ingenuo estacional en cada pliegue."),
+    },
+    doc_md="""### DAG Entrenamiento de Demanda
+    1. Materializa `demanda_historico` escalado en un snapshot `.npy` memmap
+       identificado por la huella de los datos (calculada en Postgres). Si los
+       datos no cambiaron, se reutiliza el snapshot sin leer filas.
+    2. Entrena con `scripts.training` (misma lógica que el notebook): división
+       70/20/10, scalers ajustados sólo con entrenamiento y ventanas generadas
+       por lote con `tf.data` (barajado, prefetch) desde el memmap.
+    3. En paralelo, validación cruzada de origen móvil: `cv_folds` pliegues
+       de ventana expansiva entrenados en procesos que comparten el memmap.
+       El resumen (MAE/MAPE por pliegue y por hora de horizonte) se sube como
+       `cv_summary.json`.
+    4. Publica modelo, scalers y `metadata.json` en MinIO bajo `lstm_<fecha>/`.
+       La versión se agrega a `prediccion_model_versions` como retador sólo si
+       pasa la compuerta en TODOS los pliegues. La promoción a campeón (raíz
+       del bucket) no se hace aquí.
+    """,
+)
+def entrenamiento_demanda_dag():
+    """Define el DAG y sus tareas."""
+
+    @task
+    def prepare_dataset(params: dict | None = None) -> str:
+        """Materializa (o reutiliza) el snapshot y devuelve su directorio."""
+        params = params or {}
+        return materialize_snapshot(POSTGRES_CONN_ID, DATASET_STORE_PATH,
+                                    scaler_source=params.get("scaler_source", "train_split"))["dir"]
+
+    @task
+    def train_and_publish(snapshot_dir: str, version: str, params: dict | None = None) -> dict:
+        """Entrena sobre el histórico completo y sube el bundle bajo el prefijo de la versión."""
+        params = params or {}
+        result = train_model_from_snapshot(
+            open_snapshot(snapshot_dir),
+            step=params.get("step_hours", 168),
+            max_epochs=params.get("max_epochs", 50),
+            batch_size=params.get("batch_size", 32),
+            seed=params.get("seed", 0),
+        )
+        paths = save_bundle(result, os.path.join(LOCAL_ARTIFACT_PATH, version),
+                            extra_metadata={"model_version": version})
+        upload_artifacts(MINIO_CONN_ID, paths, S3_BUCKET, prefix=version_prefix(version, CHAMPION_VERSION))
+        return {"model_version": version, **result["metadata"]}
+
+    @task
+    def cross_validate_recipe(snapshot_dir: str, version: str, params: dict | None = None) -> dict:
+        """Valida la receta de entrenamiento en todos los pliegues y sube el resumen junto al bundle."""
+        params = params or {}
+        summary = cross_validate(
+            open_snapshot(snapshot_dir),
+            n_folds=params.get("cv_folds", 4),
+            test_hours=params.get("cv_test_weeks", 4) * 7 * 24,
+            step=params.get("step_hours", 168),
+            max_epochs=params.get("max_epochs", 50),
+            batch_size=params.get("batch_size", 32),
+            max_regression=params.get("cv_max_regression", 0.02),
+            seed=params.get("seed", 0),
+        )
+        paths = save_cv_summary({"model_version": version, **summary},
+                                os.path.join(LOCAL_ARTIFACT_PATH, version, "cv"))
+        upload_artifacts(MINIO_CONN_ID, paths, S3_BUCKET, prefix=version_prefix(version, CHAMPION_VERSION))
+        return {"gate": summary["gate"], "aggregate": summary["aggregate"]}
+
+    @task
+    def register_candidate(metadata: dict, cv: dict) -> None:
+        """Agrega la versión a la lista de retadores sólo si pasó la validación cruzada."""
+        if not cv["gate"]["passed"]:
+            logging.warning(f"Candidato {metadata['model_version']} no registrado: pasó "
+                            f"{cv['gate']['folds_passed']}/{cv['gate']['n_folds']} pliegues.")
+            return
+        register_model_version(metadata["model_version"], MODEL_VERSIONS_VARIABLE, CHAMPION_VERSION)
+        logging.info(f"Candidato {metadata['model_version']} registrado (MAE CV "
+                     f"{cv['aggregate']['mae_kwh_mean']:.1f} kWh, prueba {metadata['test']['mae_kwh']:.1f} kWh).")
+
+    version = "lstm_{{ ds_nodash }}"
+    snapshot_dir = prepare_dataset()
+    register_candidate(
+        train_and_publish(snapshot_dir, version=version),
+        cross_validate_recipe(snapshot_dir, version=version),
+    )
+
+# Registrar el DAG
+entrenamiento_demanda_dag()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_finetune.py
+"""DAG semanal de re-entrenamiento incremental (warm start) desde el modelo en producción."""
+
+import logging
+import os
+from datetime import timedelta
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import (download_artifacts,
+                                        register_model_version,
+                                        upload_artifacts, version_prefix)
+    from scripts.db_operations_prediction import fetch_history_array
+    from scripts.prediction_utils import load_model_and_scalers
+    from scripts.training import save_bundle
+    from scripts.training.finetune import finetune_model
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def register_model_version(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def upload_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def version_prefix(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_history_array(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_model_and_scalers(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def save_bundle(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def finetune_model(*args, **kwargs): raise NotImplementedError("Script no importado")
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+CHAMPION_VERSION = "lstm_v1" # Pesos de partida: raíz del bucket
+MODEL_VERSIONS_VARIABLE = "prediccion_model_versions"
+LOCAL_ARTIFACT_PATH = "/tmp/finetune_artifacts" # Dir temporal en worker
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="finetune_demanda_lstm",
+    schedule="30 2 * * 0", # Domingos 2:30 AM: tras la ingesta y antes de puntuar retadores
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    max_active_runs=1,
+    default_args=default_args,
+    tags=["energia", "entrenamiento", "semanal", "lstm", "finetune"],
+    params={
+        "max_epochs": Param(3, type="integer", minimum=1, maximum=20),
+        "learning_rate": Param(1e-4, type="number", exclusiveMinimum=0),
+        "recent_weeks": Param(8, type="integer", minimum=1),
+        "replay_ratio": Param(1.0, type="number", minimum=0),
+        "max_regression": Param(0.02, type="number", minimum=0, description="Tolerancia de la compuerta (MAE relativo)."),
+    },
+    doc_md="""### DAG Fine-tuning Semanal
+    1. Descarga pesos y scalers del campeón (raíz del bucket).
+    2. Mide su MAE en los pares más recientes (holdout) y luego ajusta unas
+       pocas épocas sobre pares recientes + una muestra de replay antigua,
+       con los mismos scalers.
+    3. Compuerta: si el MAE ajustado no empeora más de `max_regression`,
+       publica el bundle como `lstm_ft_<fecha>/` y lo registra como retador.
+       Si no, no se publica nada.
+    """,
+)
+def finetune_demanda_dag():
+    """Define el DAG y su única tarea."""
+
+    @task
+    def finetune_and_publish(version: str, params: dict | None = None) -> dict:
+        """Warm start desde el campeón, compuerta y publicación condicional."""
+        params = params or {}
+        paths = download_artifacts(MINIO_CONN_ID, os.path.join(LOCAL_ARTIFACT_PATH, "base"), S3_BUCKET)
+        model, feature_scaler, target_scaler = load_model_and_scalers(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        epochs, values = fetch_history_array(POSTGRES_CONN_ID)
+        result = finetune_model(
+            model, feature_scaler, target_scaler, epochs, values,
+            max_epochs=params.get("max_epochs", 3),
+            learning_rate=params.get("learning_rate", 1e-4),
+            max_regression=params.get("max_regression", 0.02),
+            recent_hours=params.get("recent_weeks", 8) * 7 * 24,
+            replay_ratio=params.get("replay_ratio", 1.0),
+        )
+        metadata = {"model_version": version, "base_version": CHAMPION_VERSION, **result["metadata"]}
+        if not metadata["gate"]["passed"]:
+            logging.warning(f"Fine-tune: {version} no pasó la compuerta; no se publica.")
+            return metadata
+
+        bundle = save_bundle(result, os.path.join(LOCAL_ARTIFACT_PATH, version),
+                             extra_metadata={"model_version": version, "base_version": CHAMPION_VERSION})
+        upload_artifacts(MINIO_CONN_ID, bundle, S3_BUCKET, prefix=version_prefix(version, CHAMPION_VERSION))
+        register_model_version(version, MODEL_VERSIONS_VARIABLE, CHAMPION_VERSION)
+        return metadata
+
+    finetune_and_publish(version="lstm_ft_{{ ds_nodash }}")
+
+# Registrar el DAG
+finetune_demanda_dag()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_nowcast.py
+"""DAG para re-pronóstico horario incremental (nowcast) con estado LSTM persistido."""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import download_artifacts, get_artifact_etags
+    from scripts.db_operations_prediction import (fetch_history_array,
+                                                  fetch_prediction_window,
+                                                  insert_nowcast)
+    from scripts.prediction_utils import (WINDOW_SIZE_HOURS,
+                                          create_prediction_output,
+                                          load_model_and_scalers,
+                                          ForecastPipeline)
+    from scripts import nowcast_utils
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def get_artifact_etags(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_history_array(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_prediction_window(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def insert_nowcast(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def create_prediction_output(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_model_and_scalers(*args, **kwargs): raise NotImplementedError("Script no importado")
+    ForecastPipeline = None
+    nowcast_utils = None
+    WINDOW_SIZE_HOURS = 336
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+MODEL_VERSION = "lstm_v1"
+NOWCAST_MODEL_VERSION = f"{MODEL_VERSION}-nowcast"
+NOWCAST_STATE_KEY = f"nowcast/{MODEL_VERSION}/state.npz"
+# El modelo se entrenó con estado cero cada 336h; se re-inicializa periódicamente
+# para que el estado arrastrado no se aleje de lo que vio en entrenamiento.
+MAX_STATE_AGE_HOURS = 168
+LOCAL_ARTIFACT_PATH = "/tmp/nowcast_artifacts" # Dir temporal en worker
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="nowcast_demanda_horario",
+    schedule="15 * * * *", # Cada hora, después de la ingesta
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    max_active_runs=1, # El estado es secuencial
+    default_args=default_args,
+    tags=["energia", "prediccion", "nowcast", "lstm"],
+    doc_md="""### DAG Nowcast Horario de Demanda
+    1. Carga de MinIO el estado (h, c) de las LSTM tras la última hora observada.
+    2. Lee sólo las horas nuevas; si no hay, termina sin cargar el modelo.
+    3. Avanza el estado sobre esas horas y actualiza el pronóstico vigente.
+       Se re-inicializa con una ventana completa si no hay estado, cambió el
+       modelo, hay huecos o el estado supera `MAX_STATE_AGE_HOURS`.
+    4. Guarda pronóstico (`model_version = lstm_v1-nowcast`) en `demanda_nowcast` y el estado.
+       No toca `demanda_prediccion`, que sirve la corrida semanal del campeón.
+    """,
+)
+def nowcast_demanda_dag():
+    """Define el DAG y su tarea."""
+
+    @task
+    def refresh_nowcast(run_ts_iso: str) -> int:
+        """Avanza el estado LSTM sobre las horas nuevas y re-pronostica."""
+        s3_hook = S3Hook(aws_conn_id=MINIO_CONN_ID)
+        model_etag = get_artifact_etags(MINIO_CONN_ID, S3_BUCKET)["model"]
+
+        nowcast = None
+        if s3_hook.check_for_key(NOWCAST_STATE_KEY, bucket_name=S3_BUCKET):
+            data = s3_hook.get_key(NOWCAST_STATE_KEY, bucket_name=S3_BUCKET).get()["Body"].read()
+            nowcast, state_etag = nowcast_utils.deserialize(data)
+            age_hours = (int(nowcast["last_epoch"]) - int(nowcast["bootstrap_epoch"])) // 3600
+            if state_etag != model_etag or age_hours >= MAX_STATE_AGE_HOURS:
+                logging.info(f"Nowcast: estado descartado (modelo cambió o edad {age_hours}h).")
+                nowcast = None
+
+        new_epochs = new_values = None
+        if nowcast is not None:
+            since = datetime.fromtimestamp(int(nowcast["last_epoch"]) + 3600, tz=timezone.utc)
+            new_epochs, new_values = fetch_history_array(POSTGRES_CONN_ID, start=since)
+            if len(new_epochs) == 0:
+                logging.info("Nowcast: no hay horas nuevas; se conserva el pronóstico vigente.")
+                return 0
+
+        paths = download_artifacts(MINIO_CONN_ID, LOCAL_ARTIFACT_PATH, S3_BUCKET)
+        model, feat_scaler, targ_scaler = load_model_and_scalers(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        pipeline = ForecastPipeline(model, feat_scaler, targ_scaler)
+        step_fn = nowcast_utils.build_step_model(model)
+
+        if nowcast is not None:
+            try:
+                nowcast = nowcast_utils.update(pipeline, step_fn, nowcast, new_epochs, new_values)
+                logging.info(f"Nowcast: estado avanzado {len(new_epochs)}h.")
+            except ValueError as e:
+                logging.warning(f"Nowcast: {e} Re-inicializando.")
+                nowcast = None
+        if nowcast is None:
+            window, last_ts = fetch_prediction_window(POSTGRES_CONN_ID, WINDOW_SIZE_HOURS)
+            nowcast = nowcast_utils.bootstrap(pipeline, step_fn, window, int(last_ts.timestamp()))
+            logging.info(f"Nowcast: estado inicializado con ventana completa hasta {last_ts}.")
+
+        last_ts = datetime.fromtimestamp(int(nowcast["last_epoch"]), tz=timezone.utc)
+        records = create_prediction_output(
+            nowcast_utils.current_forecast(pipeline, nowcast), last_ts,
+            NOWCAST_MODEL_VERSION, offset_hours=pipeline.offset_hours,
+        )
+        insert_nowcast(records, last_ts, run_ts_iso, POSTGRES_CONN_ID)
+        s3_hook.load_bytes(nowcast_utils.serialize(nowcast, model_etag),
+                           key=NOWCAST_STATE_KEY, bucket_name=S3_BUCKET, replace=True)
+        return len(records)
+
+    refresh_nowcast(run_ts_iso="{{ ts }}")
+
+# Registrar el DAG
+nowcast_demanda_dag()
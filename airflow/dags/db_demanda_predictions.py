@@ -6,41 +6,54 @@ import logging
 import os
 from datetime import timedelta
 
-import pandas as pd
 import pendulum
 from airflow.decorators import dag, task
 from airflow.exceptions import AirflowException
-from airflow.providers.amazon.aws.hooks.s3 import S3Hook
-from airflow.providers.postgres.hooks.postgres import PostgresHook
 
 # Intenta importar funciones locales; define placeholders si falla.
 try:
     from scripts.prediction_utils import (create_prediction_output,
-                                            generate_predictions,
-                                            load_model_and_scalers,
-                                            prepare_prediction_input)
-    from scripts.db_operations_prediction import insert_predictions
+                                            load_forecast_pipeline)
+    from scripts.forecast_engines import build_baseline_engine
+    from scripts.db_operations_prediction import (compute_input_digest,
+                                                  fetch_history_array,
+                                                  fetch_prediction_window,
+                                                  find_cached_run,
+                                                  insert_predictions,
+                                                  record_prediction_run)
+    from scripts.inference_client import predict_remote
+    from scripts.artifact_utils import download_artifacts, get_artifact_etags
 except ImportError as e:
     logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
     # Placeholders para que Airflow parsee el DAG
-    def load_model_and_scalers(*args, **kwargs): raise NotImplementedError("Script no importado")
-    def prepare_prediction_input(*args, **kwargs): raise NotImplementedError("Script no importado")
-    def generate_predictions(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_forecast_pipeline(*args, **kwargs): raise NotImplementedError("Script no importado")
     def create_prediction_output(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def build_baseline_engine(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_history_array(*args, **kwargs): raise NotImplementedError("Script no importado")
     def insert_predictions(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_prediction_window(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def compute_input_digest(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def find_cached_run(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def record_prediction_run(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def predict_remote(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def get_artifact_etags(*args, **kwargs): raise NotImplementedError("Script no importado")
 
 
 # --- Constantes ---
 POSTGRES_CONN_ID = "app_postgres"
 MINIO_CONN_ID = "minio_storage"
 S3_BUCKET = "modelo-demanda-lstm"
-MODEL_KEY = "lstm_demand_model.keras"
-FEATURE_SCALER_KEY = "feature_scaler.joblib"
-TARGET_SCALER_KEY = "target_scaler.joblib"
 MODEL_VERSION = "lstm_v1"
 WINDOW_SIZE = 336  # Horas históricas requeridas (14 días)
 PREDICTION_HORIZON = 168 # Horas a predecir (7 días)
 LOCAL_ARTIFACT_PATH = "/tmp/pred_artifacts" # Dir temporal en worker
+# Servidor de inferencia caliente (http://host:puerto o unix:///ruta.sock). Vacío = carga local.
+INFERENCE_SERVER_URL = os.environ.get("INFERENCE_SERVER_URL", "")
+# Motor principal: "lstm" o un motor base (seasonal_naive, hour_of_week, gbm_lags)
+FORECAST_ENGINE = os.environ.get("FORECAST_ENGINE", "lstm")
+# Motor base si el LSTM falla (sin TensorFlow, sin artefactos). Vacío = la tarea falla.
+FALLBACK_ENGINE = os.environ.get("FORECAST_FALLBACK_ENGINE", "seasonal_naive")
 
 # --- Argumentos Default DAG ---
 default_args = {
@@ -58,10 +71,17 @@ default_args = {
     default_args=default_args,
     tags=["energia", "prediccion", "semanal", "lstm"],
     doc_md="""### DAG Predicción Semanal de Demanda (Conciso)
-    1. Descarga artefactos (modelo/scalers) de MinIO.
-    2. Obtiene datos históricos de PostgreSQL.
-    3. Genera predicciones para la próxima semana.
-    4. Guarda predicciones en PostgreSQL.
+    1. Calcula la huella (versión de modelo, ETags de artefactos, bytes de la
+       ventana histórica). Si coincide con una corrida previa cuyo pronóstico
+       sigue intacto, sólo registra la corrida y termina sin cargar el modelo.
+    2. Lee la ventana histórica de PostgreSQL directo a NumPy (en la misma tarea).
+    3. Genera predicciones para la próxima semana en el servidor de inferencia
+       (`INFERENCE_SERVER_URL`); si no está disponible, descarga los artefactos
+       de MinIO y predice localmente.
+    4. Si el LSTM no puede predecir (sin TensorFlow o sin artefactos), usa el
+       motor base `FORECAST_FALLBACK_ENGINE`; `FORECAST_ENGINE` permite usar un
+       motor base directamente. `model_version` registra el motor usado.
+    5. Guarda predicciones y metadatos de la corrida en PostgreSQL.
     """,
 )
 def prediccion_demanda_semanal_dag_conciso():
@@ -84,100 +104,132 @@ def prediccion_demanda_semanal_dag_conciso():
         return LOCAL_ARTIFACT_PATH
 
     @task
-    def download_artifacts_from_s3(local_dir_path: str) -> dict[str, str]:
-        """Descarga modelo y scalers desde S3/MinIO usando get_key().download_file()."""
-        s3_hook = S3Hook(aws_conn_id=MINIO_CONN_ID)
-        files = {"model": MODEL_KEY, "feature_scaler": FEATURE_SCALER_KEY, "target_scaler": TARGET_SCALER_KEY}
-        paths: dict[str, str] = {}
-        for name, key in files.items():
-            # Construye la ruta COMPLETA del archivo destino local
-            local_file_path = os.path.join(local_dir_path, os.path.basename(key))
+    def check_forecast_cache() -> dict:
+        """Calcula la huella de la entrada y busca una corrida previa reutilizable."""
+        window, last_ts = fetch_prediction_window(POSTGRES_CONN_ID, WINDOW_SIZE)
+        artifact_etags = {}
+        if FORECAST_ENGINE == "lstm":
             try:
-                logging.info(f"Descargando {key} a {local_file_path}")
-
-                # --- Solución: Usar get_key().download_file() ---
-                # 1. Obtener el objeto S3 (representación del archivo en S3)
-                s3_object = s3_hook.get_key(key=key, bucket_name=S3_BUCKET)
-                # 2. Llamar al método download_file DEL OBJETO S3, especificando la ruta local completa
-                s3_object.download_file(local_file_path)
-                # --- Fin Solución ---
-
-                if not os.path.isfile(local_file_path): # Verifica descarga
-                    raise FileNotFoundError(f"{local_file_path} no encontrado post-descarga.")
-                paths[name] = local_file_path
-                logging.info(f"Descargado y verificado: {local_file_path}")
-            except Exception as e:
-                # Captura errores de get_key, download_file o la verificación
-                logging.error(f"Error descargando {name} ({key}): {e}", exc_info=True)
-                raise AirflowException(f"Fallo descarga artefacto '{name}'.")
-
-        if len(paths) != len(files):
-            # Esto no debería ocurrir si cada descarga fallida lanza excepción, pero es una doble verificación
-            raise AirflowException("No se descargaron todos los artefactos.")
+                artifact_etags = get_artifact_etags(MINIO_CONN_ID, S3_BUCKET)
+            except Exception as e: # La predicción decidirá si usa el respaldo
+                logging.warning(f"No se pudieron leer los ETags de artefactos ({e}).")
+        # Sin artefactos del LSTM la corrida usará el motor base: la huella se calcula con su nombre
+        model_version = MODEL_VERSION if artifact_etags else (
+            FALLBACK_ENGINE if FORECAST_ENGINE == "lstm" else FORECAST_ENGINE)
+        digest = compute_input_digest(window, model_version, artifact_etags)
+        cached = find_cached_run(POSTGRES_CONN_ID, digest)
+        logging.info(f"Huella de entrada {digest[:12]}... "
+                     f"{'reutilizable de ' + cached['source_run_ts'] if cached else 'sin coincidencias'}.")
+        return {
+            "digest": digest,
+            "model_version": model_version,
+            "artifact_etags": artifact_etags,
+            "last_input_ts": last_ts.isoformat(),
+            "cached": cached,
+        }
 
-        logging.info(f"Todos los artefactos descargados exitosamente: {paths}")
-        return paths
+    @task.branch
+    def choose_prediction_path(cache: dict) -> str:
+        """Salta la inferencia cuando la entrada y el modelo no cambiaron."""
+        return "register_cached_run" if cache["cached"] else "setup_local_dir"
 
     @task
-    def get_historical_data(hours_to_fetch: int) -> pd.DataFrame:
-        """Obtiene últimas `hours_to_fetch` horas de datos desde PostgreSQL."""
-        pg_hook = PostgresHook(postgres_conn_id=POSTGRES_CONN_ID)
-        sql = f"""
-            SELECT
-                datetime,
-                kwh       AS "kWh",  -- Alias con comillas para forzar mayúscula/minúscula
-                mes       AS "Mes",
-                hour      AS "Hour",
-                season    AS "Season",
-                dia_habil AS "Dia_habil"
-            FROM demanda_historico
-            ORDER BY datetime DESC
-            LIMIT {hours_to_fetch};
-        """
-        logging.info(f"Obteniendo {hours_to_fetch}h de datos históricos...")
-        df = pg_hook.get_pandas_df(sql)
-        logging.warning(f"DEBUG (WARNING): Columnas recibidas de BD: {df.columns.tolist()}")
-        logging.info(f"DEBUG (INFO): DataFrame obtenido: {df}")
-        if df.empty:
-            raise ValueError("No se obtuvieron datos históricos.")
-        if len(df) < hours_to_fetch:
-            raise ValueError(f"Datos históricos insuficientes ({len(df)}/{hours_to_fetch}).")
-        df = df.sort_values("datetime").reset_index(drop=True) # Orden ASC para modelo
-        logging.info(f"Datos históricos preparados ({len(df)} filas). Último ts: {df['datetime'].iloc[-1]}")
-        return df
+    def register_cached_run(cache: dict, run_ts_iso: str):
+        """Registra sólo los metadatos de la corrida, reutilizando el pronóstico previo."""
+        record_prediction_run(
+            postgres_conn_id=POSTGRES_CONN_ID,
+            prediction_run_ts_iso=run_ts_iso,
+            model_version=cache["model_version"],
+            artifact_etags=cache["artifact_etags"],
+            input_digest=cache["digest"],
+            last_input_ts_iso=cache["last_input_ts"],
+            n_predictions=cache["cached"]["n_predictions"],
+            reused_from_iso=cache["cached"]["source_run_ts"],
+        )
+
+    def predict_with_baseline(engine_name: str, window, last_ts, run_info: dict) -> dict:
+        """Predice con un motor base (vectorizado, sin TensorFlow ni artefactos)."""
+        history = fetch_history_array(POSTGRES_CONN_ID) if engine_name == "gbm_lags" else (None, None)
+        engine = build_baseline_engine(engine_name, *history)
+        records = create_prediction_output(
+            engine.predict(window)[0], last_ts, engine_name, offset_hours=engine.offset_hours
+        )
+        logging.info(f"Predicciones generadas con motor base '{engine_name}': {len(records)} puntos.")
+        digest = compute_input_digest(window, engine_name, {})
+        return {**run_info, "digest": digest, "artifact_etags": {}, "model_version": engine_name, "records": records}
 
     @task
-    def make_and_format_predictions(df_hist: pd.DataFrame, paths: dict) -> list[dict]:
-        """Carga modelo, prepara datos, predice y formatea salida."""
-        if df_hist is None or df_hist.empty: # Validación defensiva
-            raise ValueError("No hay datos históricos válidos para predicción.")
+    def make_and_format_predictions(local_dir_path: str, cache: dict) -> dict:
+        """Lee la ventana histórica y predice con el motor configurado (LSTM remoto, local o motor base)."""
+        # La ventana (336, 5) float32 se lee en proceso; no viaja por XCom
+        window, last_ts = fetch_prediction_window(POSTGRES_CONN_ID, WINDOW_SIZE)
+        # La huella debe ser la que se revisó: si la ventana cambió entre el chequeo y
+        # la predicción, la rama elegida (sin caché) ya no corresponde a esta entrada
+        if compute_input_digest(window, cache["model_version"], cache["artifact_etags"]) != cache["digest"]:
+            raise AirflowException("La ventana histórica cambió después del chequeo de caché; re-ejecuta el DAG.")
+        run_info = {
+            "digest": compute_input_digest(window, MODEL_VERSION, cache["artifact_etags"]),
+            "artifact_etags": cache["artifact_etags"],
+            "last_input_ts": last_ts.isoformat(),
+            "model_version": MODEL_VERSION,
+        }
+        if FORECAST_ENGINE != "lstm":
+            return predict_with_baseline(FORECAST_ENGINE, window, last_ts, run_info)
+
+        if INFERENCE_SERVER_URL:
+            try:
+                preds, meta = predict_remote(window[None, ...], INFERENCE_SERVER_URL)
+                # El servidor puede no haber recargado aún: sólo se acepta si sirve el modelo de MinIO
+                if meta.get("etag") != cache["artifact_etags"].get("model"):
+                    raise ValueError(f"el servidor sirve el modelo {meta.get('etag')}, "
+                                     f"MinIO tiene {cache['artifact_etags'].get('model')}")
+                records = create_prediction_output(
+                    preds[0], last_ts, meta["model_version"], offset_hours=meta["offset_hours"]
+                )
+                logging.info(f"Predicciones generadas por servidor ({meta['etag']}): {len(records)} puntos.")
+                # Huella con la versión que realmente produjo el pronóstico
+                digest = compute_input_digest(window, meta["model_version"], cache["artifact_etags"])
+                return {**run_info, "digest": digest, "model_version": meta["model_version"], "records": records}
+            except Exception as e:
+                logging.warning(f"Servidor de inferencia no utilizable ({e}). Usando carga local.")
+
+        try:
+            paths = download_artifacts(MINIO_CONN_ID, local_dir_path, S3_BUCKET)
+        except Exception as e:
+            if not FALLBACK_ENGINE:
+                raise
+            logging.warning(f"Artefactos no disponibles ({e}). Usando motor base '{FALLBACK_ENGINE}'.")
+            return predict_with_baseline(FALLBACK_ENGINE, window, last_ts, run_info)
         try:
-            logging.info(f"Prediciendo con {len(df_hist)} registros. Artefactos: {paths}")
-            # 1. Cargar artefactos locales
-            model, feat_scaler, targ_scaler = load_model_and_scalers(
+            logging.info(f"Prediciendo con ventana {window.shape}. Artefactos: {paths}")
+            # 1. Cargar artefactos y compilar pipeline (escalado y recorte dentro del grafo)
+            pipeline = load_forecast_pipeline(
                 model_path=paths["model"],
                 feature_scaler_path=paths["feature_scaler"],
                 target_scaler_path=paths["target_scaler"],
             )
-            # 2. Preparar entrada (NOTA: Solo necesita feat_scaler)
-            input_data = prepare_prediction_input(df_hist, feat_scaler)
-            # 3. Generar y re-escalar predicciones
-            preds = generate_predictions(model, input_data, targ_scaler)
-            # 4. Formatear salida
-            last_ts = df_hist["datetime"].iloc[-1]
-            records = create_prediction_output(preds, last_ts, MODEL_VERSION)
+            # 2. Predecir (kWh ya des-escalados y recortados)
+            preds = pipeline.predict(window)
+            # 3. Formatear salida
+            records = create_prediction_output(
+                preds[0], last_ts, MODEL_VERSION, offset_hours=pipeline.offset_hours
+            )
             logging.info(f"Predicciones generadas: {len(records)} puntos.")
-            return records
+            return {**run_info, "records": records}
         except KeyError as ke:
              logging.error(f"Falta clave de artefacto: {ke}. Paths: {paths}", exc_info=True)
              raise AirflowException(f"Fallo acceso a ruta de artefacto: {ke}")
         except Exception as e:
              logging.error(f"Error durante predicción: {e}", exc_info=True)
+             if FALLBACK_ENGINE: # p. ej. ImportError de TensorFlow o modelo corrupto
+                 logging.warning(f"Usando motor base '{FALLBACK_ENGINE}' como respaldo.")
+                 return predict_with_baseline(FALLBACK_ENGINE, window, last_ts, run_info)
              raise AirflowException(f"Fallo en make_and_format_predictions: {e}")
 
     @task
-    def save_predictions_to_db(records: list[dict], run_ts_iso: str):
-        """Guarda predicciones en la base de datos."""
+    def save_predictions_to_db(result: dict, run_ts_iso: str):
+        """Guarda predicciones y metadatos de la corrida en la base de datos."""
+        records = result["records"]
         if not records:
             logging.info("No hay predicciones para guardar.")
             return
@@ -189,12 +241,22 @@ def prediccion_demanda_semanal_dag_conciso():
             prediction_run_ts_iso=run_ts_iso, # Usar ts pasado
             postgres_conn_id=POSTGRES_CONN_ID,
         )
+        record_prediction_run(
+            postgres_conn_id=POSTGRES_CONN_ID,
+            prediction_run_ts_iso=run_ts_iso,
+            model_version=result.get("model_version", MODEL_VERSION),
+            artifact_etags=result["artifact_etags"],
+            input_digest=result["digest"],
+            last_input_ts_iso=result["last_input_ts"],
+            n_predictions=len(records),
+        )
 
     # --- Flujo del DAG ---
+    cache = check_forecast_cache()
+    path = choose_prediction_path(cache)
     local_path = setup_local_dir()
-    artifact_paths = download_artifacts_from_s3(local_path)
-    df = get_historical_data(WINDOW_SIZE)
-    predictions = make_and_format_predictions(df, artifact_paths)
+    predictions = make_and_format_predictions(local_path, cache)
+    path >> [local_path, register_cached_run(cache, run_ts_iso="{{ ts }}")]
     # Pasa el timestamp lógico de la ejecución ('{{ ts }}')
     save_predictions_to_db(predictions, run_ts_iso="{{ ts }}")
 
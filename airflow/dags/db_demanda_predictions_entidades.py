@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Archivo: dags/db_demanda_predictions_entidades.py
+"""DAG para predecir la demanda de todas las entidades (agentes/regiones) en una sola pasada."""
+
+import logging
+from datetime import timedelta
+
+import pendulum
+from airflow.decorators import dag, task
+from airflow.exceptions import AirflowSkipException
+from airflow.models import Variable
+
+# Intenta importar funciones locales; define placeholders si falla.
+try:
+    from scripts.artifact_utils import download_artifacts, version_prefix
+    from scripts.db_operations_prediction import (fetch_entity_windows,
+                                                  insert_entity_predictions)
+    from scripts.prediction_utils import WINDOW_SIZE_HOURS, load_forecast_pipeline
+except ImportError as e:
+    logging.error(f"Error importando scripts locales: {e}. Revisa PYTHONPATH.")
+    # Placeholders para que Airflow parsee el DAG
+    def download_artifacts(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def version_prefix(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def fetch_entity_windows(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def insert_entity_predictions(*args, **kwargs): raise NotImplementedError("Script no importado")
+    def load_forecast_pipeline(*args, **kwargs): raise NotImplementedError("Script no importado")
+    WINDOW_SIZE_HOURS = 336
+
+
+# --- Constantes ---
+POSTGRES_CONN_ID = "app_postgres"
+MINIO_CONN_ID = "minio_storage"
+S3_BUCKET = "modelo-demanda-lstm"
+CHAMPION_VERSION = "lstm_v1" # Artefactos en la raíz del bucket
+# Variable de Airflow con la versión entrenada a escala de entidad (obligatoria: los scalers
+# del campeón están ajustados al kWh nacional y colapsan las series por agente a ~0)
+ENTITY_MODEL_VERSION_VARIABLE = "prediccion_entidad_model_version"
+LOCAL_ARTIFACT_PATH = "/tmp/pred_artifacts_entidades" # Dir temporal en worker
+
+# --- Argumentos Default DAG ---
+default_args = {
+    "owner": "airflow",
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+}
+
+# --- Definición del DAG ---
+@dag(
+    dag_id="prediccion_demanda_entidades",
+    schedule="0 4 * * 0", # Domingos 4:00 AM, después de la predicción del sistema
+    start_date=pendulum.datetime(2024, 4, 1, tz="America/Bogota"),
+    catchup=False,
+    default_args=default_args,
+    tags=["energia", "prediccion", "semanal", "lstm", "entidad"],
+    doc_md="""### DAG Predicción por Entidad
+    1. Lee de `demanda_historico_entidad` la última ventana de cada entidad
+       y las apila en un solo arreglo (N, 336, 5).
+    2. Una sola pasada del pipeline compilado predice las N series.
+    3. Calcula los timestamps de todas las entidades por broadcasting y
+       escribe en bloque en `demanda_prediccion_entidad`.
+
+    La versión de modelo sale de la Variable `prediccion_entidad_model_version`;
+    debe estar entrenada (y con scalers) a la escala de las entidades. Si la
+    Variable no está definida la tarea se omite (no se usa el campeón).
+    """,
+)
+def prediccion_entidades_dag():
+    """Define el DAG y su única tarea."""
+
+    @task
+    def predict_all_entities(run_ts_iso: str) -> int:
+        """Predice todas las entidades con un único forward pass y las guarda."""
+        version = Variable.get(ENTITY_MODEL_VERSION_VARIABLE, default_var=None)
+        if not version:
+            logging.warning(f"Entidades: Variable '{ENTITY_MODEL_VERSION_VARIABLE}' sin definir; "
+                            "se omite la corrida.")
+            raise AirflowSkipException(f"Falta la Variable '{ENTITY_MODEL_VERSION_VARIABLE}'.")
+        entities, windows, last_epochs = fetch_entity_windows(POSTGRES_CONN_ID, WINDOW_SIZE_HOURS)
+        if not entities:
+            logging.warning("Entidades: no hay series con ventana completa; nada que predecir.")
+            return 0
+
+        paths = download_artifacts(
+            MINIO_CONN_ID, LOCAL_ARTIFACT_PATH, S3_BUCKET,
+            prefix=version_prefix(version, CHAMPION_VERSION),
+        )
+        pipeline = load_forecast_pipeline(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        preds = pipeline.predict(windows)
+        logging.info(f"Entidades: {preds.shape[0]} series x {preds.shape[1]} pasos con {version}.")
+        return insert_entity_predictions(
+            entities, last_epochs, preds, pipeline.offset_hours, version, run_ts_iso, POSTGRES_CONN_ID
+        )
+
+    predict_all_entities(run_ts_iso="{{ ts }}")
+
+# Registrar el DAG
+prediccion_entidades_dag()
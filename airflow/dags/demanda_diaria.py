@@ -17,15 +17,27 @@ from airflow.exceptions import AirflowException
 
 # Importa las funciones desacopladas desde los scripts
 try:
-    from scripts.xm_api_utils import extraer_demanda
+    from scripts.xm_api_utils import extraer_demanda, extraer_demanda_entidades
     from scripts.data_processing import transformar_dataframe_demanda
-    from scripts.db_operations import insertar_registros_demanda
+    from scripts.db_operations import insertar_registros_demanda, insertar_demanda_entidades, actualizar_estadisticas_features, actualizar_rollups_demanda
+    from scripts.db_operations_prediction import fetch_feature_stats, MODEL_COLUMNS
+    from scripts.feature_stats import drift_report
 except ImportError as e:
     logging.error(f"Error importando funciones de scripts: {e}. Verifica PYTHONPATH y la ubicación de 'scripts'.")
     # Define funciones placeholder para que el DAG cargue pero falle en ejecución
     def extraer_demanda(*args, **kwargs): raise NotImplementedError("extraer_demanda no importado")
     def transformar_dataframe_demanda(*args, **kwargs): raise NotImplementedError("transformar_dataframe_demanda no importado")
     def insertar_registros_demanda(*args, **kwargs): raise NotImplementedError("insertar_registros_demanda no importado")
+    def extraer_demanda_entidades(*args, **kwargs): raise NotImplementedError("extraer_demanda_entidades no importado")
+    def insertar_demanda_entidades(*args, **kwargs): raise NotImplementedError("insertar_demanda_entidades no importado")
+    def actualizar_estadisticas_features(*args, **kwargs): raise NotImplementedError("actualizar_estadisticas_features no importado")
+    def actualizar_rollups_demanda(*args, **kwargs): raise NotImplementedError("actualizar_rollups_demanda no importado")
+    def fetch_feature_stats(*args, **kwargs): raise NotImplementedError("fetch_feature_stats no importado")
+    def drift_report(*args, **kwargs): raise NotImplementedError("drift_report no importado")
+    MODEL_COLUMNS = ["mes", "hour", "season", "dia_habil", "kwh"]
+
+# Desagregación de la demanda por entidad para las predicciones por agente
+ENTIDAD_DEMANDA = 'Agente'
 
 
 # Configuración de argumentos por defecto para el DAG
@@ -54,6 +66,14 @@ default_args = {
     1.  **Extrae** datos de los últimos 10 días.
     2.  **Transforma** los datos al formato requerido.
     3.  **Carga** los datos en la tabla `historico` usando `ON CONFLICT DO NOTHING`.
+    4.  En paralelo, extrae y carga en bloque la demanda por entidad
+        (`demanda_historico_entidad`).
+    5.  **Actualiza** las estadísticas incrementales de las features
+        (`demanda_estadisticas_features`): sólo se agregan las horas nuevas.
+    6.  **Compara** la cola reciente contra el histórico congelado y registra
+        la deriva (z por feature y por hora de la semana). Sólo informa.
+    7.  **Refresca** los agregados por día/semana/mes
+        (`demanda_historico_rollup`) sólo en las cubetas recientes.
     """,
 )
 def xm_demanda_dag_desacoplado():
@@ -117,10 +137,65 @@ def xm_demanda_dag_desacoplado():
         logging.info("Task [cargar_datos]: Llamada a función de carga completada.")
 
 
+    @task(task_id="cargar_datos_entidades")
+    def cargar_datos_entidades() -> int:
+        """
+        Extrae la demanda por entidad del mismo rango y la carga en bloque.
+        Se hace en una sola tarea para no pasar el DataFrame largo por XCom.
+        """
+        now = pendulum.now("America/Bogota")
+        fecha_fin = now.date()
+        fecha_inicio = fecha_fin - timedelta(days=15)
+        df_entidades = extraer_demanda_entidades(fecha_inicio, fecha_fin, ENTIDAD_DEMANDA)
+        if df_entidades is None or df_entidades.empty:
+            logging.warning("Task [cargar_datos_entidades]: La extracción por entidad no devolvió datos.")
+            return 0
+        return insertar_demanda_entidades(df_entidades, 'app_postgres')
+
+
+    @task(task_id="actualizar_estadisticas_features")
+    def actualizar_estadisticas() -> dict:
+        """
+        Agrega al resumen de las features las horas recién cargadas, sin
+        volver a leer el histórico completo.
+        """
+        return actualizar_estadisticas_features('app_postgres')
+
+
+    @task(task_id="revisar_deriva_features")
+    def revisar_deriva() -> dict | None:
+        """
+        Compara la cola reciente con el segmento congelado usando sólo la
+        tabla de estadísticas. Registra una advertencia si hay deriva.
+        """
+        stats = fetch_feature_stats('app_postgres')
+        if stats is None:
+            logging.info("Task [revisar_deriva]: Aún no hay estadísticas de features.")
+            return None
+        report = drift_report(stats["frozen"], stats["tail"], MODEL_COLUMNS)
+        if report["drift"]:
+            logging.warning(f"Task [revisar_deriva]: Deriva detectada: {report}")
+        else:
+            logging.info(f"Task [revisar_deriva]: Sin deriva (z por feature: {report['z_by_feature']}).")
+        return report
+
+
+    @task(task_id="actualizar_rollups_demanda")
+    def actualizar_rollups() -> int:
+        """
+        Recalcula los agregados por día, semana y mes de las cubetas que la
+        carga pudo tocar; el endpoint de agregación los lee directamente.
+        """
+        return actualizar_rollups_demanda('app_postgres')
+
+
     # --- Definición del Flujo/Pipeline del DAG ---
     datos_crudos_df = extraer_datos()
     registros_listos_dict = transformar_datos(datos_crudos_df)
-    cargar_datos(registros_listos_dict)
+    carga = cargar_datos(registros_listos_dict)
+    carga >> actualizar_estadisticas() >> revisar_deriva()
+    carga >> actualizar_rollups()
+    cargar_datos_entidades()
 
 # Llama a la función decorada para que Airflow registre el DAG
 xm_demanda_dag_desacoplado()
\ No newline at end of file
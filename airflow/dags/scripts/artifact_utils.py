@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/artifact_utils.py
+"""Utilidades concisas para artefactos del modelo (modelo/scalers) en MinIO.
+
+El modelo en producción (campeón) vive en la raíz del bucket; otras
+versiones (retadores, candidatos) bajo el prefijo `<version>/`.
+"""
+
+import logging
+import os
+
+from airflow.exceptions import AirflowException
+from airflow.models import Variable
+from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+S3_BUCKET = "modelo-demanda-lstm"
+# Nombre lógico -> key en el bucket
+ARTIFACT_KEYS = {
+    "model": "lstm_demand_model.keras",
+    "feature_scaler": "feature_scaler.joblib",
+    "target_scaler": "target_scaler.joblib",
+}
+
+
+def version_prefix(version: str | None, champion_version: str | None = None) -> str:
+    """Prefijo en el bucket de una versión ('' para el campeón en la raíz)."""
+    if not version or version == champion_version:
+        return ""
+    return f"{version}/"
+
+
+def get_artifact_etags(minio_conn_id: str, bucket: str = S3_BUCKET, prefix: str = "") -> dict[str, str]:
+    """ETags de los artefactos en MinIO (HEAD, sin descargar)."""
+    s3_hook = S3Hook(aws_conn_id=minio_conn_id)
+    return {
+        name: s3_hook.get_key(key=prefix + key, bucket_name=bucket).e_tag.strip('"')
+        for name, key in ARTIFACT_KEYS.items()
+    }
+
+
+def download_artifacts(
+    minio_conn_id: str,
+    local_dir_path: str,
+    bucket: str = S3_BUCKET,
+    prefix: str = ""
+) -> dict[str, str]:
+    """Descarga modelo y scalers desde S3/MinIO usando get_key().download_file()."""
+    s3_hook = S3Hook(aws_conn_id=minio_conn_id)
+    os.makedirs(local_dir_path, exist_ok=True)
+    paths: dict[str, str] = {}
+    for name, base_key in ARTIFACT_KEYS.items():
+        key = prefix + base_key
+        local_file_path = os.path.join(local_dir_path, os.path.basename(key))
+        try:
+            logging.info(f"Descargando {key} a {local_file_path}")
+            s3_hook.get_key(key=key, bucket_name=bucket).download_file(local_file_path)
+            if not os.path.isfile(local_file_path): # Verifica descarga
+                raise FileNotFoundError(f"{local_file_path} no encontrado post-descarga.")
+            paths[name] = local_file_path
+        except Exception as e:
+            logging.error(f"Error descargando {name} ({key}): {e}", exc_info=True)
+            raise AirflowException(f"Fallo descarga artefacto '{name}'.")
+
+    logging.info(f"Todos los artefactos descargados exitosamente: {paths}")
+    return paths
+
+
+def upload_artifacts(
+    minio_conn_id: str,
+    paths: dict[str, str],
+    bucket: str = S3_BUCKET,
+    prefix: str = ""
+) -> dict[str, str]:
+    """Sube un bundle local ({nombre lógico: ruta}) bajo `prefix`; devuelve {nombre: key}."""
+    s3_hook = S3Hook(aws_conn_id=minio_conn_id)
+    keys: dict[str, str] = {}
+    # Los scalers y metadatos primero: el modelo (cuyo ETag vigilan los consumidores) al final
+    for name in sorted(paths, key=lambda n: n == "model"):
+        key = prefix + os.path.basename(paths[name])
+        s3_hook.load_file(paths[name], key=key, bucket_name=bucket, replace=True)
+        keys[name] = key
+    logging.info(f"Artefactos publicados en s3://{bucket}/{prefix}: {sorted(keys)}")
+    return keys
+
+
+def register_model_version(version: str, variable: str = "prediccion_model_versions",
+                           champion_version: str = "lstm_v1") -> list[str]:
+    """Agrega `version` a la Variable (lista JSON) de versiones que puntúa el DAG multi-modelo."""
+    versions = Variable.get(variable, default_var=[champion_version], deserialize_json=True)
+    if version not in versions:
+        versions.append(version)
+        Variable.set(variable, versions, serialize_json=True)
+    logging.info(f"Versión {version} registrada. Versiones: {versions}")
+    return versions
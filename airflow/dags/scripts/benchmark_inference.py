@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/benchmark_inference.py
+"""Microbenchmarks del camino de predicción, sin red.
+
+Genera un histórico sintético, construye un modelo con la arquitectura real
+(LSTM 100 -> LSTM 80 -> TimeDistributed(Dense 1)) con pesos aleatorios y
+scalers ajustados al sintético, y mide cada etapa:
+
+    read_window     ventana (336, 5) desde la BD
+    predict         ForecastPipeline.predict de una ventana
+    format_output   create_prediction_output
+    write_output    inserción de las predicciones en la BD
+    end_to_end      las cuatro anteriores seguidas
+
+Además mide el throughput por tamaño de lote (1..1024 ventanas), el tiempo
+de importación (intérprete nuevo), el pico de RSS y, lado a lado, latencia y
+exactitud del LSTM frente a los motores base de `forecast_engines` sobre el
+último 20% del sintético (con pesos aleatorios la exactitud del LSTM sólo
+sirve como cota; con `--skip-engines` se omite). La BD es SQLite en
+memoria; con `--postgres-dsn` se usan las funciones reales de
+`db_operations_prediction` contra un Postgres local, con tablas de prueba en
+un esquema temporal `bench_<pid>` que se elimina al terminar (las tablas
+reales no se tocan).
+
+Ejecución (desde /opt/airflow/dags):
+    python -m scripts.benchmark_inference --output bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from scripts.forecast_engines import build_baseline_engine, compare_engines
+from scripts.prediction_utils import (N_FEATURES, WINDOW_SIZE_HOURS,
+                                      ForecastPipeline,
+                                      create_prediction_output)
+
+BENCH_CONN_ID = "bench_postgres"
+MODEL_COLUMNS = ["mes", "hour", "season", "dia_habil", "kwh"]
+# Estación numérica por mes (índice 0 = enero), igual que get_medellin_season_numeric
+SEASON_BY_MONTH = np.array([1, 1, 1, 2, 2, 2, 3, 3, 4, 4, 4, 1], dtype=np.float32)
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+ENGINE_HOLDOUT_FRACTION = 0.2
+
+
+def synthetic_history(n_hours: int, seed: int = 0,
+                      end: str = "2024-06-30T23:00") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Histórico horario sintético con la forma del real.
+
+    kWh ~ nivel base + ciclo diario + caída en fines de semana + ruido.
+    Las features de calendario se derivan de los timestamps (sin festivos).
+
+    Returns:
+        (epochs int64 (n,) en segundos UTC, valores float32 (n, 5) en orden del modelo)
+    """
+    rng = np.random.default_rng(seed)
+    hours = np.datetime64(end, "h") - np.arange(n_hours - 1, -1, -1).astype("timedelta64[h]")
+    hour = (hours - hours.astype("datetime64[D]")).astype(np.int64)
+    month = hours.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    weekday = (hours.astype("datetime64[D]").astype(np.int64) + 3) % 7  # 0 = lunes
+    habil = (weekday < 5).astype(np.float32)
+    kwh = (7.5e6 + 1.5e6 * np.sin(2 * np.pi * (hour - 6) / 24)
+           - 8e5 * (1 - habil) + rng.normal(0, 1e5, n_hours))
+    values = np.column_stack([month, hour, SEASON_BY_MONTH[month - 1], habil, kwh]).astype(np.float32)
+    return hours.astype("datetime64[s]").astype(np.int64), values
+
+
+def build_random_model(units: tuple[int, int] = (100, 80), seed: int = 0):
+    """Modelo con la arquitectura de producción y pesos aleatorios."""
+    from tensorflow import keras
+    from scripts.training.model import build_lstm_model
+
+    keras.utils.set_random_seed(seed)
+    return build_lstm_model(units)
+
+
+def fit_scalers(values: np.ndarray):
+    """MinMaxScaler de features y de objetivo ajustados sobre el sintético."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    return MinMaxScaler().fit(values), MinMaxScaler().fit(values[:, -1:])
+
+
+def peak_rss_mb() -> float:
+    """Pico de RSS del proceso en MB (ru_maxrss está en KB en Linux, bytes en macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(samples_s: list[float]) -> dict:
+    """Estadísticas de latencia en milisegundos."""
+    ms = np.asarray(samples_s) * 1e3
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def time_call(fn, repeats: int, warmup: int = 1) -> tuple[dict, object]:
+    """Ejecuta `fn` `warmup + repeats` veces; devuelve (estadísticas, último resultado)."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples), result
+
+
+def measure_import_time(module: str, repeats: int = 3) -> dict:
+    """Tiempo de `import module` en un intérprete nuevo (incluye arranque de TF)."""
+    code = (f"import time; t = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - t)")
+    env = {**os.environ, "TF_CPP_MIN_LOG_LEVEL": "3"}
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                             text=True, check=True, env=env, cwd=cwd)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+class SQLiteStandIn:
+    """Réplica en SQLite (memoria) de las tablas y consultas del camino de predicción."""
+
+    def __init__(self, epochs: np.ndarray, values: np.ndarray):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(f"""
+            CREATE TABLE demanda_historico (
+                datetime INTEGER PRIMARY KEY, {", ".join(c + " REAL" for c in MODEL_COLUMNS)});
+        """)
+        self.conn.execute("""
+            CREATE TABLE demanda_prediccion (
+                prediction_for_datetime TEXT PRIMARY KEY, prediction_run_ts TEXT,
+                predicted_kwh REAL, model_version TEXT);
+        """)
+        self.conn.executemany(
+            f"INSERT INTO demanda_historico VALUES (?, {', '.join('?' * len(MODEL_COLUMNS))});",
+            zip(epochs.tolist(), *values.astype(np.float64).T.tolist()),
+        )
+        self.conn.commit()
+
+    def read_window(self, hours: int = WINDOW_SIZE_HOURS) -> tuple[np.ndarray, datetime]:
+        """Equivalente a `fetch_prediction_window` (rango por índice, float32 preasignado)."""
+        rows = self.conn.execute(f"""
+            SELECT datetime, {", ".join(MODEL_COLUMNS)} FROM demanda_historico
+            WHERE datetime > (SELECT max(datetime) FROM demanda_historico) - ? * 3600
+            ORDER BY datetime ASC;
+        """, (hours,)).fetchall()
+        window = np.empty((hours, N_FEATURES), dtype=np.float32)
+        window[:] = [row[1:] for row in rows]
+        return window, datetime.fromtimestamp(rows[-1][0], tz=timezone.utc)
+
+    def write_output(self, records: list[dict], run_ts_iso: str) -> None:
+        """Equivalente a `insert_predictions` (UPSERT por prediction_for_datetime)."""
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO demanda_prediccion VALUES (?, ?, ?, ?)
+                ON CONFLICT (prediction_for_datetime) DO UPDATE SET
+                    prediction_run_ts = excluded.prediction_run_ts,
+                    predicted_kwh = excluded.predicted_kwh,
+                    model_version = excluded.model_version;
+            """, [(r["prediction_for_datetime"], run_ts_iso, r["predicted_kwh"], r["model_version"])
+                  for r in records])
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class PostgresStandIn:
+    """
+    Usa las funciones reales contra un Postgres local (conexión Airflow por variable de entorno).
+
+    Las tablas se crean en un esquema propio `bench_<pid>`; `PGOPTIONS` fija su
+    `search_path` para todas las conexiones libpq del proceso (las del hook y
+    las de SQLAlchemy), así las funciones reales leen y escriben ahí sin
+    tocar `demanda_historico`/`demanda_prediccion` de la base. `close()`
+    elimina el esquema.
+    """
+
+    def __init__(self, dsn: str, epochs: np.ndarray, values: np.ndarray):
+        os.environ[f"AIRFLOW_CONN_{BENCH_CONN_ID.upper()}"] = dsn
+        from scripts.db_operations_prediction import fetch_prediction_window, insert_predictions
+        import psycopg2
+        from psycopg2.extras import execute_values
+
+        self._fetch = fetch_prediction_window
+        self._insert = insert_predictions
+        self._dsn = dsn
+        self.schema = f"bench_{os.getpid()}"
+        self._pgoptions = os.environ.get("PGOPTIONS")
+        os.environ["PGOPTIONS"] = f"{self._pgoptions or ''} -c search_path={self.schema}".strip()
+        with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE SCHEMA {self.schema};
+                CREATE TABLE {self.schema}.demanda_historico (
+                    datetime TIMESTAMPTZ PRIMARY KEY,
+                    {", ".join(c + " DOUBLE PRECISION" for c in MODEL_COLUMNS)});
+                CREATE TABLE {self.schema}.demanda_prediccion (
+                    prediction_run_ts TIMESTAMPTZ, prediction_for_datetime TIMESTAMPTZ,
+                    predicted_kwh DOUBLE PRECISION, model_version VARCHAR,
+                    CONSTRAINT demanda_prediccion_pkey PRIMARY KEY (prediction_for_datetime));
+            """)
+            stamps = np.datetime_as_string(epochs.astype("datetime64[s]"), timezone="UTC")
+            execute_values(cursor, f"INSERT INTO {self.schema}.demanda_historico VALUES %s",
+                           zip(stamps.tolist(), *values.astype(np.float64).T.tolist()),
+                           page_size=10000)
+        conn.close()
+
+    def read_window(self, hours: int = WINDOW_SIZE_HOURS) -> tuple[np.ndarray, datetime]:
+        return self._fetch(BENCH_CONN_ID, hours)
+
+    def write_output(self, records: list[dict], run_ts_iso: str) -> None:
+        self._insert(records, run_ts_iso, BENCH_CONN_ID)
+
+    def close(self) -> None:
+        """Elimina el esquema de prueba y restaura `PGOPTIONS`."""
+        import psycopg2
+
+        with psycopg2.connect(self._dsn) as conn, conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {self.schema} CASCADE;")
+        conn.close()
+        if self._pgoptions is None:
+            os.environ.pop("PGOPTIONS", None)
+        else:
+            os.environ["PGOPTIONS"] = self._pgoptions
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    """Ejecuta todas las mediciones y devuelve el resultado serializable."""
+    batch_sizes = sorted(set(args.batch_sizes))
+    n_hours = max(args.history_hours, WINDOW_SIZE_HOURS + max(batch_sizes) - 1)
+    results: dict = {"rss_mb": {"start": peak_rss_mb()}}
+
+    if not args.skip_import:
+        results["import_s"] = {
+            "tensorflow": measure_import_time("tensorflow"),
+            "scripts.prediction_utils": measure_import_time("scripts.prediction_utils"),
+        }
+
+    epochs, values = synthetic_history(n_hours, seed=args.seed)
+    model = build_random_model(tuple(args.units), seed=args.seed)
+    feature_scaler, target_scaler = fit_scalers(values)
+    start = time.perf_counter()
+    pipeline = ForecastPipeline(model, feature_scaler, target_scaler)
+    results["pipeline_build_s"] = time.perf_counter() - start
+    # Justo antes del try/finally que la cierra (en Postgres crea el esquema de prueba)
+    db = (PostgresStandIn(args.postgres_dsn, epochs, values) if args.postgres_dsn
+          else SQLiteStandIn(epochs, values))
+    results["rss_mb"]["after_setup"] = peak_rss_mb()
+
+    run_ts_iso = datetime.now(timezone.utc).isoformat()
+    stages: dict = {}
+
+    def end_to_end():
+        w, ts = db.read_window()
+        out = create_prediction_output(pipeline.predict(w)[0], ts, "bench", pipeline.offset_hours)
+        db.write_output(out, run_ts_iso)
+
+    try:
+        stages["read_window"], (window, last_ts) = time_call(db.read_window, args.repeats)
+        stages["predict"], preds = time_call(lambda: pipeline.predict(window), args.repeats)
+        stages["format_output"], records = time_call(
+            lambda: create_prediction_output(preds[0], last_ts, "bench", pipeline.offset_hours), args.repeats)
+        stages["write_output"], _ = time_call(lambda: db.write_output(records, run_ts_iso), args.repeats)
+        stages["end_to_end"], _ = time_call(end_to_end, args.repeats)
+    finally:
+        db.close()  # En Postgres elimina el esquema de prueba
+    results["stages"] = stages
+    results["rss_mb"]["after_stages"] = peak_rss_mb()
+
+    # Throughput: ventanas consecutivas del sintético como vista (sin copias)
+    all_windows = sliding_window_view(values, (WINDOW_SIZE_HOURS, N_FEATURES))[:, 0]
+    throughput = []
+    for batch_size in batch_sizes:
+        batch = np.ascontiguousarray(all_windows[:batch_size])
+        repeats = max(3, min(args.repeats, args.repeats * 8 // batch_size))
+        stats, _ = time_call(lambda: pipeline.predict(batch), repeats)
+        throughput.append({
+            "batch_size": batch_size,
+            **stats,
+            "windows_per_s": batch_size / (stats["p50_ms"] / 1e3),
+            "peak_rss_mb": peak_rss_mb(),
+        })
+        logging.info(f"Lote {batch_size}: p50 {stats['p50_ms']:.1f} ms")
+    results["throughput"] = throughput
+    if not args.skip_engines:
+        results["engines"] = benchmark_engines(epochs, values, pipeline, args.repeats)
+    results["rss_mb"]["peak"] = peak_rss_mb()
+    return results
+
+
+def benchmark_engines(epochs: np.ndarray, values: np.ndarray, pipeline: ForecastPipeline,
+                      repeats: int) -> list[dict]:
+    """Ajusta los motores base con el 80% inicial y compara todos en ventanas diarias del resto."""
+    cut = int(len(values) * (1 - ENGINE_HOLDOUT_FRACTION))
+    starts = np.arange(cut, len(values) - 2 * WINDOW_SIZE_HOURS + 1, 24)
+    if starts.size == 0:
+        min_hours = int(np.ceil(2 * WINDOW_SIZE_HOURS / ENGINE_HOLDOUT_FRACTION))
+        logging.warning(f"Motores: el tramo de prueba no tiene ninguna ventana (se necesitan al menos "
+                        f"~{min_hours} horas de histórico); se omite la comparación.")
+        return []
+    engines = {"lstm": pipeline}
+    fit_s = {}
+    for name in ("seasonal_naive", "hour_of_week", "gbm_lags"):
+        start = time.perf_counter()
+        engines[name] = build_baseline_engine(name, epochs[:cut], values[:cut])
+        fit_s[name] = time.perf_counter() - start
+    windows = sliding_window_view(values, (WINDOW_SIZE_HOURS, N_FEATURES))[:, 0][starts]
+    outputs = sliding_window_view(values[:, -1].astype(np.float64), WINDOW_SIZE_HOURS)[starts + WINDOW_SIZE_HOURS]
+    actual = outputs[:, pipeline.offset_hours - 1:]
+    rows = compare_engines(engines, np.ascontiguousarray(windows), actual, repeats)
+    for row in rows:
+        row["fit_s"] = fit_s.get(row["engine"])
+    return rows
+
+
+def environment_info() -> dict:
+    """Metadatos para comparar corridas en el tiempo."""
+    import tensorflow as tf
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "tensorflow": tf.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmarks del camino de predicción (sin red).")
+    parser.add_argument("--output", default="benchmark_inference.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--history-hours", type=int, default=24 * 365)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--units", type=int, nargs=2, default=[100, 80], help="Unidades de las dos LSTM.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--postgres-dsn", default=os.environ.get("BENCH_POSTGRES_DSN"),
+                        help="Postgres de prueba; usa un esquema temporal bench_<pid> y lo elimina al terminar.")
+    parser.add_argument("--skip-import", action="store_true", help="No medir tiempo de importación.")
+    parser.add_argument("--skip-engines", action="store_true", help="No comparar con los motores base.")
+    args = parser.parse_args(argv)
+
+    report = {
+        "environment": environment_info(),
+        "config": {**vars(args), "database": "postgres" if args.postgres_dsn else "sqlite"},
+        "results": run_benchmarks(args),
+    }
+    report["config"].pop("postgres_dsn", None)  # Puede contener credenciales
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Resultados guardados en {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    main()
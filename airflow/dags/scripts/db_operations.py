@@ -7,11 +7,28 @@ import pendulum # Para parsear fechas/horas desde strings
 # --- FIN CORRECCIÓN ---
 
 # Otras importaciones necesarias que ya deberían estar
-from datetime import datetime
+from contextlib import closing
+from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.exceptions import AirflowNotFoundException, AirflowException
+from psycopg2.extras import execute_values
+
+from scripts.db_operations_prediction import (FEATURE_STATS_STATE_TABLE,
+                                              FEATURE_STATS_TABLE,
+                                              HISTORY_TABLE, MODEL_COLUMNS)
+from scripts.feature_stats import merge_stats, stats_from_rows, stats_to_rows
+
+# Horas recientes que se recalculan en cada corrida: cubren el rango que re-extrae la ingesta (15 días)
+STATS_LOOKBACK_HOURS = 16 * 24
+# Zona en que se interpreta demanda_historico.datetime: la ingesta guarda la hora de
+# pared de Bogotá etiquetada como UTC, así que las horas "locales" se leen en UTC
+HISTORY_TZ = "UTC"
+
+# Agregados de kWh por cubeta (hora local) que sirve /demand/historical/aggregate
+ROLLUP_TABLE = "demanda_historico_rollup"
+ROLLUP_RESOLUTIONS = ("day", "week", "month")
 
 def insertar_registros_demanda(records: list[dict], postgres_conn_id: str):
     """
@@ -111,4 +128,254 @@ def insertar_registros_demanda(records: list[dict], postgres_conn_id: str):
     logging.info(f"DB Ops: Proceso de inserción en '{target_table}' completado. Registros procesados: {total_processed}, Errores/Saltados: {error_count}")
 
     if error_count > 0:
-        raise AirflowException(f"{error_count} de {total_processed} registros fallaron durante la inserción en '{target_table}'. Revisar logs.")
\ No newline at end of file
+        raise AirflowException(f"{error_count} de {total_processed} registros fallaron durante la inserción en '{target_table}'. Revisar logs.")
+
+def insertar_demanda_entidades(df: pd.DataFrame, postgres_conn_id: str, page_size: int = 10000) -> int:
+    """
+    Inserta en bloque la demanda por entidad en 'demanda_historico_entidad'.
+
+    Espera las columnas de `extraer_demanda_entidades` (Entidad, Datetime,
+    Mes, Hour, Season, Dia_habil, kWh). Crea la tabla si no existe y usa
+    execute_values con ON CONFLICT (entidad, datetime) DO NOTHING.
+
+    Returns:
+        int: Número de filas enviadas.
+    """
+    if df is None or df.empty:
+        logging.info("DB Ops: No hay registros por entidad para insertar.")
+        return 0
+
+    target_table = "demanda_historico_entidad"
+    df = df.dropna(subset=['Entidad', 'Datetime', 'kWh'])
+    rows = zip(
+        df['Entidad'].astype(str).tolist(),
+        pd.to_datetime(df['Datetime']).dt.to_pydatetime().tolist(),
+        df['kWh'].astype(float).tolist(),
+        df['Mes'].astype(int).tolist(),
+        df['Hour'].astype(int).tolist(),
+        df['Season'].astype(int).tolist(),
+        df['Dia_habil'].astype(int).tolist(),
+    )
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {target_table} (
+                    entidad   VARCHAR NOT NULL,
+                    datetime  TIMESTAMPTZ NOT NULL,
+                    kwh       DOUBLE PRECISION,
+                    mes       INTEGER,
+                    hour      INTEGER,
+                    season    INTEGER,
+                    dia_habil INTEGER,
+                    PRIMARY KEY (entidad, datetime)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {target_table} (entidad, datetime, kwh, mes, hour, season, dia_habil)
+                VALUES %s
+                ON CONFLICT (entidad, datetime) DO NOTHING;
+            """, rows, page_size=page_size)
+
+    logging.info(f"DB Ops: {len(df)} registros por entidad enviados a '{target_table}'.")
+    return len(df)
+
+
+def _momentos_rango(cursor, desde: datetime | None, hasta: datetime | None) -> dict:
+    """
+    Estadísticas de las filas con kWh en (desde, hasta], agregadas en el servidor.
+
+    Un solo recorrido del rango: count/avg/var_pop/min/max por feature y por
+    hora de la semana del kWh (0 = lunes 00:00 hora de pared, leída en
+    `HISTORY_TZ` como la columna `hour`).
+    """
+    where, params = ["kwh IS NOT NULL"], [HISTORY_TZ, HISTORY_TZ]
+    if desde is not None:
+        where.append("datetime > %s")
+        params.append(desde)
+    if hasta is not None:
+        where.append("datetime <= %s")
+        params.append(hasta)
+
+    def agregados(col: str) -> str:
+        return (f"count({col}), avg({col}::float8), var_pop({col}::float8) * count({col}), "
+                f"min({col}::float8), max({col}::float8)")
+
+    globales = " UNION ALL ".join(f"SELECT '{c}', -1, {agregados(c)} FROM rango" for c in MODEL_COLUMNS)
+    cursor.execute(f"""
+        WITH rango AS (
+            SELECT {", ".join(MODEL_COLUMNS)},
+                   ((extract(isodow FROM datetime AT TIME ZONE %s) - 1) * 24
+                    + extract(hour FROM datetime AT TIME ZONE %s))::int AS hora_semana
+            FROM {HISTORY_TABLE}
+            WHERE {" AND ".join(where)}
+        )
+        {globales}
+        UNION ALL
+        SELECT 'kwh', hora_semana, {agregados("kwh")} FROM rango GROUP BY hora_semana;
+    """, params)
+    return stats_from_rows([row for row in cursor.fetchall() if row[2] > 0], MODEL_COLUMNS)
+
+
+def _escribir_segmento(cursor, segmento: str, stats: dict) -> int:
+    """Reemplaza las filas de un segmento ('frozen' o 'tail') de la tabla de estadísticas."""
+    rows = [(segmento, *row) for row in stats_to_rows(stats, MODEL_COLUMNS)]
+    cursor.execute(f"DELETE FROM {FEATURE_STATS_TABLE} WHERE segmento = %s;", (segmento,))
+    if rows:
+        execute_values(cursor, f"""
+            INSERT INTO {FEATURE_STATS_TABLE} (segmento, feature, hora_semana, n, mean, m2, min, max)
+            VALUES %s;
+        """, rows)
+    return len(rows)
+
+
+def actualizar_estadisticas_features(postgres_conn_id: str, lookback_hours: int = STATS_LOOKBACK_HOURS) -> dict:
+    """
+    Mantiene min/max, media y varianza (Welford) de las features en 'demanda_estadisticas_features'.
+
+    El histórico se divide en dos segmentos: 'frozen' (hasta `frozen_until`,
+    que la ingesta ya no toca) y 'tail' (las últimas `lookback_hours`, que
+    la ingesta puede completar). Cada corrida sólo agrega al segmento
+    congelado las horas que salieron de la cola, combinándolas con
+    `merge_moments`, y recalcula la cola; nunca re-lee el histórico completo.
+    Todo ocurre en una transacción con la tabla de estado bloqueada.
+
+    Returns:
+        dict: {"frozen_until", "n_frozen", "n_tail"} (filas de kWh por segmento).
+    """
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {FEATURE_STATS_TABLE} (
+                    segmento    VARCHAR NOT NULL,
+                    feature     VARCHAR NOT NULL,
+                    hora_semana SMALLINT NOT NULL,
+                    n           BIGINT NOT NULL,
+                    mean        DOUBLE PRECISION,
+                    m2          DOUBLE PRECISION,
+                    min         DOUBLE PRECISION,
+                    max         DOUBLE PRECISION,
+                    updated_at  TIMESTAMPTZ DEFAULT now(),
+                    PRIMARY KEY (segmento, feature, hora_semana)
+                );
+                CREATE TABLE IF NOT EXISTS {FEATURE_STATS_STATE_TABLE} (
+                    id           BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                    frozen_until TIMESTAMPTZ,
+                    updated_at   TIMESTAMPTZ DEFAULT now()
+                );
+                ALTER TABLE {FEATURE_STATS_STATE_TABLE} ADD COLUMN IF NOT EXISTS hora_semana_tz VARCHAR;
+            """)
+            cursor.execute(f"LOCK TABLE {FEATURE_STATS_STATE_TABLE} IN EXCLUSIVE MODE;")
+            cursor.execute(f"SELECT frozen_until, hora_semana_tz FROM {FEATURE_STATS_STATE_TABLE};")
+            row = cursor.fetchone()
+            frozen_until = row[0] if row else None
+            if row and row[1] != HISTORY_TZ:
+                # Horas de la semana calculadas en otra zona: se recalcula el segmento congelado
+                logging.info(f"DB Ops: Estadísticas con hora_semana en '{row[1]}'; se recalculan en '{HISTORY_TZ}'.")
+                cursor.execute(f"DELETE FROM {FEATURE_STATS_TABLE};")
+                frozen_until = None
+            cursor.execute(f"SELECT max(datetime) FROM {HISTORY_TABLE} WHERE kwh IS NOT NULL;")
+            last = cursor.fetchone()[0]
+            if last is None:
+                logging.info("DB Ops: Histórico vacío; no hay estadísticas que actualizar.")
+                return {"frozen_until": None, "n_frozen": 0, "n_tail": 0}
+
+            new_frozen = last - timedelta(hours=lookback_hours)
+            cursor.execute(f"""
+                SELECT feature, hora_semana, n, mean, m2, min, max
+                FROM {FEATURE_STATS_TABLE} WHERE segmento = 'frozen';
+            """)
+            frozen = stats_from_rows(cursor.fetchall(), MODEL_COLUMNS)
+            if frozen_until is None or new_frozen > frozen_until:
+                frozen = merge_stats(frozen, _momentos_rango(cursor, frozen_until, new_frozen))
+                _escribir_segmento(cursor, "frozen", frozen)
+                frozen_until = new_frozen
+            tail = _momentos_rango(cursor, frozen_until, None)
+            _escribir_segmento(cursor, "tail", tail)
+            cursor.execute(f"""
+                INSERT INTO {FEATURE_STATS_STATE_TABLE} (id, frozen_until, hora_semana_tz) VALUES (TRUE, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET frozen_until = EXCLUDED.frozen_until,
+                    hora_semana_tz = EXCLUDED.hora_semana_tz, updated_at = now();
+            """, (frozen_until, HISTORY_TZ))
+
+    kwh = MODEL_COLUMNS.index("kwh")
+    result = {"frozen_until": frozen_until.isoformat(), "n_frozen": int(frozen["features"]["n"][kwh]),
+              "n_tail": int(tail["features"]["n"][kwh])}
+    logging.info(f"DB Ops: Estadísticas de features actualizadas ({result['n_frozen']} filas congeladas "
+                 f"hasta {result['frozen_until']}, {result['n_tail']} en la cola).")
+    return result
+
+
+def actualizar_rollups_demanda(postgres_conn_id: str, lookback_hours: int = STATS_LOOKBACK_HOURS) -> int:
+    """
+    Refresca los agregados por día, semana y mes de 'demanda_historico_rollup'.
+
+    Sólo se recalculan las cubetas que contienen horas de las últimas
+    `lookback_hours` (las que la ingesta pudo tocar), desde el inicio de cada
+    cubeta, con un INSERT ... SELECT ... ON CONFLICT DO UPDATE. Si la tabla
+    está vacía (o tiene cubetas de un corte anterior) se agrega todo el
+    histórico. Las cubetas se cortan en `HISTORY_TZ`, el reloj en que se
+    guarda el histórico (hora de pared local; lunes para la semana).
+
+    Returns:
+        int: Número de cubetas escritas.
+    """
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+                    resolucion VARCHAR NOT NULL,
+                    bucket     TIMESTAMPTZ NOT NULL,
+                    n          INTEGER NOT NULL,
+                    kwh_sum    DOUBLE PRECISION,
+                    kwh_min    DOUBLE PRECISION,
+                    kwh_max    DOUBLE PRECISION,
+                    updated_at TIMESTAMPTZ DEFAULT now(),
+                    PRIMARY KEY (resolucion, bucket)
+                );
+            """)
+            # Cubetas que no empiezan en un corte de HISTORY_TZ (p. ej. cortadas en
+            # America/Bogota sobre datos ya locales): se descartan y se reconstruye todo
+            cursor.execute(f"""
+                DELETE FROM {ROLLUP_TABLE}
+                WHERE EXISTS (
+                    SELECT 1 FROM {ROLLUP_TABLE}
+                    WHERE bucket <> date_trunc(resolucion, bucket AT TIME ZONE %s) AT TIME ZONE %s
+                );
+            """, (HISTORY_TZ, HISTORY_TZ))
+            if cursor.rowcount:
+                logging.info(f"DB Ops: {cursor.rowcount} cubetas con otro corte eliminadas; se reconstruye '{ROLLUP_TABLE}'.")
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {ROLLUP_TABLE});")
+            desde = None
+            if cursor.fetchone()[0]:
+                cursor.execute(f"SELECT max(datetime) FROM {HISTORY_TABLE} WHERE kwh IS NOT NULL;")
+                last = cursor.fetchone()[0]
+                if last is None:
+                    logging.info("DB Ops: Histórico vacío; no hay agregados que refrescar.")
+                    return 0
+                desde = last - timedelta(hours=lookback_hours)
+
+            resoluciones = ", ".join(f"('{r}')" for r in ROLLUP_RESOLUTIONS)
+            cubeta = "date_trunc(r.res, h.datetime AT TIME ZONE %(tz)s) AT TIME ZONE %(tz)s"
+            desde_sql = "" if desde is None else \
+                "AND h.datetime >= date_trunc(r.res, %(desde)s AT TIME ZONE %(tz)s) AT TIME ZONE %(tz)s"
+            cursor.execute(f"""
+                INSERT INTO {ROLLUP_TABLE} (resolucion, bucket, n, kwh_sum, kwh_min, kwh_max)
+                SELECT r.res, {cubeta}, count(*), sum(h.kwh), min(h.kwh), max(h.kwh)
+                FROM {HISTORY_TABLE} h CROSS JOIN (VALUES {resoluciones}) AS r(res)
+                WHERE h.kwh IS NOT NULL {desde_sql}
+                GROUP BY 1, 2
+                ON CONFLICT (resolucion, bucket) DO UPDATE SET
+                    n = EXCLUDED.n,
+                    kwh_sum = EXCLUDED.kwh_sum,
+                    kwh_min = EXCLUDED.kwh_min,
+                    kwh_max = EXCLUDED.kwh_max,
+                    updated_at = now();
+            """, {"tz": HISTORY_TZ, "desde": desde})
+            n_buckets = cursor.rowcount
+
+    alcance = "todo el histórico" if desde is None else f"desde {desde.isoformat()}"
+    logging.info(f"DB Ops: {n_buckets} cubetas de '{ROLLUP_TABLE}' refrescadas ({alcance}).")
+    return n_buckets
@@ -1,19 +1,430 @@
 # -*- coding: utf-8 -*-
 # Archivo: scripts/db_operations_prediction.py
-"""Utilidades concisas para insertar predicciones en PostgreSQL."""
+"""Utilidades concisas para leer el histórico e insertar predicciones en PostgreSQL."""
 
+import hashlib
 import logging
-from datetime import datetime
+from contextlib import closing
+from datetime import datetime, timezone
 from typing import List, Dict
 
+import numpy as np
 import pendulum
 from airflow.exceptions import AirflowException
 from airflow.providers.postgres.hooks.postgres import PostgresHook
+from psycopg2.extras import execute_values
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import Table, MetaData
 
+from scripts.feature_stats import merge_stats, stats_from_rows
+
 # Tabla destino en la base de datos
 TARGET_TABLE = "demanda_prediccion"
+HISTORY_TABLE = "demanda_historico"
+RUNS_TABLE = "demanda_prediccion_corrida"
+HINDCAST_TABLE = "demanda_hindcast"
+MODEL_SCORES_TABLE = "demanda_prediccion_modelos"
+NOWCAST_TABLE = "demanda_nowcast"
+ENTITY_HISTORY_TABLE = "demanda_historico_entidad"
+ENTITY_TARGET_TABLE = "demanda_prediccion_entidad"
+SEARCH_TRIALS_TABLE = "demanda_busqueda_hiperparametros"
+FEATURE_STATS_TABLE = "demanda_estadisticas_features"
+FEATURE_STATS_STATE_TABLE = "demanda_estadisticas_estado"
+# Columnas del modelo en el orden de entrenamiento (Mes, Hour, Season, Dia_habil, kWh)
+MODEL_COLUMNS = ["mes", "hour", "season", "dia_habil", "kwh"]
+FETCH_CHUNK_ROWS = 1000
+
+
+def _decode_rows(cursor, values: np.ndarray, epochs: np.ndarray, fill: bool = False) -> int:
+    """Vuelca filas (datetime, *features) del cursor en arreglos preasignados.
+
+    Devuelve el número de filas leídas; falla si hay más filas que capacidad,
+    salvo con `fill=True`, donde se detiene al llenar los arreglos (lectura por bloques).
+    """
+    n = 0
+    while not fill or n < len(values):
+        chunk = cursor.fetchmany(min(FETCH_CHUNK_ROWS, len(values) - n) if fill else FETCH_CHUNK_ROWS)
+        if not chunk:
+            return n
+        k = len(chunk)
+        if n + k > len(values):
+            raise ValueError(f"La consulta devolvió más de {len(values)} filas.")
+        # None (kwh nulo) se convierte en NaN al asignar sobre float32
+        values[n:n + k] = [row[1:] for row in chunk]
+        epochs[n:n + k] = [row[0].timestamp() for row in chunk]
+        n += k
+    return n
+
+
+def fetch_history_array(
+    postgres_conn_id: str,
+    start: datetime | str | None = None,
+    end: datetime | str | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lee el histórico en [start, end] a arreglos NumPy preasignados.
+
+    Usa un cursor del lado del servidor (sin DataFrame intermedio) dentro de
+    una transacción REPEATABLE READ, de modo que el conteo usado para
+    preasignar coincide con las filas leídas.
+
+    Returns:
+        (epochs int64 (n,) en segundos UTC, valores float32 (n, 5) en orden del modelo)
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("datetime >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("datetime <= %s")
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {HISTORY_TABLE} {where};", params)
+            (n_expected,) = cursor.fetchone()
+        values = np.empty((n_expected, len(MODEL_COLUMNS)), dtype=np.float32)
+        epochs = np.empty(n_expected, dtype=np.int64)
+        with conn.cursor(name="historico_stream") as cursor:
+            cursor.itersize = FETCH_CHUNK_ROWS
+            cursor.execute(
+                f"SELECT datetime, {', '.join(MODEL_COLUMNS)} FROM {HISTORY_TABLE} {where} ORDER BY datetime ASC;",
+                params,
+            )
+            n_rows = _decode_rows(cursor, values, epochs)
+        conn.rollback()
+
+    logging.info(f"DB Ops: Histórico leído a NumPy ({n_rows} filas).")
+    return epochs[:n_rows], values[:n_rows]
+
+
+def fetch_prediction_window(
+    postgres_conn_id: str,
+    hours: int = 336
+) -> tuple[np.ndarray, datetime]:
+    """
+    Lee las últimas `hours` horas directamente a un arreglo float32 (hours, 5).
+
+    Filtra por rango de tiempo (`datetime > último_ts - hours`) para que la
+    consulta sea un range scan sobre el índice de `datetime` y trae sólo las
+    cinco columnas del modelo. Valida que la ventana esté completa, sin
+    huecos horarios ni nulos, y que el arreglo sea C-contiguo.
+
+    Returns:
+        (ventana float32 (hours, 5) en orden ASC, timestamp de la última hora)
+    """
+    sql = f"""
+        SELECT datetime, {", ".join(MODEL_COLUMNS)}
+        FROM {HISTORY_TABLE}
+        WHERE datetime > (SELECT max(datetime) FROM {HISTORY_TABLE}) - make_interval(hours => %s)
+        ORDER BY datetime ASC;
+    """
+    window = np.empty((hours, len(MODEL_COLUMNS)), dtype=np.float32)
+    epochs = np.empty(hours, dtype=np.int64)
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn, conn.cursor() as cursor:
+        cursor.execute(sql, (hours,))
+        n_rows = _decode_rows(cursor, window, epochs)
+
+    if n_rows < hours:
+        raise ValueError(f"Datos históricos insuficientes ({n_rows}/{hours}).")
+    if not np.all(np.diff(epochs) == 3600):
+        raise ValueError("La ventana histórica tiene huecos o duplicados horarios.")
+    if np.isnan(window).any():
+        raise ValueError("La ventana histórica contiene valores nulos.")
+    if not window.flags.c_contiguous:
+        raise ValueError("La ventana histórica no es C-contigua.")
+    last_ts = datetime.fromtimestamp(int(epochs[-1]), tz=timezone.utc)
+
+    logging.info(f"DB Ops: Ventana histórica leída ({n_rows} filas). Último ts: {last_ts}")
+    return window, last_ts
+
+
+def fetch_entity_windows(
+    postgres_conn_id: str,
+    hours: int = 336,
+    entities: List[str] | None = None
+) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """
+    Lee las últimas `hours` horas de cada entidad a un arreglo (N, hours, 5).
+
+    Primero obtiene la última hora de cada entidad y preasigna el arreglo con
+    NaN; luego recorre las filas con un cursor del servidor y las coloca por
+    (entidad, posición horaria) de forma vectorizada. Las entidades con
+    huecos o nulos en su ventana se descartan con un aviso.
+
+    Returns:
+        (entidades, ventanas float32 (N, hours, 5), última hora por entidad int64 (N,) epochs UTC)
+    """
+    where, params = "", []
+    if entities:
+        where, params = "WHERE entidad = ANY(%s)", [list(entities)]
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT entidad, max(datetime) FROM {ENTITY_HISTORY_TABLE} {where} "
+                f"GROUP BY entidad ORDER BY entidad;", params,
+            )
+            last_rows = cursor.fetchall()
+        names = [row[0] for row in last_rows]
+        last_epochs = np.array([row[1].timestamp() for row in last_rows], dtype=np.int64)
+        windows = np.full((len(names), hours, len(MODEL_COLUMNS)), np.nan, dtype=np.float32)
+        index = {name: i for i, name in enumerate(names)}
+
+        with conn.cursor(name="historico_entidad_stream") as cursor:
+            cursor.itersize = FETCH_CHUNK_ROWS
+            cursor.execute(f"""
+                SELECT h.entidad, h.datetime, {", ".join("h." + c for c in MODEL_COLUMNS)}
+                FROM {ENTITY_HISTORY_TABLE} h
+                JOIN (SELECT entidad, max(datetime) AS last_ts FROM {ENTITY_HISTORY_TABLE} {where}
+                      GROUP BY entidad) u USING (entidad)
+                WHERE h.datetime > u.last_ts - make_interval(hours => %s);
+            """, params + [hours])
+            while True:
+                chunk = cursor.fetchmany(FETCH_CHUNK_ROWS)
+                if not chunk:
+                    break
+                k = len(chunk)
+                rows = np.fromiter((index[row[0]] for row in chunk), dtype=np.intp, count=k)
+                epochs = np.fromiter((row[1].timestamp() for row in chunk), dtype=np.int64, count=k)
+                positions = hours - 1 - (last_epochs[rows] - epochs) // 3600
+                windows[rows, positions] = [row[2:] for row in chunk]
+        conn.rollback()
+
+    complete = ~np.isnan(windows).any(axis=(1, 2))
+    if not complete.all():
+        dropped = [name for name, ok in zip(names, complete) if not ok]
+        logging.warning(f"DB Ops: {len(dropped)} entidades sin ventana completa descartadas: {dropped[:20]}")
+    names = [name for name, ok in zip(names, complete) if ok]
+    windows = np.ascontiguousarray(windows[complete])
+    logging.info(f"DB Ops: Ventanas por entidad leídas ({windows.shape[0]} x {hours}).")
+    return names, windows, last_epochs[complete]
+
+
+def fetch_first_monday(postgres_conn_id: str, tz: str = "UTC") -> datetime | None:
+    """
+    Primera hora del histórico que cae en lunes 00:00 (hora local).
+
+    `tz` es "UTC" porque `demanda_historico` guarda la hora de pared de
+    Bogotá etiquetada como UTC (igual que `windows.align_to_monday`).
+    """
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    row = hook.get_first(f"""
+        SELECT min(datetime) FROM {HISTORY_TABLE}
+        WHERE extract(isodow FROM datetime AT TIME ZONE %s) = 1
+          AND extract(hour FROM datetime AT TIME ZONE %s) = 0;
+    """, parameters=(tz, tz))
+    return row[0] if row else None
+
+
+def fetch_history_fingerprint(postgres_conn_id: str, start: datetime | None = None) -> Dict:
+    """
+    Huella del histórico (filas con kWh) calculada en el servidor.
+
+    Devuelve {"n_rows", "first_epoch", "last_epoch", "digest"}; `digest` es el
+    MD5 de todas las filas en orden, así cualquier corrección puntual cambia
+    la huella sin transferir los datos.
+    """
+    where, params = "WHERE kwh IS NOT NULL", []
+    if start is not None:
+        where, params = where + " AND datetime >= %s", [start]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    n_rows, first_ts, last_ts, digest = hook.get_first(f"""
+        SELECT count(*), min(datetime), max(datetime),
+               md5(string_agg(concat_ws(',', extract(epoch FROM datetime)::bigint, {", ".join(MODEL_COLUMNS)}),
+                              ';' ORDER BY datetime))
+        FROM {HISTORY_TABLE} {where};
+    """, parameters=params)
+    return {
+        "n_rows": int(n_rows),
+        "first_epoch": int(first_ts.timestamp()) if first_ts else None,
+        "last_epoch": int(last_ts.timestamp()) if last_ts else None,
+        "digest": digest,
+    }
+
+
+def fetch_leading_bounds(
+    postgres_conn_id: str,
+    n_rows: int,
+    start: datetime | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Mínimos y máximos por columna del modelo en las primeras `n_rows` filas (tramo de entrenamiento)."""
+    where, params = "WHERE kwh IS NOT NULL", []
+    if start is not None:
+        where, params = where + " AND datetime >= %s", [start]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    row = hook.get_first(f"""
+        WITH head AS (
+            SELECT {", ".join(MODEL_COLUMNS)} FROM {HISTORY_TABLE} {where}
+            ORDER BY datetime ASC LIMIT %s
+        )
+        SELECT {", ".join(f"min({c})" for c in MODEL_COLUMNS)}, {", ".join(f"max({c})" for c in MODEL_COLUMNS)}
+        FROM head;
+    """, parameters=params + [n_rows])
+    bounds = np.asarray(row, dtype=np.float64)
+    return bounds[:len(MODEL_COLUMNS)], bounds[len(MODEL_COLUMNS):]
+
+
+def fetch_feature_stats(postgres_conn_id: str) -> Dict | None:
+    """
+    Lee las estadísticas incrementales de las features (una fila por grupo, sin recorrer el histórico).
+
+    Devuelve {"frozen", "tail", "total", "frozen_until"}, cada segmento como
+    {"features", "kwh_hour_of_week"} de `scripts.feature_stats`, o None si
+    la ingesta aún no las ha calculado.
+    """
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    if hook.get_first("SELECT to_regclass(%s);", parameters=(FEATURE_STATS_STATE_TABLE,))[0] is None:
+        return None
+    state = hook.get_first(f"SELECT frozen_until FROM {FEATURE_STATS_STATE_TABLE};")
+    if state is None:
+        return None
+    rows = hook.get_records(f"""
+        SELECT segmento, feature, hora_semana, n, mean, m2, min, max FROM {FEATURE_STATS_TABLE};
+    """)
+    segments = {
+        segment: stats_from_rows([row[1:] for row in rows if row[0] == segment], MODEL_COLUMNS)
+        for segment in ("frozen", "tail")
+    }
+    return {**segments, "total": merge_stats(segments["frozen"], segments["tail"]), "frozen_until": state[0]}
+
+
+def iter_history_chunks(
+    postgres_conn_id: str,
+    start: datetime | None = None,
+    chunk_rows: int = 50 * FETCH_CHUNK_ROWS
+):
+    """
+    Recorre el histórico (filas con kWh) en orden con un cursor del servidor.
+
+    Genera (epochs int64 (k,), valores float32 (k, 5)) por bloque, de modo que
+    la memoria usada no depende del tamaño del histórico.
+    """
+    where, params = "WHERE kwh IS NOT NULL", []
+    if start is not None:
+        where, params = where + " AND datetime >= %s", [start]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        conn.set_session(readonly=True)
+        with conn.cursor(name="historico_chunks") as cursor:
+            cursor.itersize = chunk_rows
+            cursor.execute(
+                f"SELECT datetime, {', '.join(MODEL_COLUMNS)} FROM {HISTORY_TABLE} {where} ORDER BY datetime ASC;",
+                params,
+            )
+            while True:
+                values = np.empty((chunk_rows, len(MODEL_COLUMNS)), dtype=np.float32)
+                epochs = np.empty(chunk_rows, dtype=np.int64)
+                n_rows = _decode_rows(cursor, values, epochs, fill=True)
+                if n_rows == 0:
+                    break
+                yield epochs[:n_rows], values[:n_rows]
+        conn.rollback()
+
+
+def compute_input_digest(
+    window: np.ndarray,
+    model_version: str,
+    artifact_etags: Dict[str, str]
+) -> str:
+    """Huella SHA-256 de (versión de modelo, ETags de artefactos, bytes de la ventana)."""
+    digest = hashlib.sha256()
+    digest.update(model_version.encode("utf-8"))
+    for name in sorted(artifact_etags):
+        digest.update(f"|{name}={artifact_etags[name]}".encode("utf-8"))
+    window = np.ascontiguousarray(window, dtype=np.float32)
+    digest.update(str(window.shape).encode("utf-8"))
+    digest.update(window.tobytes())
+    return digest.hexdigest()
+
+
+def ensure_runs_table(hook: PostgresHook) -> None:
+    """Crea la tabla de metadatos de corridas si no existe."""
+    hook.run(f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            prediction_run_ts TIMESTAMPTZ PRIMARY KEY,
+            model_version     VARCHAR NOT NULL,
+            artifact_etags    VARCHAR,
+            input_digest      CHAR(64) NOT NULL,
+            last_input_ts     TIMESTAMPTZ,
+            n_predictions     INTEGER NOT NULL,
+            reused_from       TIMESTAMPTZ,
+            created_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS ix_{RUNS_TABLE}_digest ON {RUNS_TABLE} (input_digest);
+    """)
+
+
+def find_cached_run(postgres_conn_id: str, input_digest: str) -> Dict | None:
+    """
+    Busca una corrida previa con la misma huella cuyo pronóstico siga intacto.
+
+    Devuelve {"source_run_ts", "n_predictions"} si las filas de esa corrida
+    siguen en la tabla de predicciones (nadie las sobrescribió), o None.
+    """
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    ensure_runs_table(hook)
+    row = hook.get_first(f"""
+        SELECT COALESCE(r.reused_from, r.prediction_run_ts) AS source_run_ts, r.n_predictions
+        FROM {RUNS_TABLE} r
+        WHERE r.input_digest = %s
+        ORDER BY r.prediction_run_ts DESC
+        LIMIT 1;
+    """, parameters=(input_digest,))
+    if row is None:
+        return None
+    source_run_ts, n_predictions = row
+    (n_present,) = hook.get_first(
+        f"SELECT count(*) FROM {TARGET_TABLE} WHERE prediction_run_ts = %s;",
+        parameters=(source_run_ts,),
+    )
+    if n_present != n_predictions:
+        logging.info(f"DB Ops: Corrida {source_run_ts} coincide pero sus filas fueron reemplazadas "
+                     f"({n_present}/{n_predictions}).")
+        return None
+    return {"source_run_ts": source_run_ts.isoformat(), "n_predictions": n_predictions}
+
+
+def record_prediction_run(
+    postgres_conn_id: str,
+    prediction_run_ts_iso: str,
+    model_version: str,
+    artifact_etags: Dict[str, str],
+    input_digest: str,
+    last_input_ts_iso: str,
+    n_predictions: int,
+    reused_from_iso: str | None = None
+) -> None:
+    """Registra (o actualiza) los metadatos de una corrida de predicción."""
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    ensure_runs_table(hook)
+    etags = ",".join(f"{k}={artifact_etags[k]}" for k in sorted(artifact_etags))
+    hook.run(f"""
+        INSERT INTO {RUNS_TABLE} (prediction_run_ts, model_version, artifact_etags, input_digest,
+                                  last_input_ts, n_predictions, reused_from)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (prediction_run_ts) DO UPDATE SET
+            model_version = EXCLUDED.model_version,
+            artifact_etags = EXCLUDED.artifact_etags,
+            input_digest = EXCLUDED.input_digest,
+            last_input_ts = EXCLUDED.last_input_ts,
+            n_predictions = EXCLUDED.n_predictions,
+            reused_from = EXCLUDED.reused_from;
+    """, parameters=(
+        pendulum.parse(prediction_run_ts_iso), model_version, etags, input_digest,
+        pendulum.parse(last_input_ts_iso), n_predictions,
+        pendulum.parse(reused_from_iso) if reused_from_iso else None,
+    ))
+    logging.info(f"DB Ops: Corrida {prediction_run_ts_iso} registrada "
+                 f"({'reutilizada de ' + reused_from_iso if reused_from_iso else 'nueva'}).")
+
 
 def insert_predictions(
     predictions_list: List[Dict], 
@@ -83,4 +494,256 @@ def insert_predictions(
 
     except Exception as e:
         logging.error(f"DB Ops: Error en operación UPSERT: {e}", exc_info=True)
-        raise AirflowException(f"Fallo en UPSERT: {e}")
\ No newline at end of file
+        raise AirflowException(f"Fallo en UPSERT: {e}")
+
+
+def insert_hindcast(
+    origin_epochs: np.ndarray,
+    preds: np.ndarray,
+    offset_hours: int,
+    model_version: str,
+    postgres_conn_id: str,
+    page_size: int = 10000
+) -> int:
+    """
+    Escribe en bloque los pronósticos retrospectivos (hindcast) con su origen.
+
+    `origin_epochs[i]` es la última hora observada del origen i y `preds[i, j]`
+    el pronóstico para origen + offset_hours + j. Hace UPSERT por
+    (model_version, origin_ts, prediction_for_datetime) para que re-ejecutar
+    sea idempotente.
+    """
+    n_origins, horizon = preds.shape
+    origins = np.asarray(origin_epochs, dtype=np.int64).astype("datetime64[s]")
+    steps = (offset_hours + np.arange(horizon)).astype("timedelta64[h]")
+    for_ts = origins[:, np.newaxis] + steps[np.newaxis, :]
+    origin_iso = np.repeat(np.datetime_as_string(origins, timezone="UTC"), horizon)
+    for_iso = np.datetime_as_string(for_ts.ravel(), timezone="UTC")
+    rows = zip(origin_iso.tolist(), for_iso.tolist(),
+               preds.astype(np.float64).ravel().tolist(), [model_version] * preds.size)
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {HINDCAST_TABLE} (
+                    model_version           VARCHAR NOT NULL,
+                    origin_ts               TIMESTAMPTZ NOT NULL,
+                    prediction_for_datetime TIMESTAMPTZ NOT NULL,
+                    predicted_kwh           DOUBLE PRECISION,
+                    PRIMARY KEY (model_version, origin_ts, prediction_for_datetime)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {HINDCAST_TABLE} (origin_ts, prediction_for_datetime, predicted_kwh, model_version)
+                VALUES %s
+                ON CONFLICT (model_version, origin_ts, prediction_for_datetime)
+                DO UPDATE SET predicted_kwh = EXCLUDED.predicted_kwh;
+            """, rows, page_size=page_size)
+
+    logging.info(f"DB Ops: Hindcast escrito ({n_origins} orígenes x {horizon} pasos).")
+    return preds.size
+
+
+def insert_nowcast(
+    records: List[Dict],
+    origin_ts,
+    prediction_run_ts_iso: str,
+    postgres_conn_id: str,
+    page_size: int = 10000
+) -> int:
+    """
+    Guarda el pronóstico vigente del nowcast en su propia tabla.
+
+    La clave es (model_version, prediction_for_datetime): cada hora se
+    actualiza el pronóstico de las mismas horas futuras sin tocar
+    `demanda_prediccion`, que sigue sirviendo la corrida semanal del campeón.
+    `origin_ts` es la última hora observada con la que se calculó.
+    """
+    if not records:
+        logging.info("DB Ops: No hay predicciones de nowcast para insertar.")
+        return 0
+    run_ts = pendulum.parse(prediction_run_ts_iso)
+    rows = [
+        (r["model_version"], r["prediction_for_datetime"], r["predicted_kwh"], origin_ts, run_ts)
+        for r in records
+    ]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {NOWCAST_TABLE} (
+                    model_version           VARCHAR NOT NULL,
+                    prediction_for_datetime TIMESTAMPTZ NOT NULL,
+                    predicted_kwh           DOUBLE PRECISION,
+                    origin_ts               TIMESTAMPTZ NOT NULL,
+                    prediction_run_ts       TIMESTAMPTZ NOT NULL,
+                    PRIMARY KEY (model_version, prediction_for_datetime)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {NOWCAST_TABLE}
+                    (model_version, prediction_for_datetime, predicted_kwh, origin_ts, prediction_run_ts)
+                VALUES %s
+                ON CONFLICT (model_version, prediction_for_datetime)
+                DO UPDATE SET predicted_kwh = EXCLUDED.predicted_kwh,
+                              origin_ts = EXCLUDED.origin_ts,
+                              prediction_run_ts = EXCLUDED.prediction_run_ts;
+            """, rows, page_size=page_size)
+    logging.info(f"DB Ops: {len(rows)} predicciones de nowcast guardadas (origen {origin_ts}).")
+    return len(rows)
+
+
+def insert_model_scores(
+    records: List[Dict],
+    prediction_run_ts_iso: str,
+    postgres_conn_id: str,
+    page_size: int = 10000
+) -> int:
+    """
+    Guarda en un solo UPSERT las predicciones de varias versiones de modelo.
+
+    Cada registro trae `model_version`; la clave es
+    (model_version, prediction_run_ts, prediction_for_datetime), así campeón
+    y retadores conviven sin pisarse.
+    """
+    if not records:
+        logging.info("DB Ops: No hay predicciones de modelos para insertar.")
+        return 0
+    run_ts = pendulum.parse(prediction_run_ts_iso)
+    rows = [
+        (r["model_version"], run_ts, r["prediction_for_datetime"], r["predicted_kwh"])
+        for r in records
+    ]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {MODEL_SCORES_TABLE} (
+                    model_version           VARCHAR NOT NULL,
+                    prediction_run_ts       TIMESTAMPTZ NOT NULL,
+                    prediction_for_datetime TIMESTAMPTZ NOT NULL,
+                    predicted_kwh           DOUBLE PRECISION,
+                    PRIMARY KEY (model_version, prediction_run_ts, prediction_for_datetime)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {MODEL_SCORES_TABLE} (model_version, prediction_run_ts, prediction_for_datetime, predicted_kwh)
+                VALUES %s
+                ON CONFLICT (model_version, prediction_run_ts, prediction_for_datetime)
+                DO UPDATE SET predicted_kwh = EXCLUDED.predicted_kwh;
+            """, rows, page_size=page_size)
+    logging.info(f"DB Ops: {len(rows)} predicciones de modelos guardadas para corrida {prediction_run_ts_iso}.")
+    return len(rows)
+
+
+def insert_entity_predictions(
+    entities: List[str],
+    last_epochs: np.ndarray,
+    preds: np.ndarray,
+    offset_hours: int,
+    model_version: str,
+    prediction_run_ts_iso: str,
+    postgres_conn_id: str,
+    page_size: int = 10000
+) -> int:
+    """
+    Escribe en bloque las predicciones de N entidades (N, horizonte).
+
+    Los timestamps se calculan para todas las entidades a la vez por
+    broadcasting sobre la última hora de cada una. Hace UPSERT por
+    (entidad, prediction_for_datetime), igual que la tabla del sistema.
+    """
+    n_entities, horizon = preds.shape
+    if n_entities == 0:
+        logging.info("DB Ops: No hay predicciones por entidad para insertar.")
+        return 0
+    lasts = np.asarray(last_epochs, dtype=np.int64).astype("datetime64[s]").astype("datetime64[h]")
+    steps = (offset_hours + np.arange(horizon)).astype("timedelta64[h]")
+    for_iso = np.datetime_as_string((lasts[:, np.newaxis] + steps).ravel(), unit="s", timezone="UTC")
+    run_ts = pendulum.parse(prediction_run_ts_iso)
+    rows = zip(np.repeat(np.asarray(entities, dtype=object), horizon).tolist(), for_iso.tolist(),
+               preds.astype(np.float64).ravel().tolist(),
+               [model_version] * preds.size, [run_ts] * preds.size)
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ENTITY_TARGET_TABLE} (
+                    entidad                 VARCHAR NOT NULL,
+                    prediction_for_datetime TIMESTAMPTZ NOT NULL,
+                    predicted_kwh           DOUBLE PRECISION,
+                    model_version           VARCHAR,
+                    prediction_run_ts       TIMESTAMPTZ,
+                    PRIMARY KEY (entidad, prediction_for_datetime)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {ENTITY_TARGET_TABLE}
+                    (entidad, prediction_for_datetime, predicted_kwh, model_version, prediction_run_ts)
+                VALUES %s
+                ON CONFLICT (entidad, prediction_for_datetime) DO UPDATE SET
+                    predicted_kwh = EXCLUDED.predicted_kwh,
+                    model_version = EXCLUDED.model_version,
+                    prediction_run_ts = EXCLUDED.prediction_run_ts;
+            """, rows, page_size=page_size)
+
+    logging.info(f"DB Ops: Predicciones por entidad escritas ({n_entities} entidades x {horizon} pasos).")
+    return preds.size
+
+
+def insert_search_trials(search: Dict, postgres_conn_id: str) -> int:
+    """
+    Registra todos los ensayos de una búsqueda de hiperparámetros (completos, podados y fallidos).
+
+    La clave es (search_id, trial_id); re-ejecutar la escritura de la misma
+    búsqueda actualiza las filas en lugar de duplicarlas.
+    """
+    trials = search["trials"]
+    if not trials:
+        logging.info("DB Ops: La búsqueda no tiene ensayos para registrar.")
+        return 0
+    rows = [
+        (search["search_id"], t["trial_id"], search["snapshot"], "-".join(map(str, t["config"]["units"])),
+         t["config"]["learning_rate"], t["config"]["batch_size"], t["config"]["step"], t["status"],
+         t["best_val_loss"], t["val_mae_kwh"], t["epochs_run"], t["pruned_at_epoch"], t.get("duration_s"))
+        for t in trials
+    ]
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    with closing(hook.get_conn()) as conn:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {SEARCH_TRIALS_TABLE} (
+                    search_id        VARCHAR NOT NULL,
+                    trial_id         INTEGER NOT NULL,
+                    dataset_snapshot VARCHAR,
+                    units            VARCHAR,
+                    learning_rate    DOUBLE PRECISION,
+                    batch_size       INTEGER,
+                    step_hours       INTEGER,
+                    status           VARCHAR,
+                    best_val_loss    DOUBLE PRECISION,
+                    val_mae_kwh      DOUBLE PRECISION,
+                    epochs_run       INTEGER,
+                    pruned_at_epoch  INTEGER,
+                    duration_s       DOUBLE PRECISION,
+                    created_at       TIMESTAMPTZ DEFAULT now(),
+                    PRIMARY KEY (search_id, trial_id)
+                );
+            """)
+            execute_values(cursor, f"""
+                INSERT INTO {SEARCH_TRIALS_TABLE}
+                    (search_id, trial_id, dataset_snapshot, units, learning_rate, batch_size, step_hours,
+                     status, best_val_loss, val_mae_kwh, epochs_run, pruned_at_epoch, duration_s)
+                VALUES %s
+                ON CONFLICT (search_id, trial_id) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    best_val_loss = EXCLUDED.best_val_loss,
+                    val_mae_kwh = EXCLUDED.val_mae_kwh,
+                    epochs_run = EXCLUDED.epochs_run,
+                    pruned_at_epoch = EXCLUDED.pruned_at_epoch,
+                    duration_s = EXCLUDED.duration_s;
+            """, rows)
+    logging.info(f"DB Ops: {len(rows)} ensayos de la búsqueda {search['search_id']} registrados.")
+    return len(rows)
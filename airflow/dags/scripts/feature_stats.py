@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/feature_stats.py
+"""Estadísticas incrementales de las features del modelo (sin BD ni Airflow).
+
+Cada grupo de estadísticas son arreglos paralelos `n, mean, m2, min, max`
+(m2 = suma de cuadrados de desviaciones, Welford). Dos grupos se combinan con
+la actualización de Welford por bloques (Chan et al.), así un lote nuevo se
+agrega sin volver a leer lo ya acumulado, y el resultado es exacto.
+
+Se usan dos tamaños: por feature (5, en el orden del modelo) y por hora de
+la semana del kWh (168, 0 = lunes 00:00 hora de pared, como la columna `hour`).
+"""
+
+import numpy as np
+
+from scripts.prediction_utils import TARGET_FEATURE_INDEX
+
+HOURS_PER_WEEK = 168
+MOMENT_FIELDS = ("n", "mean", "m2", "min", "max")
+DRIFT_Z_THRESHOLD = 3.0
+
+
+def empty_moments(size: int) -> dict[str, np.ndarray]:
+    """Estadísticas neutras para `size` grupos (n = 0)."""
+    return {"n": np.zeros(size), "mean": np.zeros(size), "m2": np.zeros(size),
+            "min": np.full(size, np.inf), "max": np.full(size, -np.inf)}
+
+
+def merge_moments(a: dict, b: dict) -> dict[str, np.ndarray]:
+    """Combina dos grupos de estadísticas (vectorizado; grupos con n = 0 no aportan)."""
+    n = a["n"] + b["n"]
+    safe_n = np.where(n > 0, n, 1)
+    delta = b["mean"] - a["mean"]
+    return {
+        "n": n,
+        "mean": a["mean"] + delta * b["n"] / safe_n,
+        "m2": a["m2"] + b["m2"] + delta ** 2 * a["n"] * b["n"] / safe_n,
+        "min": np.minimum(a["min"], b["min"]),
+        "max": np.maximum(a["max"], b["max"]),
+    }
+
+
+def variance(moments: dict) -> np.ndarray:
+    """Varianza poblacional por grupo (0 donde n = 0)."""
+    return np.divide(moments["m2"], moments["n"], out=np.zeros_like(moments["m2"]), where=moments["n"] > 0)
+
+
+def drift_scores(reference: dict, recent: dict) -> np.ndarray:
+    """
+    Desplazamiento de la media reciente en desviaciones estándar de la referencia, por grupo.
+
+    z = (media_reciente - media_ref) / sqrt(var_ref); NaN donde algún grupo está vacío.
+    """
+    std = np.sqrt(variance(reference))
+    valid = (reference["n"] > 1) & (recent["n"] > 0) & (std > 0)
+    return np.where(valid, (recent["mean"] - reference["mean"]) / np.where(valid, std, 1.0), np.nan)
+
+
+def drift_report(reference: dict, recent: dict, features: list[str],
+                 threshold: float = DRIFT_Z_THRESHOLD) -> dict:
+    """Resumen de deriva por feature y por hora de la semana del kWh."""
+    z_features = drift_scores(reference["features"], recent["features"])
+    z_hours = drift_scores(reference["kwh_hour_of_week"], recent["kwh_hour_of_week"])
+    finite_hours = np.abs(z_hours[np.isfinite(z_hours)])
+    flagged = [name for name, z in zip(features, z_features) if np.isfinite(z) and abs(z) > threshold]
+    return {
+        "z_by_feature": {name: (None if not np.isfinite(z) else float(z)) for name, z in zip(features, z_features)},
+        "kwh_hour_of_week_max_abs_z": float(finite_hours.max()) if finite_hours.size else None,
+        "kwh_hours_flagged": int((finite_hours > threshold).sum()),
+        "features_flagged": flagged,
+        "threshold": threshold,
+        "drift": bool(flagged) or bool((finite_hours > threshold).any()),
+    }
+
+
+def merge_stats(a: dict, b: dict) -> dict:
+    """Combina dos juegos {"features", "kwh_hour_of_week"} grupo a grupo."""
+    return {group: merge_moments(a[group], b[group]) for group in a}
+
+
+def empty_stats(n_features: int) -> dict:
+    """Juego de estadísticas vacío: por feature y por hora de la semana del kWh."""
+    return {"features": empty_moments(n_features), "kwh_hour_of_week": empty_moments(HOURS_PER_WEEK)}
+
+
+def stats_from_rows(rows, features: list[str]) -> dict:
+    """
+    Arma el juego de estadísticas desde filas (feature, hora_semana, n, mean, m2, min, max).
+
+    `hora_semana = -1` es el global de la feature; 0..167 son las horas de la
+    semana del kWh. Los grupos sin fila quedan vacíos.
+    """
+    stats = empty_stats(len(features))
+    index = {name: i for i, name in enumerate(features)}
+    for feature, hour, *values in rows:
+        group, i = ("features", index[feature]) if hour < 0 else ("kwh_hour_of_week", hour)
+        for field, value in zip(MOMENT_FIELDS, values):
+            stats[group][field][i] = value
+    return stats
+
+
+def stats_to_rows(stats: dict, features: list[str]) -> list[tuple]:
+    """Inverso de `stats_from_rows`; omite los grupos vacíos (n = 0)."""
+    groups = [("features", name, -1, i) for i, name in enumerate(features)]
+    groups += [("kwh_hour_of_week", features[TARGET_FEATURE_INDEX], h, h) for h in range(HOURS_PER_WEEK)]
+    return [
+        (name, hour, *(float(stats[group][field][i]) for field in MOMENT_FIELDS))
+        for group, name, hour, i in groups
+        if stats[group]["n"][i] > 0
+    ]
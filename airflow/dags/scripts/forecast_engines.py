@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/forecast_engines.py
+"""Motores de pronóstico base, intercambiables con el LSTM.
+
+Exponen la misma interfaz que `prediction_utils.ForecastPipeline`:
+`horizon`, `offset_hours` y `predict(windows) -> (N, horizon)` en kWh sobre
+ventanas crudas (336, 5) o (N, 336, 5), así que `create_prediction_output`
+y las tablas de destino no cambian. No dependen de TensorFlow: sirven de
+respaldo cuando no está instalado o los artefactos no están disponibles, y
+de referencia barata para comparar el LSTM.
+
+    seasonal_naive  repite la última semana de la ventana
+    hour_of_week    promedio por hora de la semana de las semanas de la
+                    ventana, llevado al nivel de la última semana
+    gbm_lags        gradient boosting sobre rezagos semanales y de nivel,
+                    ajustado con el histórico (una sola fila por paso)
+
+Como la ventana (336h) es múltiplo de una semana, el paso j de la salida cae
+en la misma hora de la semana que la posición `j % 168` de cada semana de la
+entrada; no hacen falta timestamps.
+"""
+
+import logging
+import time
+
+import joblib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from scripts.prediction_utils import (DISCARD_FIRST_STEPS, N_FEATURES,
+                                      WINDOW_SIZE_HOURS)
+
+SEASON_HOURS = 168
+HOUR_SECONDS = 3600
+# Posiciones en ['Mes', 'Hour', 'Season', 'Dia_habil', 'kWh']
+MONTH_INDEX, HOUR_INDEX, DIA_HABIL_INDEX, KWH_INDEX = 0, 1, 3, 4
+GBM_TRAIN_STEP = 24
+
+
+def seasonal_naive(inputs_kwh: np.ndarray, horizon: int = WINDOW_SIZE_HOURS,
+                   season: int = SEASON_HOURS) -> np.ndarray:
+    """Repite la última temporada de cada entrada (N, window) hasta cubrir `horizon` horas."""
+    last = inputs_kwh[:, -season:]
+    return last[:, np.arange(horizon) % season]
+
+
+def _as_batch(windows: np.ndarray) -> np.ndarray:
+    """Ventana(s) como (N, 336, 5) float64, validando la forma como `ForecastPipeline.predict`."""
+    batch = np.asarray(windows, dtype=np.float64)
+    if batch.ndim == 2:
+        batch = batch[np.newaxis, ...]
+    if batch.shape[1:] != (WINDOW_SIZE_HOURS, N_FEATURES):
+        raise ValueError(f"Forma inesperada de entrada: {batch.shape}")
+    return batch
+
+
+class BaselineEngine:
+    """Base de los motores: pronostica la ventana completa y recorta como el pipeline del LSTM."""
+
+    name = "baseline"
+
+    def __init__(self, discard_steps: int = DISCARD_FIRST_STEPS, window: int = WINDOW_SIZE_HOURS):
+        self.discard_steps = discard_steps
+        self.window = window
+        self.horizon = window - discard_steps
+
+    @property
+    def offset_hours(self) -> int:
+        """Horas entre el último dato observado y la primera predicción."""
+        return 1 + self.discard_steps
+
+    def predict(self, windows: np.ndarray, scaled: bool = False) -> np.ndarray:
+        """Predice kWh para ventanas crudas (336, 5) o (N, 336, 5); devuelve (N, horizonte)."""
+        if scaled:
+            raise ValueError(f"El motor '{self.name}' recibe ventanas sin escalar.")
+        return self._forecast(_as_batch(windows))[:, self.discard_steps:]
+
+    def _forecast(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SeasonalNaiveEngine(BaselineEngine):
+    """La semana siguiente es igual a la última semana observada."""
+
+    name = "seasonal_naive"
+
+    def _forecast(self, batch: np.ndarray) -> np.ndarray:
+        return seasonal_naive(batch[..., KWH_INDEX], self.window)
+
+
+class HourOfWeekProfileEngine(BaselineEngine):
+    """Perfil medio por hora de la semana, escalado al nivel de la última semana."""
+
+    name = "hour_of_week"
+
+    def _forecast(self, batch: np.ndarray) -> np.ndarray:
+        n_weeks = self.window // SEASON_HOURS
+        weeks = batch[:, -n_weeks * SEASON_HOURS:, KWH_INDEX].reshape(len(batch), n_weeks, SEASON_HOURS)
+        profile = weeks.mean(axis=1)
+        profile *= weeks[:, -1].mean(axis=1, keepdims=True) / profile.mean(axis=1, keepdims=True)
+        return profile[:, np.arange(self.window) % SEASON_HOURS]
+
+
+class GradientBoostedLagEngine(BaselineEngine):
+    """
+    `HistGradientBoostingRegressor` sobre rezagos, una fila por (ventana, paso).
+
+    Objetivo y rezagos se dividen por el nivel de la última semana, así un
+    solo modelo sirve para cualquier nivel de demanda y todos los pasos.
+    """
+
+    name = "gbm_lags"
+
+    def __init__(self, model=None, discard_steps: int = DISCARD_FIRST_STEPS,
+                 window: int = WINDOW_SIZE_HOURS):
+        super().__init__(discard_steps, window)
+        self.model = model
+
+    def _features(self, batch: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Matriz (N * window, 9) de features y nivel (N,) por ventana, sin bucles."""
+        n, w = len(batch), self.window
+        kwh = batch[..., KWH_INDEX]
+        level = kwh[:, -SEASON_HOURS:].mean(axis=1)
+        level = np.where(level > 0, level, 1.0)
+        rel = kwh / level[:, np.newaxis]
+        steps = np.arange(w)
+        pos = steps % SEASON_HOURS
+        columns = [
+            np.broadcast_to(steps, (n, w)),                                          # paso
+            (batch[:, -1, HOUR_INDEX][:, np.newaxis] + 1 + steps) % 24,             # hora del día
+            np.broadcast_to(batch[:, -1, MONTH_INDEX][:, np.newaxis], (n, w)),      # mes
+            rel[:, w - SEASON_HOURS + pos],                                          # misma hora, última semana
+            rel[:, w - 2 * SEASON_HOURS + pos],                                      # misma hora, hace dos semanas
+            batch[:, w - SEASON_HOURS + pos, DIA_HABIL_INDEX],                       # hábil hace una semana
+            np.broadcast_to(rel[:, -1:], (n, w)),                                    # último valor
+            np.broadcast_to(rel[:, -24:].mean(axis=1, keepdims=True), (n, w)),       # media del último día
+            np.broadcast_to((kwh[:, -SEASON_HOURS:].mean(axis=1) / np.maximum(
+                kwh[:, :SEASON_HOURS].mean(axis=1), 1e-9))[:, np.newaxis], (n, w)),  # tendencia semanal
+        ]
+        return np.stack(columns, axis=-1).reshape(n * w, len(columns)), level
+
+    def fit(self, epochs: np.ndarray, values: np.ndarray, step: int = GBM_TRAIN_STEP,
+            max_iter: int = 200, seed: int = 0) -> "GradientBoostedLagEngine":
+        """Ajusta con pares (entrada, salida) del histórico cada `step` horas, sin cruzar huecos."""
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        w = self.window
+        starts = np.arange(0, len(values) - 2 * w + 1, step)
+        gaps = np.concatenate(([0], np.cumsum(np.diff(epochs) != HOUR_SECONDS)))
+        starts = starts[gaps[starts + 2 * w - 1] == gaps[starts]]
+        if len(starts) == 0:
+            raise ValueError(f"Histórico insuficiente para ajustar '{self.name}' ({len(values)} horas).")
+        inputs = sliding_window_view(np.asarray(values, dtype=np.float64), w, axis=0).transpose(0, 2, 1)
+        batch = inputs[starts]
+        target = sliding_window_view(np.asarray(values[:, KWH_INDEX], dtype=np.float64), w)[starts + w]
+        features, level = self._features(batch)
+        t0 = time.perf_counter()
+        self.model = HistGradientBoostingRegressor(max_iter=max_iter, random_state=seed).fit(
+            features, (target / level[:, np.newaxis]).ravel())
+        logging.info(f"Motor {self.name}: ajustado con {len(starts)} pares en {time.perf_counter() - t0:.1f}s.")
+        return self
+
+    def _forecast(self, batch: np.ndarray) -> np.ndarray:
+        if self.model is None:
+            raise ValueError(f"El motor '{self.name}' no está ajustado; usa fit() o load().")
+        features, level = self._features(batch)
+        return self.model.predict(features).reshape(len(batch), self.window) * level[:, np.newaxis]
+
+    def save(self, path: str) -> str:
+        """Guarda el regresor ajustado con joblib."""
+        joblib.dump(self.model, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "GradientBoostedLagEngine":
+        """Carga un regresor guardado con `save`."""
+        return cls(model=joblib.load(path))
+
+
+BASELINE_ENGINES = {
+    SeasonalNaiveEngine.name: SeasonalNaiveEngine,
+    HourOfWeekProfileEngine.name: HourOfWeekProfileEngine,
+    GradientBoostedLagEngine.name: GradientBoostedLagEngine,
+}
+
+
+def build_baseline_engine(name: str, epochs: np.ndarray | None = None,
+                          values: np.ndarray | None = None) -> BaselineEngine:
+    """Instancia un motor base por nombre; `gbm_lags` se ajusta con (epochs, values)."""
+    if name not in BASELINE_ENGINES:
+        raise ValueError(f"Motor desconocido '{name}'. Opciones: {sorted(BASELINE_ENGINES)}")
+    engine = BASELINE_ENGINES[name]()
+    if isinstance(engine, GradientBoostedLagEngine):
+        if epochs is None or values is None:
+            raise ValueError(f"El motor '{name}' necesita el histórico para ajustarse.")
+        engine.fit(epochs, values)
+    return engine
+
+
+def compare_engines(engines: dict, windows: np.ndarray, actual: np.ndarray, repeats: int = 20) -> list[dict]:
+    """
+    Latencia y exactitud de cada motor, lado a lado, sobre las mismas ventanas.
+
+    Args:
+        engines: {nombre: motor con `predict`} (LSTM incluido si se quiere comparar).
+        windows: (N, 336, 5) ventanas crudas.
+        actual: (N, horizonte) kWh reales de la salida de cada ventana.
+    """
+    rows = []
+    for name, engine in engines.items():
+        engine.predict(windows[:1])  # Calentamiento
+        single, batch = [], []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            engine.predict(windows[:1])
+            single.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            preds = engine.predict(windows)
+            batch.append(time.perf_counter() - t0)
+        abs_err = np.abs(preds - actual)
+        valid = actual != 0
+        rows.append({
+            "engine": name,
+            "latency_p50_ms": 1e3 * float(np.median(single)),
+            "batch_p50_ms": 1e3 * float(np.median(batch)),
+            "windows_per_s": len(windows) / float(np.median(batch)),
+            "mae_kwh": float(abs_err.mean()),
+            "mape_pct": float(100 * np.mean(abs_err[valid] / np.abs(actual[valid]))),
+            "n_windows": int(len(windows)),
+        })
+        logging.info(f"Motor {name}: p50 {rows[-1]['latency_p50_ms']:.2f} ms, MAE {rows[-1]['mae_kwh']:.1f} kWh")
+    return rows
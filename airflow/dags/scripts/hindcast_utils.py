@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/hindcast_utils.py
+"""Utilidades concisas para pronósticos retrospectivos (hindcast) por lotes."""
+
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from scripts.prediction_utils import WINDOW_SIZE_HOURS, ForecastPipeline
+
+HOUR_SECONDS = 3600
+
+
+def origin_windows_view(history: np.ndarray, window: int = WINDOW_SIZE_HOURS) -> np.ndarray:
+    """Vista (T - window + 1, window, n_features) de todas las ventanas, sin copiar datos."""
+    # sliding_window_view agrega el eje de ventana al final: (T-w+1, F, w) -> (T-w+1, w, F)
+    return sliding_window_view(history, window, axis=0).transpose(0, 2, 1)
+
+
+def origin_start_indices(
+    epochs: np.ndarray,
+    window: int = WINDOW_SIZE_HOURS,
+    step_hours: int = 168,
+    start_epoch: int | None = None,
+    end_epoch: int | None = None
+) -> np.ndarray:
+    """
+    Índices de inicio de las ventanas de cada origen.
+
+    Los orígenes (última hora observada) se alinean hacia atrás cada
+    `step_hours` desde el último dato, igual que la cadencia productiva, y
+    se descartan los que caen en huecos o cuya ventana cruza un hueco.
+    """
+    if len(epochs) < window:
+        return np.empty(0, dtype=np.int64)
+    last_epoch = int(epochs[-1]) if end_epoch is None else min(int(epochs[-1]), int(end_epoch))
+    first_epoch = int(epochs[window - 1]) if start_epoch is None else max(int(epochs[window - 1]), int(start_epoch))
+    n_candidates = (last_epoch - first_epoch) // (step_hours * HOUR_SECONDS) + 1
+    if n_candidates <= 0:
+        return np.empty(0, dtype=np.int64)
+    targets = last_epoch - np.arange(n_candidates)[::-1] * step_hours * HOUR_SECONDS
+
+    # Ubicar cada origen en el arreglo de tiempos y quedarse con los exactos
+    end_idx = np.searchsorted(epochs, targets)
+    found = end_idx < len(epochs)
+    found[found] = epochs[end_idx[found]] == targets[found]
+    start_idx = end_idx[found] - (window - 1)
+    start_idx = start_idx[start_idx >= 0]
+
+    # Ventana sin huecos: ningún salto != 1h entre start y start + window - 1
+    gaps = np.concatenate(([0], np.cumsum(np.diff(epochs) != HOUR_SECONDS)))
+    contiguous = gaps[start_idx + window - 1] == gaps[start_idx]
+    return start_idx[contiguous].astype(np.int64)
+
+
+def run_hindcast(
+    pipeline: ForecastPipeline,
+    epochs: np.ndarray,
+    values: np.ndarray,
+    step_hours: int = 168,
+    batch_size: int = 512,
+    start_epoch: int | None = None,
+    end_epoch: int | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pronostica todos los orígenes históricos en lotes grandes.
+
+    Escala el histórico una sola vez, construye la vista con todas las
+    ventanas y sólo materializa (copia) cada lote al pasarlo al modelo.
+
+    Returns:
+        (epochs de origen (n,), predicciones kWh (n, horizonte))
+    """
+    scaled = pipeline.scale(values)
+    windows = origin_windows_view(scaled)
+    starts = origin_start_indices(epochs, WINDOW_SIZE_HOURS, step_hours, start_epoch, end_epoch)
+    logging.info(f"Hindcast: {len(starts)} orígenes, lotes de {batch_size}.")
+
+    preds = np.empty((len(starts), pipeline.horizon), dtype=np.float32)
+    for b in range(0, len(starts), batch_size):
+        batch_idx = starts[b:b + batch_size]
+        preds[b:b + len(batch_idx)] = pipeline.predict(windows[batch_idx], scaled=True)
+    origin_epochs = epochs[starts + WINDOW_SIZE_HOURS - 1]
+    return origin_epochs, preds
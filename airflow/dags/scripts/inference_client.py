@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/inference_client.py
+"""Cliente mínimo del servidor de inferencia (HTTP o socket Unix)."""
+
+import http.client
+import json
+import socket
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection que se conecta a un socket Unix en lugar de TCP."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connection(url: str, timeout: float) -> http.client.HTTPConnection:
+    """Crea la conexión según el esquema: http://host:puerto o unix:///ruta.sock."""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return UnixHTTPConnection(parsed.path, timeout)
+    if parsed.scheme == "http":
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    raise ValueError(f"Esquema no soportado para servidor de inferencia: {url}")
+
+
+def predict_remote(windows: np.ndarray, url: str, timeout: float = 30.0) -> tuple[np.ndarray, dict]:
+    """Envía un lote (N, 336, 5) sin escalar y devuelve (kWh (N, pasos), metadatos)."""
+    body = json.dumps({"windows": np.asarray(windows, dtype=np.float32).tolist()})
+    conn = _connection(url, timeout)
+    try:
+        conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"Servidor de inferencia respondió {response.status}: {payload.get('detail')}")
+    preds = np.asarray(payload.pop("predictions"), dtype=np.float64)
+    return preds, payload
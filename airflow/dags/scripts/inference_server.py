@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/inference_server.py
+"""Servidor local de inferencia que mantiene el modelo LSTM cargado y caliente.
+
+Carga el bundle (modelo + scalers) una sola vez, lo compila en un
+`ForecastPipeline` de firma fija y expone un endpoint de predicción por lotes sobre
+HTTP o sobre un socket Unix. Un hilo en segundo plano revisa el ETag del
+modelo en MinIO y recarga el bundle cuando aparece una versión nueva.
+
+Ejecución (desde /opt/airflow/dags):
+    python -m scripts.inference_server
+
+Endpoints:
+    GET  /health   -> estado y versión cargada.
+    POST /predict  -> {"windows": [[[...5 features...] x 336] x N]} (sin escalar)
+                      devuelve {"predictions": [[kWh...] x N], "offset_hours": h, ...}
+                      donde la primera predicción es para último_ts + h horas.
+    POST /reload   -> fuerza la revisión de una versión nueva en MinIO.
+"""
+
+import json
+import logging
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+from scripts.prediction_utils import (N_FEATURES, WINDOW_SIZE_HOURS,
+                                      load_forecast_pipeline)
+
+# --- Configuración (variables de entorno) ---
+MINIO_CONN_ID = os.environ.get("INFERENCE_MINIO_CONN_ID", "minio_storage")
+S3_BUCKET = os.environ.get("INFERENCE_S3_BUCKET", "modelo-demanda-lstm")
+MODEL_KEY = "lstm_demand_model.keras"
+FEATURE_SCALER_KEY = "feature_scaler.joblib"
+TARGET_SCALER_KEY = "target_scaler.joblib"
+MODEL_VERSION = os.environ.get("INFERENCE_MODEL_VERSION", "lstm_v1")
+LOCAL_ARTIFACT_PATH = os.environ.get("INFERENCE_ARTIFACT_PATH", "/tmp/inference_artifacts")
+HOST = os.environ.get("INFERENCE_HOST", "0.0.0.0")
+PORT = int(os.environ.get("INFERENCE_PORT", "8500"))
+UNIX_SOCKET = os.environ.get("INFERENCE_SOCKET")  # Si se define, se escucha en el socket
+POLL_SECONDS = int(os.environ.get("INFERENCE_POLL_SECONDS", "300"))
+MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "1024"))
+
+
+class InferenceService:
+    """Mantiene el bundle cargado y lo reemplaza atómicamente al recargar."""
+
+    def __init__(self, s3_hook: S3Hook):
+        self.s3_hook = s3_hook
+        self._lock = threading.Lock()
+        self._bundle: dict | None = None
+
+    def _remote_etag(self) -> str:
+        """ETag del modelo en MinIO (solo HEAD, sin descargar)."""
+        return self.s3_hook.get_key(key=MODEL_KEY, bucket_name=S3_BUCKET).e_tag.strip('"')
+
+    def _download(self, etag: str) -> dict[str, str]:
+        """Descarga los artefactos a un subdirectorio propio de la versión."""
+        target_dir = os.path.join(LOCAL_ARTIFACT_PATH, etag)
+        os.makedirs(target_dir, exist_ok=True)
+        paths = {}
+        for name, key in (("model", MODEL_KEY),
+                          ("feature_scaler", FEATURE_SCALER_KEY),
+                          ("target_scaler", TARGET_SCALER_KEY)):
+            local_file_path = os.path.join(target_dir, os.path.basename(key))
+            self.s3_hook.get_key(key=key, bucket_name=S3_BUCKET).download_file(local_file_path)
+            paths[name] = local_file_path
+        return paths
+
+    def reload_if_changed(self) -> bool:
+        """Recarga el bundle si el ETag remoto difiere del cargado."""
+        etag = self._remote_etag()
+        if self._bundle is not None and self._bundle["etag"] == etag:
+            return False
+        logging.info(f"Inferencia: cargando versión {etag} del modelo...")
+        paths = self._download(etag)
+        pipeline = load_forecast_pipeline(
+            model_path=paths["model"],
+            feature_scaler_path=paths["feature_scaler"],
+            target_scaler_path=paths["target_scaler"],
+        )
+        bundle = {"etag": etag, "model_version": MODEL_VERSION, "pipeline": pipeline}
+        with self._lock:  # Intercambio atómico; las peticiones en curso usan el bundle anterior
+            self._bundle = bundle
+        logging.info(f"Inferencia: versión {etag} activa.")
+        return True
+
+    def info(self) -> dict:
+        bundle = self._bundle
+        if bundle is None:
+            return {"status": "loading"}
+        return {"status": "ok", "model_version": bundle["model_version"], "etag": bundle["etag"]}
+
+    def predict(self, windows: np.ndarray) -> tuple[np.ndarray, dict]:
+        """Predice un lote (N, 336, 5) sin escalar y devuelve kWh (N, pasos)."""
+        with self._lock:
+            bundle = self._bundle
+        if bundle is None:
+            raise RuntimeError("Modelo aún no cargado.")
+        if windows.ndim != 3 or windows.shape[1:] != (WINDOW_SIZE_HOURS, N_FEATURES):
+            raise ValueError(f"Forma inesperada de entrada: {windows.shape}")
+        if not 0 < windows.shape[0] <= MAX_BATCH:
+            raise ValueError(f"Tamaño de lote fuera de rango (1..{MAX_BATCH}).")
+
+        pipeline = bundle["pipeline"]
+        meta = {"model_version": bundle["model_version"], "etag": bundle["etag"],
+                "offset_hours": pipeline.offset_hours}
+        return pipeline.predict(windows), meta
+
+    def watch(self, interval: int) -> None:
+        """Bucle del hilo de recarga en caliente."""
+        stop = threading.Event()
+        while not stop.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logging.warning(f"Inferencia: fallo revisando nueva versión: {e}")
+
+
+def make_handler(service: InferenceService):
+    """Crea la clase handler HTTP ligada a `service`."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def address_string(self):
+            # En sockets Unix client_address es '' y el handler base fallaría al loggear
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, fmt, *args):
+            logging.debug(f"Inferencia: {self.address_string()} {fmt % args}")
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                info = service.info()
+                self._send_json(200 if info["status"] == "ok" else 503, info)
+            else:
+                self._send_json(404, {"detail": "No encontrado"})
+
+        def do_POST(self):
+            if self.path == "/reload":
+                try:
+                    changed = service.reload_if_changed()
+                    self._send_json(200, {"reloaded": changed, **service.info()})
+                except Exception as e:
+                    logging.error(f"Inferencia: fallo en recarga: {e}", exc_info=True)
+                    self._send_json(500, {"detail": str(e)})
+                return
+            if self.path != "/predict":
+                self._send_json(404, {"detail": "No encontrado"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                windows = np.asarray(payload["windows"], dtype=np.float32)
+                preds, meta = service.predict(windows)
+                self._send_json(200, {**meta, "predictions": preds.tolist()})
+            except (KeyError, ValueError) as e:
+                self._send_json(400, {"detail": str(e)})
+            except Exception as e:
+                logging.error(f"Inferencia: error en predicción: {e}", exc_info=True)
+                self._send_json(500, {"detail": str(e)})
+
+    return Handler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP multihilo sobre socket Unix."""
+    daemon_threads = True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    service = InferenceService(S3Hook(aws_conn_id=MINIO_CONN_ID))
+    service.reload_if_changed()
+    threading.Thread(target=service.watch, args=(POLL_SECONDS,), daemon=True).start()
+
+    handler = make_handler(service)
+    if UNIX_SOCKET:
+        if os.path.exists(UNIX_SOCKET):
+            os.unlink(UNIX_SOCKET)
+        server = ThreadingUnixHTTPServer(UNIX_SOCKET, handler)
+        logging.info(f"Inferencia: escuchando en unix://{UNIX_SOCKET}")
+    else:
+        server = ThreadingHTTPServer((HOST, PORT), handler)
+        logging.info(f"Inferencia: escuchando en http://{HOST}:{PORT}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/nowcast_utils.py
+"""Utilidades concisas para nowcasting incremental con estado LSTM persistido.
+
+Cada paso de salida del modelo seq2seq es el pronóstico para la hora
+`entrada + 336` (posición i de la ventana [t-335, t] -> hora t+1+i). Si se
+conserva el estado (h, c) de las LSTM tras la última hora observada, basta
+avanzar el estado sobre las horas nuevas para obtener sus salidas y el
+pronóstico vigente son las últimas 336 salidas. El costo de re-pronosticar
+es proporcional a las horas nuevas, no al tamaño de ventana.
+"""
+
+import io
+import logging
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from scripts.prediction_utils import N_FEATURES, WINDOW_SIZE_HOURS, ForecastPipeline
+
+HOUR_SECONDS = 3600
+STATE_KEYS = ("h1", "c1", "h2", "c2")
+
+
+def build_step_model(model: keras.Model):
+    """
+    Construye una función compilada que avanza el estado de las LSTM.
+
+    Clona las dos capas LSTM (devolviendo estado) y la Dense de salida con
+    los mismos pesos que `model`. Firma: (entrada escalada (1, k, 5),
+    h1, c1, h2, c2) -> (salidas escaladas (1, k, 1), h1, c1, h2, c2).
+    """
+    lstm_layers = [layer for layer in model.layers if isinstance(layer, keras.layers.LSTM)]
+    if len(lstm_layers) != 2:
+        raise ValueError(f"Se esperaban 2 capas LSTM, hay {len(lstm_layers)}.")
+    output_layer = model.layers[-1]
+    dense = output_layer.layer if isinstance(output_layer, keras.layers.TimeDistributed) else output_layer
+
+    inputs = keras.Input(shape=(None, N_FEATURES), batch_size=1)
+    state_inputs, new_states, seq = [], [], inputs
+    for original in lstm_layers:
+        units = original.units
+        h_in = keras.Input(shape=(units,), batch_size=1)
+        c_in = keras.Input(shape=(units,), batch_size=1)
+        config = {**original.get_config(), "return_sequences": True, "return_state": True}
+        clone = keras.layers.LSTM.from_config(config)
+        seq, h_out, c_out = clone(seq, initial_state=[h_in, c_in])
+        clone.set_weights(original.get_weights())
+        state_inputs += [h_in, c_in]
+        new_states += [h_out, c_out]
+    dense_clone = keras.layers.Dense.from_config(dense.get_config())
+    outputs = dense_clone(seq)
+    dense_clone.set_weights(dense.get_weights())
+    step_model = keras.Model([inputs, *state_inputs], [outputs, *new_states])
+
+    units = [layer.units for layer in lstm_layers]
+    spec = [tf.TensorSpec((1, None, N_FEATURES), tf.float32)] + \
+           [tf.TensorSpec((1, u), tf.float32) for u in (units[0], units[0], units[1], units[1])]
+
+    @tf.function(input_signature=spec)
+    def step_fn(batch, h1, c1, h2, c2):
+        return step_model([batch, h1, c1, h2, c2], training=False)
+
+    step_fn.units = units
+    return step_fn
+
+
+def zero_state(step_fn) -> dict[str, np.ndarray]:
+    """Estado inicial (ceros) de ambas LSTM, igual al que ve el modelo por ventana."""
+    u1, u2 = step_fn.units
+    return {
+        "h1": np.zeros((1, u1), np.float32), "c1": np.zeros((1, u1), np.float32),
+        "h2": np.zeros((1, u2), np.float32), "c2": np.zeros((1, u2), np.float32),
+    }
+
+
+def advance(
+    pipeline: ForecastPipeline,
+    step_fn,
+    state: dict[str, np.ndarray],
+    new_values: np.ndarray
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Avanza el estado sobre `new_values` (k, 5) sin escalar; devuelve (kWh (k,), nuevo estado)."""
+    scaled = pipeline.scale(new_values)[np.newaxis, ...]
+    outputs, h1, c1, h2, c2 = step_fn(scaled, *(state[k] for k in STATE_KEYS))
+    kwh = (outputs.numpy().reshape(-1) - pipeline.target_min) / pipeline.target_scale
+    return kwh, {"h1": h1.numpy(), "c1": c1.numpy(), "h2": h2.numpy(), "c2": c2.numpy()}
+
+
+def bootstrap(pipeline: ForecastPipeline, step_fn, window: np.ndarray, last_epoch: int) -> dict:
+    """Inicializa el nowcast con una ventana completa (336, 5) desde estado cero."""
+    kwh, lstm_state = advance(pipeline, step_fn, zero_state(step_fn), window)
+    return {**lstm_state, "outputs": kwh.astype(np.float32),
+            "last_epoch": np.int64(last_epoch), "bootstrap_epoch": np.int64(last_epoch)}
+
+
+def update(pipeline: ForecastPipeline, step_fn, nowcast: dict,
+           new_epochs: np.ndarray, new_values: np.ndarray) -> dict:
+    """Incorpora horas nuevas contiguas a la última observada."""
+    expected = int(nowcast["last_epoch"]) + HOUR_SECONDS * np.arange(1, len(new_epochs) + 1)
+    if not np.array_equal(new_epochs, expected):
+        raise ValueError("Las horas nuevas no son contiguas a la última observada.")
+    kwh, lstm_state = advance(pipeline, step_fn, {k: nowcast[k] for k in STATE_KEYS}, new_values)
+    outputs = np.concatenate((nowcast["outputs"], kwh.astype(np.float32)))[-WINDOW_SIZE_HOURS:]
+    return {**nowcast, **lstm_state, "outputs": outputs, "last_epoch": np.int64(new_epochs[-1])}
+
+
+def current_forecast(pipeline: ForecastPipeline, nowcast: dict) -> np.ndarray:
+    """Pronóstico vigente (mismo recorte que el pipeline por ventana)."""
+    return nowcast["outputs"][pipeline.discard_steps:]
+
+
+def serialize(nowcast: dict, model_etag: str) -> bytes:
+    """Serializa el estado a .npz para guardarlo en MinIO."""
+    buffer = io.BytesIO()
+    np.savez(buffer, model_etag=np.array(model_etag), **nowcast)
+    return buffer.getvalue()
+
+
+def deserialize(data: bytes) -> tuple[dict, str]:
+    """Inverso de `serialize`; devuelve (estado, etag del modelo)."""
+    with np.load(io.BytesIO(data)) as npz:
+        nowcast = {k: npz[k] for k in npz.files if k != "model_etag"}
+        model_etag = str(npz["model_etag"])
+    logging.info(f"Nowcast: estado cargado (última hora {nowcast['last_epoch']}).")
+    return nowcast, model_etag
@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
-"""Utilidades concisas para predicción de demanda."""
+"""Utilidades concisas para predicción de demanda.
+
+TensorFlow se importa al cargar o compilar el modelo, no al importar el
+módulo: los motores base (`forecast_engines`) y las constantes se usan aunque
+TensorFlow no esté instalado.
+"""
 
 import logging
-from datetime import timedelta
+from datetime import datetime, timezone
 
 import joblib
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
 
 # Constantes (consistentes con el DAG)
 WINDOW_SIZE_HOURS = 336
@@ -16,16 +18,19 @@ N_FEATURES = 5
 REQUIRED_COLS_ORDERED = [
     'Mes', 'Hour', 'Season', 'Dia_habil', 'kWh'
 ]
+TARGET_FEATURE_INDEX = REQUIRED_COLS_ORDERED.index('kWh')
 PREDICTION_HORIZON_HOURS = 168
+DISCARD_FIRST_STEPS = 6  # Primeros pasos de salida que se descartan
 
 
 def load_model_and_scalers(
     model_path: str,
     feature_scaler_path: str,
     target_scaler_path: str
-) -> tuple[tf.keras.Model, object, object]:
+) -> tuple["keras.Model", object, object]:
     """Carga modelo Keras y scalers Joblib."""
     try:
+        from tensorflow import keras
         model = keras.models.load_model(model_path)
         feature_scaler = joblib.load(feature_scaler_path)
         target_scaler = joblib.load(target_scaler_path)
@@ -37,100 +42,125 @@ def load_model_and_scalers(
 
 
 
-def prepare_prediction_input(
-    df_hist: pd.DataFrame,
-    feature_scaler
-) -> np.ndarray:
-    """Prepara datos históricos para entrada LSTM (escala, ordena, ajusta forma)."""
-    if df_hist is None or df_hist.empty:
-        raise ValueError("Input df vacío.")
-    if len(df_hist) < WINDOW_SIZE_HOURS:
-        raise ValueError("Datos insuficientes.")
-
-    df_window = df_hist.iloc[-WINDOW_SIZE_HOURS:].copy()
-    # Asegura orden de columnas
-    try:
-        df_window = df_window[REQUIRED_COLS_ORDERED]
-    except KeyError as e:
-        raise ValueError(f"Falta columna requerida {e} en datos históricos.")
-
-    # Escala features
-    try:
-        scaled_features = feature_scaler.transform(df_window)
-    except Exception as e:
-        logging.error(f"Error escalando features: {e}", exc_info=True)
-        raise
-
-    # Remodela para LSTM: (batch_size=1, timesteps, features)
-    input_data = scaled_features.reshape(1, WINDOW_SIZE_HOURS, N_FEATURES)
-    logging.info(f"Datos de entrada preparados con forma: {input_data.shape}")
-    return input_data
+class ForecastPipeline:
+    """Pipeline compilado: escalado -> modelo -> recorte -> des-escalado.
+
+    Los `MinMaxScaler` se reducen a dos pares de arreglos afines
+    (`X * scale + min` y su inversa) y se hornean en un `tf.function` de
+    firma fija (N, 336, 5) float32 junto con el recorte de los primeros
+    `DISCARD_FIRST_STEPS` pasos. El grafo se traza una vez al construir el
+    objeto, así cada llamada sólo paga el forward pass.
+    """
+
+    def __init__(self, model, feature_scaler, target_scaler,
+                 discard_steps: int = DISCARD_FIRST_STEPS):
+        import tensorflow as tf
+
+        self.model = model
+        self.discard_steps = discard_steps
+        # MinMaxScaler.transform(X) == X * scale_ + min_
+        self.feature_scale = np.asarray(feature_scaler.scale_, dtype=np.float32)
+        self.feature_min = np.asarray(feature_scaler.min_, dtype=np.float32)
+        # MinMaxScaler.inverse_transform(y) == (y - min_) / scale_
+        self.target_scale = np.float32(target_scaler.scale_[0])
+        self.target_min = np.float32(target_scaler.min_[0])
+        if self.feature_scale.shape != (N_FEATURES,):
+            raise ValueError(f"Feature scaler con {self.feature_scale.shape[0]} features, se esperaban {N_FEATURES}.")
+
+        feat_scale = tf.constant(self.feature_scale)
+        feat_min = tf.constant(self.feature_min)
+        targ_scale = tf.constant(self.target_scale)
+        targ_min = tf.constant(self.target_min)
+        spec = tf.TensorSpec(shape=(None, WINDOW_SIZE_HOURS, N_FEATURES), dtype=tf.float32)
+
+        def _from_scaled(scaled):
+            out = model(scaled, training=False)
+            out = tf.reshape(out, (tf.shape(out)[0], -1))[:, discard_steps:]
+            return (out - targ_min) / targ_scale
+
+        @tf.function(input_signature=[spec])
+        def forward_raw(batch):
+            return _from_scaled(batch * feat_scale + feat_min)
+
+        @tf.function(input_signature=[spec])
+        def forward_scaled(batch):
+            return _from_scaled(batch)
+
+        self._forward_raw = forward_raw
+        self._forward_scaled = forward_scaled
+        # Calentamiento: traza ambos grafos y fija el horizonte de salida
+        dummy = tf.zeros((1, WINDOW_SIZE_HOURS, N_FEATURES), dtype=tf.float32)
+        self.horizon = int(forward_raw(dummy).shape[1])
+        forward_scaled(dummy)
+        logging.info(f"Pipeline de predicción compilado (horizonte {self.horizon}h).")
+
+    @property
+    def offset_hours(self) -> int:
+        """Horas entre el último dato observado y la primera predicción."""
+        return 1 + self.discard_steps
+
+    def scale(self, windows: np.ndarray) -> np.ndarray:
+        """Aplica el escalado afín de features (equivale a `feature_scaler.transform`)."""
+        return np.asarray(windows, dtype=np.float32) * self.feature_scale + self.feature_min
+
+    def predict(self, windows: np.ndarray, scaled: bool = False) -> np.ndarray:
+        """Predice kWh para ventanas (336, 5) o (N, 336, 5); devuelve (N, horizonte)."""
+        batch = np.asarray(windows, dtype=np.float32)
+        if batch.ndim == 2:
+            batch = batch[np.newaxis, ...]
+        if batch.shape[1:] != (WINDOW_SIZE_HOURS, N_FEATURES):
+            raise ValueError(f"Forma inesperada de entrada: {batch.shape}")
+        forward = self._forward_scaled if scaled else self._forward_raw
+        return forward(batch).numpy()
+
+
+def load_forecast_pipeline(
+    model_path: str,
+    feature_scaler_path: str,
+    target_scaler_path: str
+) -> ForecastPipeline:
+    """Carga artefactos y construye el pipeline compilado."""
+    model, feature_scaler, target_scaler = load_model_and_scalers(
+        model_path, feature_scaler_path, target_scaler_path
+    )
+    return ForecastPipeline(model, feature_scaler, target_scaler)
 
 
 
-def generate_predictions(
-    model,
-    input_data: np.ndarray,
-    target_scaler
-) -> np.ndarray:
-    """Genera predicciones y las re-escala a unidad original (kWh)."""
-    try:
-        preds_scaled = model.predict(input_data)
-        logging.info(f"Predicciones escaladas generadas (forma: {preds_scaled.shape})")
-
-        # Ajusta forma para inverse_transform
-        if preds_scaled.ndim == 3 and preds_scaled.shape[0] == 1:
-            preds_scaled_2d = preds_scaled.reshape(-1, 1)
-        elif preds_scaled.ndim == 2 and preds_scaled.shape[0] == 1:
-            preds_scaled_2d = preds_scaled.T
-        elif preds_scaled.ndim == 2 and preds_scaled.shape[1] == 1:
-            preds_scaled_2d = preds_scaled
-        else:
-            raise ValueError(f"Forma inesperada de predicción: {preds_scaled.shape}")
-
-        preds_inverse = target_scaler.inverse_transform(preds_scaled_2d)
-        preds_final = preds_inverse.flatten()
-        logging.info(f"Predicciones re-escaladas a kWh. Total: {len(preds_final)}")
-        return preds_final
-    except Exception as e:
-        logging.error(f"Error generando/re-escalando predicciones: {e}", exc_info=True)
-        raise
+def forecast_timestamps(last_hist_ts, n_steps: int, offset_hours: int = 1) -> np.ndarray:
+    """Timestamps UTC (datetime64[s]) de las predicciones, generados con un solo `arange`."""
+    if isinstance(last_hist_ts, datetime):
+        if last_hist_ts.tzinfo is not None:
+            last_hist_ts = last_hist_ts.astimezone(timezone.utc).replace(tzinfo=None)
+        last_hist_ts = np.datetime64(last_hist_ts, 's')
+    elif isinstance(last_hist_ts, str):
+        last_hist_ts = np.datetime64(last_hist_ts.replace('Z', ''), 's')
+    elif not isinstance(last_hist_ts, np.datetime64):
+        raise TypeError("last_hist_ts debe ser datetime, datetime64 o string ISO.")
+    start = last_hist_ts.astype('datetime64[h]') + np.timedelta64(offset_hours, 'h')
+    return (start + np.arange(n_steps, dtype='timedelta64[h]')).astype('datetime64[s]')
 
 
 
 def create_prediction_output(
     preds: np.ndarray,
-    last_hist_ts: pd.Timestamp,
-    model_ver: str
+    last_hist_ts,
+    model_ver: str,
+    offset_hours: int = 1 + DISCARD_FIRST_STEPS
 ) -> list[dict]:
-    """Crea lista de diccionarios para guardar en BD."""
-    if not isinstance(last_hist_ts, pd.Timestamp):
-        try:
-            last_hist_ts = pd.Timestamp(last_hist_ts)
-        except Exception:
-            raise TypeError("last_hist_ts debe ser Timestamp.")
-
-    future_ts = pd.date_range(
-        start=last_hist_ts + timedelta(hours=1),
-        periods=len(preds),
-        freq='H'
-    )
-    
-    # Eliminar primeras 6 predicciones y sus timestamps
-    preds = preds[6:]
-    future_ts = future_ts[6:]
-    
-    if len(future_ts) != len(preds):
-        raise ValueError("Mismatch preds/timestamps.")
-
-    output_records = []
-    for ts, pred_kwh in zip(future_ts, preds):
-        output_records.append({
-            "prediction_for_datetime": ts.isoformat(),
-            "predicted_kwh": float(pred_kwh),
-            "model_version": model_ver
-        })
-
+    """Crea lista de diccionarios para guardar en BD.
+
+    `preds` ya viene recortado por el pipeline; `offset_hours` es la distancia
+    entre el último dato histórico y la primera predicción.
+    """
+    preds = np.asarray(preds, dtype=np.float64).ravel()
+    future_ts = forecast_timestamps(last_hist_ts, len(preds), offset_hours)
+    iso_ts = np.datetime_as_string(future_ts, unit='s', timezone='UTC')
+
+    output_records = [
+        {"prediction_for_datetime": ts, "predicted_kwh": kwh, "model_version": model_ver}
+        for ts, kwh in zip(iso_ts.tolist(), preds.tolist())
+    ]
     logging.info(
         f"Generados {len(output_records)} registros de predicción "
         f"(con ts como string ISO)."
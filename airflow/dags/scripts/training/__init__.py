@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/__init__.py
+"""Entrenamiento del modelo LSTM de demanda (lógica del notebook empaquetada como código)."""
+
+from scripts.training.model import (build_lstm_model, build_student_model,
+                                    compile_model)
+from scripts.training.pipeline import (evaluate_windows, fit_scalers,
+                                       save_bundle, split_bounds,
+                                       split_window_starts, train_model,
+                                       train_model_from_snapshot,
+                                       validation_gate)
+from scripts.training.windows import (WindowBatches, align_to_monday,
+                                      make_window_dataset,
+                                      training_window_starts, window_pair_views)
+
+__all__ = [
+    "build_lstm_model", "build_student_model", "compile_model",
+    "evaluate_windows", "fit_scalers", "save_bundle", "split_bounds",
+    "split_window_starts", "train_model", "train_model_from_snapshot", "validation_gate",
+    "WindowBatches", "align_to_monday", "make_window_dataset",
+    "training_window_starts", "window_pair_views",
+]
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/crossval.py
+"""Validación cruzada de origen móvil (ventana expansiva) con pliegues en paralelo.
+
+En vez de un único tramo de prueba 70/20/10, el histórico se corta en
+`n_folds` orígenes al final de la serie. El pliegue k entrena con todo lo
+anterior a su corte (el último `val_fraction` para EarlyStopping) y predice
+los pares cuya salida cae en el bloque de prueba [corte, corte + test_hours):
+
+    pliegue 0: [ entrenamiento | val ][ prueba ]
+    pliegue 1: [ entrenamiento      | val ][ prueba ]
+    ...
+
+Los pliegues se entrenan en procesos de `workers.snapshot_pool` que comparten
+el memmap del snapshot; la escala es la del snapshot (min/max del 70% inicial),
+sólo los pesos se ajustan por pliegue. Las métricas (MAE/MAPE por hora de
+horizonte) se acumulan como sumas vectorizadas, así los pliegues se combinan
+sin guardar predicciones. Cada pliegue se compara con el ingenuo estacional
+(la última semana de la entrada repetida) y la compuerta exige pasar en TODOS.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from scripts.forecast_engines import seasonal_naive
+from scripts.prediction_utils import WINDOW_SIZE_HOURS
+from scripts.training.model import LEARNING_RATE, LSTM_UNITS
+from scripts.training.pipeline import MAX_REGRESSION, STEP_WINDOW, validation_gate
+from scripts.training.windows import TARGET_FEATURE_INDEX, training_window_starts
+from scripts.training.workers import (THREADS_PER_WORKER, pool_size,
+                                      snapshot_pool, worker_state)
+
+CV_FOLDS = 4
+CV_TEST_HOURS = 4 * 7 * 24   # Bloque de prueba de cada pliegue
+CV_TEST_STEP = 24            # Un origen de predicción por día dentro del bloque
+CV_VAL_FRACTION = 0.20       # Cola del tramo previo al corte usada para EarlyStopping
+CV_SUMMARY_FILE = "cv_summary.json"
+
+
+def rolling_origin_folds(
+    epochs: np.ndarray,
+    n_folds: int = CV_FOLDS,
+    test_hours: int = CV_TEST_HOURS,
+    val_fraction: float = CV_VAL_FRACTION,
+    step: int = STEP_WINDOW,
+    test_step: int = CV_TEST_STEP,
+    window: int = WINDOW_SIZE_HOURS
+) -> list[dict]:
+    """
+    Inicios de pares (train/val/test) de cada pliegue; el último termina al final de la serie.
+
+    Los pares de entrenamiento y validación terminan antes del corte y los de
+    prueba tienen su salida completa dentro del bloque, sin fuga entre ellos.
+    """
+    n = len(epochs)
+    folds = []
+    for k in range(n_folds):
+        cut = n - (n_folds - k) * test_hours
+        val_lo = int(cut * (1 - val_fraction))
+        fold = {
+            "fold": k,
+            "cut": cut,
+            "train": training_window_starts(epochs, 0, val_lo, window=window, step=step),
+            "val": training_window_starts(epochs, val_lo, cut, window=window, step=step),
+            "test": training_window_starts(epochs, cut - window, cut + test_hours, window=window, step=test_step),
+        }
+        empty = [name for name in ("train", "val", "test") if len(fold[name]) == 0]
+        if cut - window < 0 or empty:
+            raise ValueError(f"Pliegue {k} sin pares completos en {empty or ['train']}; "
+                             f"reduce n_folds o test_hours ({n} horas).")
+        folds.append(fold)
+    return folds
+
+
+def horizon_error_sums(preds: np.ndarray, actual: np.ndarray) -> dict:
+    """Sumas por hora de horizonte de |error|, error² y |error|/|real| (N, H) -> (H,)."""
+    abs_err = np.abs(preds - actual)
+    denom = np.abs(actual)
+    valid = denom > 0
+    ape = np.divide(abs_err, denom, out=np.zeros_like(abs_err), where=valid)
+    return {
+        "abs_err": abs_err.sum(axis=0),
+        "sq_err": np.square(abs_err).sum(axis=0),
+        "ape": ape.sum(axis=0),
+        "n_ape": valid.sum(axis=0),
+        "n": len(preds),
+    }
+
+
+def horizon_metrics(sums: dict) -> dict:
+    """MAE/RMSE/MAPE por hora de horizonte y globales a partir de `horizon_error_sums` (sumables)."""
+    n_ape = np.maximum(sums["n_ape"], 1)
+    return {
+        "mae_kwh": float(sums["abs_err"].sum() / (sums["n"] * len(sums["abs_err"]))),
+        "rmse_kwh": float(np.sqrt(sums["sq_err"].sum() / (sums["n"] * len(sums["sq_err"])))),
+        "mape_pct": float(100 * sums["ape"].sum() / n_ape.sum()),
+        "mae_kwh_by_hour": (sums["abs_err"] / sums["n"]).tolist(),
+        "mape_pct_by_hour": (100 * sums["ape"] / n_ape).tolist(),
+    }
+
+
+def _add_sums(total: dict | None, sums: dict) -> dict:
+    """Acumula sumas de varios pliegues."""
+    if total is None:
+        return {k: np.copy(v) if isinstance(v, np.ndarray) else v for k, v in sums.items()}
+    return {k: total[k] + sums[k] for k in total}
+
+
+def _run_fold(fold: dict, config: dict) -> dict:
+    """Entrena y evalúa un pliegue dentro del proceso de trabajo."""
+    from tensorflow import keras
+
+    from scripts.training.model import build_lstm_model, compile_model
+    from scripts.training.pipeline import predict_windows
+    from scripts.training.windows import make_window_dataset, window_pair_views
+
+    t0 = time.perf_counter()
+    snapshot = worker_state()["snapshot"]
+    epochs, scaled, target_scaler = snapshot["epochs"], snapshot["scaled"], snapshot["target_scaler"]
+    window, batch_size, seed = WINDOW_SIZE_HOURS, config["batch_size"], config["seed"]
+
+    keras.utils.set_random_seed(seed)
+    model = compile_model(build_lstm_model(tuple(config["units"])), config["learning_rate"])
+    history = model.fit(
+        make_window_dataset(scaled, fold["train"], batch_size, shuffle=True, seed=seed),
+        validation_data=make_window_dataset(scaled, fold["val"], batch_size, shuffle=False),
+        epochs=config["max_epochs"],
+        shuffle=False,
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.2, patience=5, min_lr=1e-5),
+        ],
+        verbose=0,
+    )
+
+    # kWh real sólo del tramo que tocan los pares de prueba (entradas + salidas)
+    lo, hi = int(fold["test"][0]), int(fold["test"][-1]) + 2 * window
+    kwh = (np.asarray(scaled[lo:hi, TARGET_FEATURE_INDEX], dtype=np.float64)
+           - target_scaler.min_[0]) / target_scaler.scale_[0]
+    rel = fold["test"] - lo
+    kwh_windows = np.lib.stride_tricks.sliding_window_view(kwh, window)
+    inputs, _ = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+    preds = predict_windows(model, inputs, fold["test"], target_scaler, batch_size)
+    actual = kwh_windows[rel + window]
+    return {
+        "fold": fold["fold"],
+        "test_start_epoch": int(epochs[fold["cut"]]),
+        "test_end_epoch": int(epochs[int(fold["test"][-1]) + 2 * window - 1]),
+        "n_windows": {name: int(len(fold[name])) for name in ("train", "val", "test")},
+        "epochs_run": len(history.history["loss"]),
+        "model": horizon_error_sums(preds, actual),
+        "naive": horizon_error_sums(seasonal_naive(kwh_windows[rel]), actual),
+        "duration_s": round(time.perf_counter() - t0, 2),
+    }
+
+
+def crossval_gate(folds: list[dict], max_regression: float = MAX_REGRESSION) -> dict:
+    """El modelo pasa sólo si en CADA pliegue no empeora al ingenuo estacional más de `max_regression`."""
+    per_fold = [validation_gate({"mae_kwh": f["mae_kwh"]}, {"mae_kwh": f["naive_mae_kwh"]}, max_regression)
+                for f in folds]
+    worst = max(folds, key=lambda f: f["mae_kwh"] / f["naive_mae_kwh"])
+    return {
+        "passed": all(g["passed"] for g in per_fold),
+        "folds_passed": int(sum(g["passed"] for g in per_fold)),
+        "n_folds": len(folds),
+        "worst_fold": worst["fold"],
+        "max_regression": max_regression,
+        "reference": "seasonal_naive",
+    }
+
+
+def cross_validate(
+    snapshot: dict,
+    n_folds: int = CV_FOLDS,
+    test_hours: int = CV_TEST_HOURS,
+    units: tuple[int, int] = LSTM_UNITS,
+    learning_rate: float = LEARNING_RATE,
+    batch_size: int = 32,
+    step: int = STEP_WINDOW,
+    max_epochs: int = 50,
+    max_regression: float = MAX_REGRESSION,
+    seed: int = 0,
+    threads_per_worker: int = THREADS_PER_WORKER,
+    max_workers: int | None = None
+) -> dict:
+    """
+    Entrena y evalúa todos los pliegues en paralelo sobre el snapshot (memmap compartido).
+
+    Falla si algún pliegue falla: la compuerta nunca se decide con pliegues parciales.
+
+    Returns:
+        Resumen serializable a JSON: config, métricas por pliegue, agregados,
+        MAE/MAPE por hora de horizonte (modelo e ingenuo, todos los pliegues) y "gate".
+    """
+    epochs = snapshot["epochs"]
+    folds = rolling_origin_folds(epochs, n_folds, test_hours, step=step)
+    config = {"units": list(units), "learning_rate": learning_rate, "batch_size": batch_size,
+              "step": step, "max_epochs": max_epochs, "seed": seed}
+    n_workers = pool_size(len(folds), threads_per_worker, max_workers)
+    logging.info(f"CV: {len(folds)} pliegues de {test_hours}h en {n_workers} procesos "
+                 f"x {threads_per_worker} hilos (snapshot {snapshot['key']}).")
+
+    results = []
+    with snapshot_pool(snapshot["dir"], n_workers, threads_per_worker) as pool:
+        for future in as_completed([pool.submit(_run_fold, fold, config) for fold in folds]):
+            results.append(future.result())
+    results.sort(key=lambda r: r["fold"])
+
+    fold_rows, model_total, naive_total = [], None, None
+    for r in results:
+        model_metrics, naive_metrics = horizon_metrics(r["model"]), horizon_metrics(r["naive"])
+        model_total, naive_total = _add_sums(model_total, r["model"]), _add_sums(naive_total, r["naive"])
+        fold_rows.append({
+            "fold": r["fold"], "test_start_epoch": r["test_start_epoch"], "test_end_epoch": r["test_end_epoch"],
+            "n_windows": r["n_windows"], "epochs_run": r["epochs_run"], "duration_s": r["duration_s"],
+            "mae_kwh": model_metrics["mae_kwh"], "rmse_kwh": model_metrics["rmse_kwh"],
+            "mape_pct": model_metrics["mape_pct"],
+            "naive_mae_kwh": naive_metrics["mae_kwh"], "naive_mape_pct": naive_metrics["mape_pct"],
+        })
+        logging.info(f"CV: pliegue {r['fold']} MAE {model_metrics['mae_kwh']:.1f} kWh "
+                     f"(ingenuo {naive_metrics['mae_kwh']:.1f}), MAPE {model_metrics['mape_pct']:.2f}%")
+
+    maes = np.array([f["mae_kwh"] for f in fold_rows])
+    pooled, pooled_naive = horizon_metrics(model_total), horizon_metrics(naive_total)
+    return {
+        "snapshot": snapshot["key"],
+        "config": config,
+        "n_folds": len(fold_rows),
+        "test_hours": test_hours,
+        "folds": fold_rows,
+        "aggregate": {
+            "mae_kwh_mean": float(maes.mean()),
+            "mae_kwh_std": float(maes.std()),
+            "mae_kwh_worst": float(maes.max()),
+            "mae_kwh_pooled": pooled["mae_kwh"],
+            "mape_pct_pooled": pooled["mape_pct"],
+            "naive_mae_kwh_pooled": pooled_naive["mae_kwh"],
+        },
+        "by_horizon_hour": {
+            "mae_kwh": pooled["mae_kwh_by_hour"],
+            "mape_pct": pooled["mape_pct_by_hour"],
+            "naive_mae_kwh": pooled_naive["mae_kwh_by_hour"],
+        },
+        "gate": crossval_gate(fold_rows, max_regression),
+    }
+
+
+def save_cv_summary(summary: dict, local_dir: str) -> dict[str, str]:
+    """Escribe el resumen como `cv_summary.json`; devuelve {nombre lógico: ruta} para `upload_artifacts`."""
+    os.makedirs(local_dir, exist_ok=True)
+    path = os.path.join(local_dir, CV_SUMMARY_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return {"cv_summary": path}
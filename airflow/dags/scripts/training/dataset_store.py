@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/dataset_store.py
+"""Almacén fuera de memoria de features escaladas para entrenamiento.
+
+Cada snapshot es un directorio `<raíz>/<clave>/` con:
+
+    epochs.npy           int64 (n,)     horas en segundos UTC
+    scaled.npy           float32 (n, 5) features escaladas (orden del modelo)
+    feature_scaler.joblib, target_scaler.joblib
+    manifest.json        huella de datos y parámetros (se escribe al final)
+
+La clave se deriva de la huella del histórico (calculada en Postgres) y de
+los parámetros que cambian el escalado, así que re-ejecutar sobre datos sin
+cambios reutiliza el snapshot sin leer ni escribir filas. Los `.npy` se abren
+con `mmap_mode="r"` (`snapshot.load_snapshot`, sin dependencias de Airflow) y
+`windows.make_window_dataset` arma las ventanas por lote.
+"""
+
+import json
+import logging
+import os
+import shutil
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from scripts.db_operations_prediction import (fetch_feature_stats,
+                                              fetch_first_monday,
+                                              fetch_history_fingerprint,
+                                              fetch_leading_bounds,
+                                              iter_history_chunks)
+from scripts.prediction_utils import N_FEATURES
+from scripts.training.pipeline import TRAIN_FRACTION
+from scripts.training.snapshot import (MANIFEST_FILE, STORE_FORMAT_VERSION,
+                                       load_snapshot, snapshot_key)
+from scripts.training.windows import TARGET_FEATURE_INDEX
+
+
+def _scalers_from_bounds(mins: np.ndarray, maxs: np.ndarray) -> tuple[MinMaxScaler, MinMaxScaler]:
+    """MinMaxScaler idénticos a ajustarlos sobre el tramo de entrenamiento, a partir de min/max."""
+    bounds = np.vstack([mins, maxs])
+    feature_scaler = MinMaxScaler(feature_range=(0, 1)).fit(bounds)
+    target_scaler = MinMaxScaler(feature_range=(0, 1)).fit(bounds[:, TARGET_FEATURE_INDEX:TARGET_FEATURE_INDEX + 1])
+    return feature_scaler, target_scaler
+
+
+def materialize_snapshot(
+    postgres_conn_id: str,
+    store_root: str,
+    train_fraction: float = TRAIN_FRACTION,
+    align_monday: bool = True,
+    scaler_source: str = "train_split"
+) -> dict:
+    """
+    Devuelve el snapshot del histórico actual, materializándolo sólo si cambió.
+
+    Los scalers se ajustan con min/max del tramo de entrenamiento calculados
+    en SQL y las filas se escriben por bloques en un `.npy` memmap, así la
+    memoria no crece con el histórico. Se escribe en un directorio temporal y
+    se renombra al final: un snapshot a medias nunca se reutiliza.
+
+    Con `scaler_source="stats"` los min/max salen de la tabla de estadísticas
+    que mantiene la ingesta (O(1), sin recorrer el tramo de entrenamiento);
+    cubren todo el histórico, así que incluyen el tramo de prueba.
+    """
+    if scaler_source not in ("train_split", "stats"):
+        raise ValueError(f"scaler_source desconocido: '{scaler_source}'.")
+    start = fetch_first_monday(postgres_conn_id) if align_monday else None
+    fingerprint = fetch_history_fingerprint(postgres_conn_id, start)
+    n_rows = fingerprint["n_rows"]
+    if n_rows == 0:
+        raise ValueError("El histórico está vacío; no hay nada que materializar.")
+    key = snapshot_key(fingerprint, train_fraction, align_monday, scaler_source)
+    snapshot = load_snapshot(store_root, key)
+    if snapshot is not None:
+        logging.info(f"Store: snapshot {key} vigente ({n_rows} filas); se omite la materialización.")
+        return {**snapshot, "reused": True}
+
+    if scaler_source == "stats":
+        stats = fetch_feature_stats(postgres_conn_id)
+        if stats is None:
+            raise ValueError("No hay estadísticas de features; ejecuta primero la ingesta diaria.")
+        bounds = stats["total"]["features"]["min"], stats["total"]["features"]["max"]
+    else:
+        bounds = fetch_leading_bounds(postgres_conn_id, int(n_rows * train_fraction), start)
+    feature_scaler, target_scaler = _scalers_from_bounds(*bounds)
+    scale = feature_scaler.scale_.astype(np.float32)
+    offset = feature_scaler.min_.astype(np.float32)
+
+    tmp_dir = os.path.join(store_root, f".{key}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        epochs_mm = np.lib.format.open_memmap(os.path.join(tmp_dir, "epochs.npy"), mode="w+",
+                                              dtype=np.int64, shape=(n_rows,))
+        scaled_mm = np.lib.format.open_memmap(os.path.join(tmp_dir, "scaled.npy"), mode="w+",
+                                              dtype=np.float32, shape=(n_rows, N_FEATURES))
+        n_written = 0
+        for epochs, values in iter_history_chunks(postgres_conn_id, start):
+            k = len(epochs)
+            if n_written + k > n_rows:
+                raise ValueError("El histórico cambió durante la materialización (más filas).")
+            epochs_mm[n_written:n_written + k] = epochs
+            np.multiply(values, scale, out=scaled_mm[n_written:n_written + k])
+            scaled_mm[n_written:n_written + k] += offset
+            n_written += k
+        if n_written != n_rows or int(epochs_mm[-1]) != fingerprint["last_epoch"]:
+            raise ValueError(f"El histórico cambió durante la materialización ({n_written}/{n_rows} filas).")
+        epochs_mm.flush()
+        scaled_mm.flush()
+        del epochs_mm, scaled_mm
+
+        joblib.dump(feature_scaler, os.path.join(tmp_dir, "feature_scaler.joblib"))
+        joblib.dump(target_scaler, os.path.join(tmp_dir, "target_scaler.joblib"))
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"key": key, "fingerprint": fingerprint, "train_fraction": train_fraction,
+                       "align_monday": align_monday, "scaler_source": scaler_source,
+                       "format": STORE_FORMAT_VERSION}, f, indent=2)
+        if os.path.isdir(os.path.join(store_root, key)):  # Otra corrida lo materializó primero
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, os.path.join(store_root, key))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logging.info(f"Store: snapshot {key} materializado ({n_rows} filas).")
+    return {**load_snapshot(store_root, key), "reused": False}
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/distill.py
+"""Destilación del LSTM de producción (maestro) en un estudiante liviano.
+
+El estudiante (`model.build_student_model`: Conv1D dilatadas o GRU pequeña)
+aprende de las salidas del maestro sobre los mismos pares (su hindcast) y de
+los valores reales. Minimizar `alpha * MSE(real) + (1 - alpha) * MSE(maestro)`
+equivale, salvo una constante, a minimizar el MSE contra el objetivo mezclado
+`alpha * real + (1 - alpha) * maestro`, así que se entrena como cualquier
+modelo con esos objetivos.
+
+El estudiante usa los scalers del maestro: el bundle es intercambiable con el
+del campeón y `ForecastPipeline` lo sirve sin cambios. Sólo se publica si su
+MAE en prueba no supera al del maestro en más de `accuracy_budget`.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow import keras
+
+from scripts.prediction_utils import WINDOW_SIZE_HOURS, ForecastPipeline
+from scripts.training.model import build_student_model, compile_model
+from scripts.training.pipeline import (evaluate_windows, scale_features,
+                                       split_window_starts, validation_gate)
+from scripts.training.windows import (TARGET_FEATURE_INDEX, WindowBatches,
+                                      window_pair_views)
+
+DISTILL_ALPHA = 0.5          # Peso de los valores reales frente a las salidas del maestro
+ACCURACY_BUDGET = 0.05       # El estudiante puede tener hasta 5% más MAE que el maestro
+DISTILL_STEP = 24            # Pares diarios: el estudiante es barato de entrenar
+DISTILL_EPOCHS = 30
+DISTILL_LEARNING_RATE = 0.002
+LATENCY_REPEATS = 30
+
+
+def blended_targets(model: keras.Model, inputs: np.ndarray, outputs: np.ndarray,
+                    starts: np.ndarray, alpha: float, batch_size: int = 32) -> np.ndarray:
+    """Objetivos (len(starts), window, 1) en escala: `alpha * real + (1 - alpha) * maestro`."""
+    teacher = model.predict(WindowBatches(inputs, None, starts, batch_size, shuffle=False), verbose=0)
+    return (alpha * outputs[starts] + (1 - alpha) * teacher).astype(np.float32)
+
+
+def model_footprint(model: keras.Model) -> dict:
+    """Parámetros y bytes del `.keras` guardado."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.keras")
+        model.save(path)
+        size_bytes = os.path.getsize(path)
+    return {"params": int(model.count_params()), "size_bytes": int(size_bytes)}
+
+
+def single_window_latency_ms(pipeline: ForecastPipeline, window: np.ndarray,
+                             repeats: int = LATENCY_REPEATS) -> float:
+    """p50 de `pipeline.predict` de una ventana (el grafo ya está trazado)."""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        pipeline.predict(window)
+        samples.append(time.perf_counter() - t0)
+    return 1e3 * float(np.median(samples))
+
+
+def distill_student(
+    teacher: keras.Model,
+    feature_scaler: MinMaxScaler,
+    target_scaler: MinMaxScaler,
+    epochs: np.ndarray,
+    values: np.ndarray,
+    kind: str = "conv",
+    alpha: float = DISTILL_ALPHA,
+    step: int = DISTILL_STEP,
+    max_epochs: int = DISTILL_EPOCHS,
+    batch_size: int = 32,
+    learning_rate: float = DISTILL_LEARNING_RATE,
+    accuracy_budget: float = ACCURACY_BUDGET,
+    seed: int = 0,
+    verbose: int = 2
+) -> dict:
+    """
+    Entrena un estudiante `kind` a partir del maestro y lo compara en el tramo de prueba.
+
+    Returns:
+        {"model", "feature_scaler", "target_scaler", "metadata"}; metadata
+        incluye exactitud, latencia y tamaño de ambos, las reducciones y "gate".
+    """
+    keras.utils.set_random_seed(seed)
+    scaled = scale_features(values, feature_scaler)
+    inputs, outputs = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+    kwh = np.asarray(values[:, TARGET_FEATURE_INDEX], dtype=np.float64)
+    starts = split_window_starts(epochs, step)
+
+    # Entradas y objetivos de train/val materializados: pocos pares diarios, caben en memoria
+    data = {}
+    for split in ("train", "val"):
+        x = np.ascontiguousarray(inputs[starts[split]])
+        y = blended_targets(teacher, inputs, outputs, starts[split], alpha, batch_size)
+        data[split] = (x, y, np.arange(len(x)))
+
+    student = compile_model(build_student_model(kind), learning_rate)
+    history = student.fit(
+        WindowBatches(*data["train"], batch_size, shuffle=True, seed=seed),
+        validation_data=WindowBatches(*data["val"], batch_size, shuffle=False),
+        epochs=max_epochs,
+        shuffle=False,
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.2, patience=5, min_lr=1e-5),
+        ],
+        verbose=verbose,
+    )
+
+    metrics = {
+        "teacher": evaluate_windows(teacher, inputs, kwh, starts["test"], target_scaler, batch_size),
+        "student": evaluate_windows(student, inputs, kwh, starts["test"], target_scaler, batch_size),
+    }
+    last = int(starts["test"][-1])
+    window = np.asarray(values[last:last + WINDOW_SIZE_HOURS], dtype=np.float32)  # Cruda, como en producción
+    for name, model in (("teacher", teacher), ("student", student)):
+        metrics[name]["latency_p50_ms"] = single_window_latency_ms(
+            ForecastPipeline(model, feature_scaler, target_scaler), window)
+        metrics[name].update(model_footprint(model))
+    reduction = {
+        "latency_x": metrics["teacher"]["latency_p50_ms"] / metrics["student"]["latency_p50_ms"],
+        "params_x": metrics["teacher"]["params"] / metrics["student"]["params"],
+        "size_x": metrics["teacher"]["size_bytes"] / metrics["student"]["size_bytes"],
+    }
+    gate = validation_gate(metrics["student"], metrics["teacher"], accuracy_budget)
+    logging.info(f"Destilación ({kind}): latencia /{reduction['latency_x']:.1f}, parámetros "
+                 f"/{reduction['params_x']:.1f}, tamaño /{reduction['size_x']:.1f}.")
+
+    metadata = {
+        "mode": "distill",
+        "student_kind": kind,
+        "alpha": alpha,
+        "data_start_epoch": int(epochs[0]),
+        "data_end_epoch": int(epochs[-1]),
+        "n_windows": {k: int(len(v)) for k, v in starts.items()},
+        "step_hours": step,
+        "epochs_run": len(history.history["loss"]),
+        "teacher": metrics["teacher"],
+        "student": metrics["student"],
+        "reduction": reduction,
+        "gate": gate,
+        "seed": seed,
+    }
+    return {"model": student, "feature_scaler": feature_scaler,
+            "target_scaler": target_scaler, "metadata": metadata}
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/finetune.py
+"""Re-entrenamiento incremental (warm start) a partir del modelo en producción.
+
+Se parte de los pesos del campeón y de SUS scalers (el modelo aprendió en esa
+escala, así que no se re-ajustan), y se entrena unas pocas épocas con tasa de
+aprendizaje baja sobre los pares recientes más una muestra de repetición
+(replay) de pares antiguos, para no olvidar estacionalidades. Los pares de los
+últimos `holdout_origins` orígenes quedan fuera del ajuste y deciden la
+compuerta de validación.
+"""
+
+import logging
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow import keras
+
+from scripts.prediction_utils import WINDOW_SIZE_HOURS
+from scripts.training.model import compile_model
+from scripts.training.pipeline import (MAX_REGRESSION, evaluate_windows,
+                                       scale_features, validation_gate)
+from scripts.training.windows import (TARGET_FEATURE_INDEX, WindowBatches,
+                                      training_window_starts, window_pair_views)
+
+RECENT_HOURS = 8 * 7 * 24       # Orígenes recientes usados para el ajuste
+HOLDOUT_ORIGINS = 14            # Orígenes más recientes (cada RECENT_STEP) reservados para la compuerta
+RECENT_STEP = 24                # Pares diarios (más densos que el semanal del entrenamiento completo)
+REPLAY_RATIO = 1.0              # Pares antiguos por cada par reciente
+FINETUNE_EPOCHS = 3
+FINETUNE_LEARNING_RATE = 1e-4
+
+
+def finetune_window_starts(
+    epochs: np.ndarray,
+    recent_hours: int = RECENT_HOURS,
+    holdout_origins: int = HOLDOUT_ORIGINS,
+    step: int = RECENT_STEP,
+    replay_ratio: float = REPLAY_RATIO,
+    seed: int = 0,
+    window: int = WINDOW_SIZE_HOURS
+) -> dict[str, np.ndarray]:
+    """
+    Inicios de pares para el ajuste (recientes + replay) y para la compuerta (holdout).
+
+    Los pares de holdout tienen su salida en [cut, n) y los de ajuste terminan
+    antes de `cut`, sin fuga entre ambos.
+    """
+    n = len(epochs)
+    cut = n - window - (holdout_origins - 1) * step
+    if cut - 2 * window < 0:
+        raise ValueError(f"Histórico insuficiente para fine-tuning ({n} horas).")
+    holdout = training_window_starts(epochs, cut - window, n, window=window, step=step)
+    recent_lo = max(0, cut - recent_hours - 2 * window)
+    recent = training_window_starts(epochs, recent_lo, cut, window=window, step=step)
+    older = training_window_starts(epochs, 0, recent_lo + 2 * window - 1, window=window, step=step)
+    n_replay = min(len(older), int(round(len(recent) * replay_ratio)))
+    replay = np.sort(np.random.default_rng(seed).choice(older, n_replay, replace=False)) if n_replay else older[:0]
+    if len(recent) == 0 or len(holdout) == 0:
+        raise ValueError("No hay pares completos recientes o de holdout para el fine-tuning.")
+    logging.info(f"Fine-tune: {len(recent)} pares recientes, {len(replay)} de replay, {len(holdout)} de holdout.")
+    return {"recent": recent, "replay": replay, "holdout": holdout}
+
+
+def finetune_model(
+    model: keras.Model,
+    feature_scaler: MinMaxScaler,
+    target_scaler: MinMaxScaler,
+    epochs: np.ndarray,
+    values: np.ndarray,
+    max_epochs: int = FINETUNE_EPOCHS,
+    learning_rate: float = FINETUNE_LEARNING_RATE,
+    batch_size: int = 32,
+    max_regression: float = MAX_REGRESSION,
+    seed: int = 0,
+    verbose: int = 2,
+    **start_kwargs
+) -> dict:
+    """
+    Ajusta `model` (pesos del campeón) sobre datos recientes + replay y aplica la compuerta.
+
+    El MAE del campeón en el holdout se mide antes de tocar los pesos; el del
+    modelo ajustado, después, sobre exactamente los mismos pares.
+
+    Returns:
+        {"model", "feature_scaler", "target_scaler", "metadata"} (metadata incluye "gate")
+    """
+    keras.utils.set_random_seed(seed)
+    scaled = scale_features(values, feature_scaler)
+    inputs, outputs = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+    kwh = np.asarray(values[:, TARGET_FEATURE_INDEX], dtype=np.float64)
+    starts = finetune_window_starts(epochs, seed=seed, **start_kwargs)
+
+    baseline = evaluate_windows(model, inputs, kwh, starts["holdout"], target_scaler, batch_size)
+    train_starts = np.concatenate([starts["replay"], starts["recent"]])
+    compile_model(model, learning_rate)
+    history = model.fit(
+        WindowBatches(inputs, outputs, train_starts, batch_size, shuffle=True, seed=seed),
+        epochs=max_epochs,
+        shuffle=False,
+        verbose=verbose,
+    )
+    candidate = evaluate_windows(model, inputs, kwh, starts["holdout"], target_scaler, batch_size)
+    gate = validation_gate(candidate, baseline, max_regression)
+
+    metadata = {
+        "mode": "finetune",
+        "data_start_epoch": int(epochs[0]),
+        "data_end_epoch": int(epochs[-1]),
+        "n_windows": {k: int(len(v)) for k, v in starts.items()},
+        "epochs_run": len(history.history["loss"]),
+        "learning_rate": learning_rate,
+        "holdout": {"candidate": candidate, "baseline": baseline},
+        "gate": gate,
+        "seed": seed,
+    }
+    return {"model": model, "feature_scaler": feature_scaler,
+            "target_scaler": target_scaler, "metadata": metadata}
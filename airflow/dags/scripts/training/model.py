@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/model.py
+"""Arquitectura LSTM seq2seq de producción (igual a la del notebook) y estudiantes livianos."""
+
+from tensorflow import keras
+
+from scripts.prediction_utils import N_FEATURES, WINDOW_SIZE_HOURS
+
+LSTM_UNITS = (100, 80)
+LEARNING_RATE = 0.001
+STUDENT_KINDS = ("conv", "gru")
+STUDENT_FILTERS = 16
+STUDENT_DILATIONS = (1, 2, 4, 8, 16, 32, 64, 128)  # Campo receptivo de 256h con kernel 2
+STUDENT_GRU_UNITS = 32
+
+
+def build_lstm_model(units: tuple[int, int] = LSTM_UNITS,
+                     window_size: int = WINDOW_SIZE_HOURS,
+                     n_features: int = N_FEATURES) -> keras.Model:
+    """LSTM(100) -> LSTM(80) -> TimeDistributed(Dense(1)), una salida por paso."""
+    return keras.Sequential([
+        keras.Input(shape=(window_size, n_features)),
+        keras.layers.LSTM(units=units[0], return_sequences=True, name="LSTM_1"),
+        keras.layers.LSTM(units=units[1], return_sequences=True, name="LSTM_2"),
+        keras.layers.TimeDistributed(keras.layers.Dense(units=1, activation="linear"), name="Output_kWh"),
+    ], name="LSTM_Seq2Seq_Demanda")
+
+
+def build_student_model(kind: str = "conv",
+                        window_size: int = WINDOW_SIZE_HOURS,
+                        n_features: int = N_FEATURES) -> keras.Model:
+    """
+    Estudiante con la misma entrada/salida que el LSTM (una salida por paso, causal).
+
+    "conv": Conv1D causales dilatadas (sin recurrencia, paralelas en el tiempo).
+    "gru": una GRU pequeña.
+    """
+    if kind == "conv":
+        hidden = [keras.layers.Conv1D(STUDENT_FILTERS, kernel_size=2, dilation_rate=d, padding="causal",
+                                      activation="relu", name=f"Conv_d{d}") for d in STUDENT_DILATIONS]
+    elif kind == "gru":
+        hidden = [keras.layers.GRU(STUDENT_GRU_UNITS, return_sequences=True, name="GRU_1")]
+    else:
+        raise ValueError(f"Tipo de estudiante desconocido '{kind}'. Opciones: {STUDENT_KINDS}")
+    return keras.Sequential([
+        keras.Input(shape=(window_size, n_features)),
+        *hidden,
+        keras.layers.TimeDistributed(keras.layers.Dense(units=1, activation="linear"), name="Output_kWh"),
+    ], name=f"Estudiante_{kind}_Demanda")
+
+
+def compile_model(model: keras.Model, learning_rate: float = LEARNING_RATE) -> keras.Model:
+    """Adam + MSE con MAE como métrica, como en el notebook."""
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate), loss="mse", metrics=["mae"])
+    return model
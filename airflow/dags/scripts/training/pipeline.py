@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/pipeline.py
+"""Entrenamiento reproducible: división temporal, escalado, ajuste, evaluación y bundle."""
+
+import json
+import logging
+import os
+
+import joblib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow import keras
+
+from scripts.prediction_utils import WINDOW_SIZE_HOURS
+from scripts.training.model import LSTM_UNITS, build_lstm_model, compile_model
+from scripts.training.windows import (TARGET_FEATURE_INDEX, WindowBatches,
+                                      align_to_monday, make_window_dataset,
+                                      training_window_starts, window_pair_views)
+
+# Mismos nombres de archivo que `artifact_utils.ARTIFACT_KEYS`
+BUNDLE_FILES = {
+    "model": "lstm_demand_model.keras",
+    "feature_scaler": "feature_scaler.joblib",
+    "target_scaler": "target_scaler.joblib",
+    "metadata": "metadata.json",
+}
+TRAIN_FRACTION = 0.70
+VAL_FRACTION = 0.20  # El resto (10%) es prueba
+STEP_WINDOW = 168
+MAX_REGRESSION = 0.02  # La compuerta tolera hasta 2% más MAE que el modelo de referencia
+
+
+def split_bounds(n_rows: int, train_fraction: float = TRAIN_FRACTION,
+                 val_fraction: float = VAL_FRACTION) -> tuple[int, int]:
+    """Fin (exclusivo) de entrenamiento y de validación; la prueba va hasta `n_rows`."""
+    return int(n_rows * train_fraction), int(n_rows * (train_fraction + val_fraction))
+
+
+def fit_scalers(train_values: np.ndarray) -> tuple[MinMaxScaler, MinMaxScaler]:
+    """Scalers de features y de kWh ajustados SOLO con el tramo de entrenamiento."""
+    feature_scaler = MinMaxScaler(feature_range=(0, 1)).fit(train_values)
+    target_scaler = MinMaxScaler(feature_range=(0, 1)).fit(train_values[:, TARGET_FEATURE_INDEX:TARGET_FEATURE_INDEX + 1])
+    return feature_scaler, target_scaler
+
+
+def scale_features(values: np.ndarray, feature_scaler: MinMaxScaler) -> np.ndarray:
+    """`feature_scaler.transform` en float32 (una sola copia, sin pasar por float64)."""
+    scale = np.asarray(feature_scaler.scale_, dtype=np.float32)
+    offset = np.asarray(feature_scaler.min_, dtype=np.float32)
+    scaled = np.asarray(values, dtype=np.float32) * scale
+    scaled += offset
+    return scaled
+
+
+def predict_windows(model: keras.Model, inputs: np.ndarray, starts: np.ndarray,
+                    target_scaler: MinMaxScaler, batch_size: int = 32) -> np.ndarray:
+    """Predicciones en kWh (len(starts), window) para las entradas que empiezan en `starts`."""
+    preds = model.predict(WindowBatches(inputs, None, starts, batch_size, shuffle=False), verbose=0)
+    return (preds[..., 0] - target_scaler.min_[0]) / target_scaler.scale_[0]
+
+
+def evaluate_windows(model: keras.Model, inputs: np.ndarray, kwh: np.ndarray,
+                     starts: np.ndarray, target_scaler: MinMaxScaler,
+                     batch_size: int = 32, window: int = WINDOW_SIZE_HOURS) -> dict:
+    """MAE y RMSE en kWh sobre los pares que empiezan en `starts` (`kwh`: serie sin escalar)."""
+    if len(starts) == 0:
+        return {"mae_kwh": None, "rmse_kwh": None, "n_windows": 0}
+    preds = predict_windows(model, inputs, starts, target_scaler, batch_size)
+    actual = sliding_window_view(kwh, window)[np.asarray(starts) + window]
+    errors = preds - actual
+    return {
+        "mae_kwh": float(np.mean(np.abs(errors))),
+        "rmse_kwh": float(np.sqrt(np.mean(errors ** 2))),
+        "n_windows": int(len(starts)),
+    }
+
+
+def validation_gate(candidate: dict, baseline: dict, max_regression: float = MAX_REGRESSION) -> dict:
+    """
+    Compuerta estándar: el candidato pasa si su MAE no supera al de referencia
+    en más de `max_regression` (relativo) sobre los mismos pares.
+    """
+    limit = baseline["mae_kwh"] * (1 + max_regression)
+    passed = candidate["mae_kwh"] <= limit
+    logging.info(f"Compuerta: candidato MAE {candidate['mae_kwh']:.1f} vs referencia "
+                 f"{baseline['mae_kwh']:.1f} (límite {limit:.1f}) -> {'APRUEBA' if passed else 'RECHAZA'}")
+    return {"passed": bool(passed), "candidate_mae_kwh": candidate["mae_kwh"],
+            "baseline_mae_kwh": baseline["mae_kwh"], "max_regression": max_regression}
+
+
+def split_window_starts(epochs: np.ndarray, step: int = STEP_WINDOW) -> dict[str, np.ndarray]:
+    """Inicios de pares de cada tramo (train/val/test); falla si alguno queda vacío."""
+    train_end, val_end = split_bounds(len(epochs))
+    starts = {
+        "train": training_window_starts(epochs, 0, train_end, step=step),
+        "val": training_window_starts(epochs, train_end, val_end, step=step),
+        "test": training_window_starts(epochs, val_end, len(epochs), step=step),
+    }
+    for name, split_starts in starts.items():
+        if len(split_starts) == 0:
+            raise ValueError(f"El tramo '{name}' no tiene ningún par completo de {2 * WINDOW_SIZE_HOURS}h.")
+    logging.info("Training: pares por tramo " + ", ".join(f"{k}={len(v)}" for k, v in starts.items()))
+    return starts
+
+
+def _fit_and_report(model, train_data, val_data, epochs: np.ndarray, scaled: np.ndarray,
+                    starts: dict, feature_scaler: MinMaxScaler, target_scaler: MinMaxScaler,
+                    step: int, max_epochs: int, batch_size: int, units: tuple[int, int],
+                    seed: int, verbose: int) -> dict:
+    """Ajusta con los callbacks del notebook, evalúa en prueba y arma el resultado."""
+    history = model.fit(
+        train_data,
+        validation_data=val_data,
+        epochs=max_epochs,
+        shuffle=False,  # Las fuentes ya barajan los inicios de ventana por época
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.2, patience=5, min_lr=1e-5),
+        ],
+        verbose=verbose,
+    )
+    # kWh real del tramo de prueba desde la serie escalada (sólo ese tramo se des-escala)
+    test_lo = int(starts["test"][0])
+    kwh = (np.asarray(scaled[test_lo:, TARGET_FEATURE_INDEX], dtype=np.float64)
+           - target_scaler.min_[0]) / target_scaler.scale_[0]
+    inputs, _ = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+    test_metrics = evaluate_windows(model, inputs[test_lo:], kwh, starts["test"] - test_lo,
+                                    target_scaler, batch_size)
+    logging.info(f"Training: prueba MAE {test_metrics['mae_kwh']:.1f} kWh, RMSE {test_metrics['rmse_kwh']:.1f} kWh")
+
+    train_end, val_end = split_bounds(len(epochs))
+    metadata = {
+        "data_start_epoch": int(epochs[0]),
+        "data_end_epoch": int(epochs[-1]),
+        "n_rows": int(len(epochs)),
+        "train_end_epoch": int(epochs[train_end - 1]),
+        "val_end_epoch": int(epochs[val_end - 1]),
+        "n_windows": {k: int(len(v)) for k, v in starts.items()},
+        "step_hours": step,
+        "units": list(units),
+        "epochs_run": len(history.history["loss"]),
+        "best_val_loss": float(np.min(history.history["val_loss"])),
+        "test": test_metrics,
+        "seed": seed,
+    }
+    return {"model": model, "feature_scaler": feature_scaler,
+            "target_scaler": target_scaler, "metadata": metadata}
+
+
+def train_model(
+    epochs: np.ndarray,
+    values: np.ndarray,
+    step: int = STEP_WINDOW,
+    max_epochs: int = 50,
+    batch_size: int = 32,
+    units: tuple[int, int] = LSTM_UNITS,
+    align_monday: bool = True,
+    seed: int = 0,
+    verbose: int = 2
+) -> dict:
+    """
+    Entrena el modelo como el notebook, sobre arreglos (epochs, valores (n, 5)).
+
+    División temporal 70/20/10, scalers ajustados sólo con entrenamiento,
+    pares (entrada, salida) cada `step` horas dentro de cada tramo, EarlyStopping
+    y ReduceLROnPlateau sobre `val_loss`.
+
+    Returns:
+        {"model", "feature_scaler", "target_scaler", "metadata"}
+    """
+    keras.utils.set_random_seed(seed)
+    start = align_to_monday(epochs) if align_monday else 0
+    epochs, values = epochs[start:], values[start:]  # Vistas
+    train_end, _ = split_bounds(len(values))
+
+    feature_scaler, target_scaler = fit_scalers(values[:train_end])
+    scaled = scale_features(values, feature_scaler)
+    inputs, outputs = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+    starts = split_window_starts(epochs, step)
+
+    return _fit_and_report(
+        compile_model(build_lstm_model(units)),
+        WindowBatches(inputs, outputs, starts["train"], batch_size, shuffle=True, seed=seed),
+        WindowBatches(inputs, outputs, starts["val"], batch_size, shuffle=False),
+        epochs, scaled, starts, feature_scaler, target_scaler,
+        step, max_epochs, batch_size, units, seed, verbose,
+    )
+
+
+def train_model_from_snapshot(
+    snapshot: dict,
+    step: int = STEP_WINDOW,
+    max_epochs: int = 50,
+    batch_size: int = 32,
+    units: tuple[int, int] = LSTM_UNITS,
+    seed: int = 0,
+    verbose: int = 2
+) -> dict:
+    """
+    Igual que `train_model`, pero sobre un snapshot del almacén (memmap).
+
+    Las ventanas se generan por lote con `tf.data` (barajado, lotes, prefetch)
+    y nunca se carga el histórico completo en memoria.
+    """
+    keras.utils.set_random_seed(seed)
+    epochs, scaled = snapshot["epochs"], snapshot["scaled"]
+    starts = split_window_starts(epochs, step)
+    result = _fit_and_report(
+        compile_model(build_lstm_model(units)),
+        make_window_dataset(scaled, starts["train"], batch_size, shuffle=True, seed=seed),
+        make_window_dataset(scaled, starts["val"], batch_size, shuffle=False),
+        epochs, scaled, starts, snapshot["feature_scaler"], snapshot["target_scaler"],
+        step, max_epochs, batch_size, units, seed, verbose,
+    )
+    result["metadata"]["dataset_snapshot"] = snapshot["key"]
+    return result
+
+
+def save_bundle(result: dict, local_dir: str, extra_metadata: dict | None = None) -> dict[str, str]:
+    """Guarda modelo, scalers y metadatos con los nombres que espera la inferencia."""
+    os.makedirs(local_dir, exist_ok=True)
+    paths = {name: os.path.join(local_dir, file_name) for name, file_name in BUNDLE_FILES.items()}
+    result["model"].save(paths["model"])
+    joblib.dump(result["feature_scaler"], paths["feature_scaler"])
+    joblib.dump(result["target_scaler"], paths["target_scaler"])
+    with open(paths["metadata"], "w", encoding="utf-8") as f:
+        json.dump({**result["metadata"], **(extra_metadata or {})}, f, indent=2)
+    logging.info(f"Training: bundle guardado en {local_dir}")
+    return paths
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/search.py
+"""Búsqueda paralela de hiperparámetros sobre un pool de procesos (sólo CPU).
+
+Cada proceso de trabajo (`workers.snapshot_pool`) abre el mismo snapshot
+memmap del almacén (sin copiarlo), con hilos de TensorFlow fijos, y entrena un
+ensayo a la vez. Los ensayos reportan su mejor `val_loss` por época en un
+diccionario compartido y se podan con la regla de la mediana: si tras `PRUNE_WARMUP_EPOCHS` épocas un ensayo va
+peor que la mediana de los demás en la misma época, se detiene.
+
+Todos los ensayos se validan sobre los MISMOS pares (cada `SEARCH_VAL_STEP`
+horas del tramo de validación), sin importar su `step` de entrenamiento, así
+que sus pérdidas son comparables. El tramo de prueba no se toca.
+
+Las GPU se ocultan y los hilos se fijan en cada proceso antes de crear
+cualquier tensor (ver `workers`).
+
+Uso fuera de Airflow:
+    python -m scripts.training.search --snapshot-dir /tmp/training_store/<clave> --trials 12
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from scripts.training.snapshot import open_snapshot
+from scripts.training.workers import (THREADS_PER_WORKER, pool_size,
+                                      snapshot_pool, worker_state)
+
+SEARCH_SPACE = {
+    "units": [(100, 80), (64, 48), (128, 96)],
+    "learning_rate": [1e-3, 5e-4, 2e-3],
+    "batch_size": [16, 32, 64],
+    "step": [24, 84, 168],  # STEP_WINDOW: separación entre pares de entrenamiento
+}
+BASELINE_CONFIG = {"units": (100, 80), "learning_rate": 1e-3, "batch_size": 32, "step": 168}  # Notebook
+SEARCH_VAL_STEP = 24
+SEARCH_MAX_EPOCHS = 20
+TRIAL_PATIENCE = 5
+PRUNE_WARMUP_EPOCHS = 3
+PRUNE_MIN_REPORTS = 3  # Reportes de otros ensayos en la misma época antes de podar
+
+
+def sample_configs(space: dict = SEARCH_SPACE, n_trials: int = 12, seed: int = 0) -> list[dict]:
+    """
+    Hasta `n_trials` combinaciones distintas de la grilla, en orden aleatorio.
+
+    La configuración del notebook va primero (si está en la grilla) para que
+    haya una referencia temprana contra la cual podar.
+    """
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(grid))
+    configs = [grid[i] for i in order]
+    if BASELINE_CONFIG in configs:
+        configs.remove(BASELINE_CONFIG)
+        configs.insert(0, BASELINE_CONFIG)
+    return configs[:n_trials]
+
+
+def _median_pruner(reports, lock, warmup: int, min_reports: int):
+    """Callback de Keras que aplica la regla de la mediana sobre `reports` (época -> pérdidas)."""
+    from tensorflow import keras
+
+    class MedianPruner(keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.best = np.inf
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.best = min(self.best, float((logs or {}).get("val_loss", np.inf)))
+            with lock:
+                others = list(reports.get(epoch, []))
+                reports[epoch] = others + [self.best]
+            if epoch + 1 >= warmup and len(others) >= min_reports and self.best > np.median(others):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return MedianPruner()
+
+
+def _run_trial(trial_id: int, config: dict, max_epochs: int, seed: int) -> dict:
+    """Entrena y valida un ensayo dentro del proceso de trabajo."""
+    from tensorflow import keras
+
+    from scripts.training.model import build_lstm_model, compile_model
+    from scripts.training.pipeline import evaluate_windows, split_bounds
+    from scripts.training.windows import (TARGET_FEATURE_INDEX,
+                                          make_window_dataset,
+                                          training_window_starts,
+                                          window_pair_views)
+
+    t0 = time.perf_counter()
+    state = worker_state()
+    snapshot = state["snapshot"]
+    epochs, scaled, target_scaler = snapshot["epochs"], snapshot["scaled"], snapshot["target_scaler"]
+    train_end, val_end = split_bounds(len(epochs))
+    train_starts = training_window_starts(epochs, 0, train_end, step=config["step"])
+    val_starts = training_window_starts(epochs, train_end, val_end, step=SEARCH_VAL_STEP)
+    if len(train_starts) == 0 or len(val_starts) == 0:
+        raise ValueError("El snapshot no tiene pares completos de entrenamiento o validación.")
+
+    keras.utils.set_random_seed(seed)
+    pruner = _median_pruner(state["reports"], state["lock"], PRUNE_WARMUP_EPOCHS, PRUNE_MIN_REPORTS)
+    model = compile_model(build_lstm_model(tuple(config["units"])), config["learning_rate"])
+    history = model.fit(
+        make_window_dataset(scaled, train_starts, config["batch_size"], shuffle=True, seed=seed),
+        validation_data=make_window_dataset(scaled, val_starts, config["batch_size"], shuffle=False),
+        epochs=max_epochs,
+        shuffle=False,
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor="val_loss", patience=TRIAL_PATIENCE, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.2, patience=3, min_lr=1e-5),
+            pruner,
+        ],
+        verbose=0,
+    )
+
+    val_metrics = {"mae_kwh": None}
+    if pruner.pruned_at is None:
+        lo = int(val_starts[0])
+        kwh = (np.asarray(scaled[lo:val_end, TARGET_FEATURE_INDEX], dtype=np.float64)
+               - target_scaler.min_[0]) / target_scaler.scale_[0]
+        inputs, _ = window_pair_views(scaled, TARGET_FEATURE_INDEX)
+        val_metrics = evaluate_windows(model, inputs[lo:], kwh, val_starts - lo,
+                                       target_scaler, config["batch_size"])
+    return {
+        "trial_id": trial_id,
+        "config": {**config, "units": list(config["units"])},
+        "status": "pruned" if pruner.pruned_at is not None else "completed",
+        "best_val_loss": float(np.min(history.history["val_loss"])),
+        "val_mae_kwh": val_metrics["mae_kwh"],
+        "epochs_run": len(history.history["loss"]),
+        "pruned_at_epoch": pruner.pruned_at,
+        "n_train_windows": int(len(train_starts)),
+        "duration_s": round(time.perf_counter() - t0, 2),
+        "pid": os.getpid(),
+    }
+
+
+def run_search(
+    snapshot: dict,
+    n_trials: int = 12,
+    space: dict = SEARCH_SPACE,
+    max_epochs: int = SEARCH_MAX_EPOCHS,
+    threads_per_worker: int = THREADS_PER_WORKER,
+    max_workers: int | None = None,
+    seed: int = 0
+) -> dict:
+    """
+    Ejecuta la búsqueda en un pool de `núcleos // threads_per_worker` procesos.
+
+    Un ensayo que falla queda registrado con estado "failed" sin detener la búsqueda.
+
+    Returns:
+        {"search_id", "n_workers", "threads_per_worker", "trials" (ordenados por
+        best_val_loss), "best" (config del mejor ensayo completo o None)}
+    """
+    configs = sample_configs(space, n_trials, seed)
+    n_workers = pool_size(len(configs), threads_per_worker, max_workers)
+    search_id = f"search_{time.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    logging.info(f"Búsqueda {search_id}: {len(configs)} ensayos en {n_workers} procesos "
+                 f"x {threads_per_worker} hilos (snapshot {snapshot['key']}).")
+
+    trials = []
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        extra = {"reports": manager.dict(), "lock": manager.Lock()}
+        with snapshot_pool(snapshot["dir"], n_workers, threads_per_worker, extra) as pool:
+            futures = {pool.submit(_run_trial, i, config, max_epochs, seed): (i, config)
+                       for i, config in enumerate(configs)}
+            for future in as_completed(futures):
+                trial_id, config = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    logging.error(f"Búsqueda: ensayo {trial_id} falló: {e}")
+                    record = {"trial_id": trial_id, "config": {**config, "units": list(config["units"])},
+                              "status": "failed", "best_val_loss": None, "val_mae_kwh": None,
+                              "epochs_run": 0, "pruned_at_epoch": None, "error": str(e)}
+                logging.info(f"Búsqueda: ensayo {trial_id} {record['status']} {record['config']} "
+                             f"val_loss={record['best_val_loss']}")
+                trials.append(record)
+
+    trials.sort(key=lambda r: (r["best_val_loss"] is None, r["best_val_loss"] or 0.0))
+    completed = [r for r in trials if r["status"] == "completed"]
+    return {
+        "search_id": search_id,
+        "snapshot": snapshot["key"],
+        "n_workers": n_workers,
+        "threads_per_worker": threads_per_worker,
+        "trials": trials,
+        "best": completed[0]["config"] if completed else None,
+    }
+
+
+def main() -> None:
+    """CLI: busca sobre un snapshot ya materializado y escribe los ensayos en JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot-dir", required=True)
+    parser.add_argument("--trials", type=int, default=12)
+    parser.add_argument("--max-epochs", type=int, default=SEARCH_MAX_EPOCHS)
+    parser.add_argument("--threads-per-worker", type=int, default=THREADS_PER_WORKER)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="search_results.json")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    result = run_search(open_snapshot(args.snapshot_dir), args.trials, max_epochs=args.max_epochs,
+                        threads_per_worker=args.threads_per_worker, max_workers=args.workers, seed=args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    logging.info(f"Búsqueda: resultados en {args.output}; mejor configuración {result['best']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/snapshot.py
+"""Lectura de snapshots del almacén de entrenamiento (sin dependencias de BD ni Airflow).
+
+Separado de `dataset_store` para que procesos de trabajo (búsqueda de
+hiperparámetros, validación cruzada) abran el mismo memmap sin importar Airflow.
+"""
+
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def snapshot_key(fingerprint: dict, train_fraction: float, align_monday: bool,
+                 scaler_source: str = "train_split") -> str:
+    """Clave estable del snapshot: huella de datos + parámetros que afectan el escalado."""
+    payload = json.dumps({**fingerprint, "train_fraction": train_fraction, "align_monday": align_monday,
+                          "scaler_source": scaler_source, "format": STORE_FORMAT_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_snapshot(store_root: str, key: str) -> dict | None:
+    """Abre un snapshot completo (memmap de sólo lectura) o devuelve None si no existe."""
+    snapshot_dir = os.path.join(store_root, key)
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return {
+        "key": key,
+        "dir": snapshot_dir,
+        "manifest": manifest,
+        "epochs": np.load(os.path.join(snapshot_dir, "epochs.npy"), mmap_mode="r"),
+        "scaled": np.load(os.path.join(snapshot_dir, "scaled.npy"), mmap_mode="r"),
+        "feature_scaler": joblib.load(os.path.join(snapshot_dir, "feature_scaler.joblib")),
+        "target_scaler": joblib.load(os.path.join(snapshot_dir, "target_scaler.joblib")),
+    }
+
+
+def open_snapshot(snapshot_dir: str) -> dict:
+    """`load_snapshot` a partir de la ruta del directorio; falla si el snapshot no está completo."""
+    store_root, key = os.path.split(os.path.normpath(snapshot_dir))
+    snapshot = load_snapshot(store_root, key)
+    if snapshot is None:
+        raise FileNotFoundError(f"No hay snapshot completo en {snapshot_dir}")
+    return snapshot
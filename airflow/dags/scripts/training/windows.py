@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/windows.py
+"""Ventanas de entrenamiento (entrada 336h -> salida 336h) como vistas, sin copias.
+
+El notebook armaba listas de slices y luego las copiaba a arreglos nuevos,
+duplicando (o más, con ventanas solapadas) la memoria del histórico. Aquí las
+ventanas son vistas con strides sobre el arreglo escalado y sólo se copia el
+lote que Keras consume en cada paso.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import tensorflow as tf
+from tensorflow import keras
+
+from scripts.prediction_utils import N_FEATURES, TARGET_FEATURE_INDEX, WINDOW_SIZE_HOURS
+
+HOUR_SECONDS = 3600
+# demanda_historico guarda la hora de pared de Bogotá etiquetada como UTC: los epochs
+# ya están en hora local y no hay que desplazarlos
+HISTORY_UTC_OFFSET_HOURS = 0
+
+
+def align_to_monday(epochs: np.ndarray, utc_offset_hours: int = HISTORY_UTC_OFFSET_HOURS) -> int:
+    """Índice de la primera hora que cae en lunes 00:00 (hora local), como el notebook."""
+    local_hours = (np.asarray(epochs, dtype=np.int64) // HOUR_SECONDS) + utc_offset_hours
+    # 1970-01-01 fue jueves: (días + 3) % 7 == 0 es lunes
+    is_monday_midnight = (local_hours % 24 == 0) & ((local_hours // 24 + 3) % 7 == 0)
+    hits = np.flatnonzero(is_monday_midnight)
+    if hits.size == 0:
+        raise ValueError("El histórico no contiene ningún lunes 00:00.")
+    return int(hits[0])
+
+
+def window_pair_views(
+    scaled: np.ndarray,
+    target_index: int = TARGET_FEATURE_INDEX,
+    window: int = WINDOW_SIZE_HOURS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vistas de todos los pares (entrada, salida) que caben en `scaled`.
+
+    X[i] = scaled[i : i + window] (window, F) y y[i] = kWh[i + window : i + 2 * window]
+    (window, 1). Ninguna de las dos copia datos.
+    """
+    n_pairs = len(scaled) - 2 * window + 1
+    if n_pairs <= 0:
+        raise ValueError(f"Se necesitan al menos {2 * window} horas; hay {len(scaled)}.")
+    # sliding_window_view agrega el eje de ventana al final: (T-w+1, F, w) -> (T-w+1, w, F)
+    inputs = sliding_window_view(scaled, window, axis=0).transpose(0, 2, 1)[:n_pairs]
+    outputs = sliding_window_view(scaled[:, target_index], window)[window:][..., np.newaxis]
+    return inputs, outputs
+
+
+def training_window_starts(
+    epochs: np.ndarray,
+    lo: int,
+    hi: int,
+    window: int = WINDOW_SIZE_HOURS,
+    step: int = 168
+) -> np.ndarray:
+    """
+    Inicios de pares completos dentro de [lo, hi) cada `step` horas.
+
+    Descarta los pares que cruzan un hueco horario, para que una hora faltante
+    no desplace la salida respecto a la entrada.
+    """
+    starts = np.arange(lo, hi - 2 * window + 1, step, dtype=np.int64)
+    if starts.size == 0:
+        return starts
+    gaps = np.concatenate(([0], np.cumsum(np.diff(epochs) != HOUR_SECONDS)))
+    return starts[gaps[starts + 2 * window - 1] == gaps[starts]]
+
+
+class WindowBatches(keras.utils.PyDataset):
+    """Lotes para `model.fit` que copian sólo las ventanas del lote desde las vistas.
+
+    Con `outputs=None` devuelve sólo entradas (para `model.predict`).
+    """
+
+    def __init__(self, inputs: np.ndarray, outputs: np.ndarray | None, starts: np.ndarray,
+                 batch_size: int = 32, shuffle: bool = True, seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = self.starts.copy()
+        self.on_epoch_end()
+
+    def __len__(self) -> int:
+        return -(-len(self.starts) // self.batch_size)
+
+    def __getitem__(self, index: int):
+        idx = self._order[index * self.batch_size:(index + 1) * self.batch_size]
+        if self.outputs is None:
+            return self.inputs[idx]
+        return self.inputs[idx], self.outputs[idx]
+
+    def on_epoch_end(self) -> None:
+        if self.shuffle:
+            self._order = self._rng.permutation(self.starts)
+
+
+def make_window_dataset(
+    scaled: np.ndarray,
+    starts: np.ndarray,
+    batch_size: int = 32,
+    shuffle: bool = True,
+    seed: int = 0,
+    window: int = WINDOW_SIZE_HOURS
+) -> tf.data.Dataset:
+    """
+    `tf.data` de pares (entrada, salida) armados por lote (p. ej. desde un memmap).
+
+    El dataset sólo contiene los índices de inicio; cada lote lee sus ventanas
+    de las vistas con strides sobre `scaled`, con barajado por época y prefetch.
+    """
+    inputs, outputs = window_pair_views(scaled, TARGET_FEATURE_INDEX, window)
+
+    def gather(idx):
+        return np.ascontiguousarray(inputs[idx]), np.ascontiguousarray(outputs[idx])
+
+    def gather_tf(idx):
+        x, y = tf.numpy_function(gather, [idx], (tf.float32, tf.float32))
+        x.set_shape((None, window, N_FEATURES))
+        y.set_shape((None, window, 1))
+        return x, y
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+    if shuffle:
+        dataset = dataset.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    return (dataset.batch(batch_size)
+            .map(gather_tf, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Archivo: scripts/training/workers.py
+"""Pool de procesos de entrenamiento sólo CPU que comparten un snapshot memmap.
+
+Cada proceso oculta las GPU, fija sus hilos intra/inter-op de TensorFlow (N
+procesos x `threads` hilos no sobre-suscriben los núcleos) y abre el snapshot
+una sola vez con `mmap_mode="r"`: las páginas las comparte el SO, no se copian.
+Se usa `spawn` porque el proceso padre puede tener TensorFlow ya inicializado.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.training.snapshot import open_snapshot
+
+THREADS_PER_WORKER = 2
+
+# Estado del proceso de trabajo (lo llena `_init_worker`)
+_STATE: dict = {}
+
+
+def available_cores() -> int:
+    """Núcleos asignados a este proceso (respeta cgroups/affinity si el SO lo expone)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pool_size(n_tasks: int, threads_per_worker: int = THREADS_PER_WORKER,
+              max_workers: int | None = None) -> int:
+    """Procesos a lanzar: `núcleos // threads_per_worker`, sin pasar del número de tareas."""
+    n_workers = max_workers or max(1, available_cores() // threads_per_worker)
+    return max(1, min(n_workers, n_tasks))
+
+
+def _init_worker(snapshot_dir: str, threads: int, extra: dict) -> None:
+    """Inicializador del pool: sólo CPU, hilos fijos y snapshot abierto una vez por proceso."""
+    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+    tf.config.set_visible_devices([], "GPU")
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _STATE.update(extra, snapshot=open_snapshot(snapshot_dir))
+
+
+def worker_state() -> dict:
+    """Estado del proceso actual: "snapshot" y lo pasado en `extra` a `snapshot_pool`."""
+    return _STATE
+
+
+def snapshot_pool(snapshot_dir: str, n_workers: int, threads_per_worker: int = THREADS_PER_WORKER,
+                  extra: dict | None = None) -> ProcessPoolExecutor:
+    """Pool `spawn` cuyos procesos abren `snapshot_dir`; `extra` debe ser serializable (p. ej. proxies de Manager)."""
+    return ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(snapshot_dir, threads_per_worker, extra or {}),
+    )
@@ -57,4 +57,51 @@ def extraer_demanda(fecha_inicio: dt.date, fecha_fin: dt.date) -> pd.DataFrame |
         return df_modelo
     except Exception as e:
         logging.error(f"API Call: Error durante extracción/procesamiento: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+def extraer_demanda_entidades(fecha_inicio: dt.date, fecha_fin: dt.date, entidad: str = "Agente") -> pd.DataFrame | None:
+    """Extrae demanda por entidad (agente/región) en formato largo.
+
+    Devuelve columnas: 'Entidad', 'Datetime', 'Mes', 'Hour', 'Season', 'Dia_habil', 'kWh'.
+    """
+    logging.info(f"API Call: Extrayendo demanda por '{entidad}' para {fecha_inicio} a {fecha_fin}")
+    try:
+        objetoAPI = pydataxm.ReadDB()
+        df_demanda = objetoAPI.request_data("DemaReal", entidad, fecha_inicio, fecha_fin)
+
+        if df_demanda is None or df_demanda.empty:
+            logging.warning(f"API Call: No se obtuvieron datos por '{entidad}' para {fecha_inicio} a {fecha_fin}")
+            return None
+        code_col = 'Values_code' if 'Values_code' in df_demanda.columns else 'Id'
+        logging.info(f"API Call: Datos crudos por '{entidad}' obtenidos ({df_demanda.shape[0]} filas).")
+
+        df_melted = pd.melt(
+            df_demanda, id_vars=[code_col, 'Date'],
+            value_vars=[col for col in df_demanda.columns if col.startswith('Values_Hour')],
+            var_name='Hora_str', value_name='kWh'
+        ).rename(columns={code_col: 'Entidad'})
+        df_melted['kWh'] = pd.to_numeric(df_melted['kWh'], errors='coerce')
+        df_melted.dropna(subset=['kWh'], inplace=True)
+        if df_melted.empty: return None
+
+        df_melted['Hora_num_1_24'] = df_melted['Hora_str'].str.extract(r'(\d+)').astype(int)
+        df_melted['Datetime'] = pd.to_datetime(df_melted['Date']) + pd.to_timedelta(df_melted['Hora_num_1_24'] - 1, unit='h')
+
+        # Calendario por fecha única (no por fila: hay N entidades por hora)
+        cal = Colombia()
+        fechas = df_melted['Datetime'].dt.normalize().unique()
+        habil = {f: 1 if (f.weekday() < 5 and cal.is_working_day(f.date())) else 0 for f in pd.to_datetime(fechas)}
+        df_melted['Dia_habil'] = df_melted['Datetime'].dt.normalize().map(habil)
+
+        df_modelo = df_melted[['Entidad', 'Datetime', 'kWh', 'Dia_habil']].copy()
+        df_modelo['Mes'] = df_modelo['Datetime'].dt.month
+        df_modelo['Hour'] = df_modelo['Datetime'].dt.hour
+        df_modelo['Season'] = df_modelo['Mes'].apply(get_medellin_season_numeric)
+        df_modelo = df_modelo[['Entidad', 'Datetime', 'Mes', 'Hour', 'Season', 'Dia_habil', 'kWh']]
+        df_modelo = df_modelo.sort_values(['Entidad', 'Datetime']).reset_index(drop=True)
+        logging.info(f"API Call: Procesamiento por entidad completado ({df_modelo.shape[0]} filas, "
+                     f"{df_modelo['Entidad'].nunique()} entidades).")
+        return df_modelo
+    except Exception as e:
+        logging.error(f"API Call: Error durante extracción por entidad: {e}", exc_info=True)
+        return None
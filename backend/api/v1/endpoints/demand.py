@@ -1,43 +1,109 @@
 # backend/api/v1/endpoints/demand.py
 import logging
-from typing import Optional, List
-from datetime import datetime
+from typing import Literal, Optional, List
+from datetime import datetime, timedelta, timezone
+import numpy as np
 import pendulum # Para manejo robusto de fechas y zonas horarias
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func # Importar func para count
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.exc import ProgrammingError
 
 from core.database import get_db
+from core import downsampling, export, inference
+from core.pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER,
+                             cached_total, decode_cursor, encode_cursor, store_total)
+from core.read_path import (HISTORICAL_COLUMNS, HISTORICAL_KEYS, HISTORICAL_PAGE_ADAPTER,
+                            HISTORICAL_TABLE, PREDICTION_COLUMNS, PREDICTION_KEYS,
+                            PREDICTION_TABLE, PREDICTIONS_ADAPTER, as_records, json_response)
+from core.series import parse_fields, regular_series, series_response
 from db_models.demand import DemandaHistorico as DBDemandaHistorico
-from db_models.demand import DemandaPrediccion as DBDemandaPrediccion
+from db_models.demand import DemandaHistoricoRollup as DBDemandaHistoricoRollup
+from db_models.demand import DemandaNowcast as DBDemandaNowcast
 from schemas.demand import DemandaHistoricoRead, DemandaHistoricoPaginated, DemandaPrediccionRead # Asegúrate que DemandaHistoricoRead esté importado
+from schemas.demand import DemandaAgregadaResponse, DemandaSerieReducida
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/demand", tags=["demand"])
 
+# Zona de las cubetas de agregación (igual que los rollups de la ingesta): el histórico
+# guarda la hora de pared de Bogotá etiquetada como UTC, así que los cortes locales son en UTC
+HISTORY_TZ = "UTC"
+
 @router.get("/historical", response_model=DemandaHistoricoPaginated)
-def read_historical_demand(
+async def read_historical_demand(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` de la página anterior"),
+    include_total: bool = Query(False, description="Incluir el total de filas del rango"),
+    response_format: Literal["records", "series"] = Query("records", alias="format",
+                                                          description="`series`: inicio, paso y arreglos por campo"),
+    fields: Optional[str] = Query(None, description="Campos de `format=series`, separados por coma (default: kwh)"),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        # Construir consulta base
-        query = db.query(DBDemandaHistorico).order_by(DBDemandaHistorico.datetime.asc())
+        after = decode_cursor(cursor, 1)[0] if cursor else None
+        series_fields = parse_fields(fields) if response_format == "series" else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # select() de Core: todas las columnas o sólo las de la serie, como tuplas
+        hist = HISTORICAL_TABLE.c
+        columns = HISTORICAL_COLUMNS if series_fields is None else (hist.datetime, *(hist[f] for f in series_fields))
+        stmt = select(*columns)
         
         # Aplicar filtros de fecha
         if start_date:
-            query = query.filter(DBDemandaHistorico.datetime >= start_date)
+            stmt = stmt.where(hist.datetime >= start_date)
         if end_date:
-            query = query.filter(DBDemandaHistorico.datetime <= end_date)
-        
-        # Obtener resultados
-        results = query.all()
-        total = query.count()
-        
-        return {"total": total, "results": results}
+            stmt = stmt.where(hist.datetime <= end_date)
+
+        # Total opcional y barato: caché por rango, COUNT(*) OVER () en la primera página
+        # (se evalúa antes del LIMIT) o una sola cuenta si se pide en una página intermedia
+        total_key = (start_date, end_date)
+        total = cached_total(total_key) if include_total else None
+        count_inline = include_total and total is None and after is None
+        if count_inline:
+            stmt = stmt.add_columns(func.count().over().label("total"))
+        elif include_total and total is None:
+            total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+            store_total(total_key, total)
+
+        # Página por clave: datetime > cursor, una fila extra para saber si hay más
+        if after is not None:
+            stmt = stmt.where(hist.datetime > after)
+        rows = (await db.execute(stmt.order_by(hist.datetime.asc()).limit(limit + 1))).all()
+        if count_inline:
+            total = rows[0].total if rows else 0
+            rows = [row[:-1] for row in rows]
+            store_total(total_key, total)
+        next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+        rows = rows[:limit]
+
+        if series_fields is not None:
+            # Columnas: una tupla por campo en lugar de una por fila
+            transposed = list(zip(*rows)) or [()] * (len(series_fields) + 1)
+            epochs = np.fromiter((t.timestamp() for t in transposed[0]), dtype=np.int64, count=len(rows))
+            series = regular_series(epochs, dict(zip(series_fields, transposed[1:])))
+            start = series.pop("start_epoch")
+            return series_response({
+                "start": None if start is None else datetime.fromtimestamp(start, tz=timezone.utc),
+                **series,
+                "total": total,
+                "next_cursor": next_cursor,
+            })
+
+        return json_response(HISTORICAL_PAGE_ADAPTER, {
+            "total": total,
+            "results": as_records(rows, HISTORICAL_KEYS),
+            "next_cursor": next_cursor,
+        })
         
     except Exception as e:
         logger.error(f"Error: {str(e)}", exc_info=True)
@@ -47,46 +113,276 @@ def read_historical_demand(
         )
 
 
-# --- Endpoint de Predicciones (Revisar también sus límites) ---
+# --- Agregación por Cubeta (rollups con respaldo date_trunc) ---
+def _as_history_tz(value: Optional[datetime]) -> Optional[pendulum.DateTime]:
+    """Fecha en el reloj del histórico; las fechas sin zona se leen como en /historical (UTC)."""
+    return None if value is None else pendulum.instance(value, tz=HISTORY_TZ).in_tz(HISTORY_TZ)
+
+
+def _is_bucket_start(value: Optional[pendulum.DateTime], resolution: str) -> bool:
+    """True si `value` es el inicio de una cubeta (o no hay límite)."""
+    return value is None or value == value.start_of(resolution)
+
+
+async def _aggregate_from_rollup(db: AsyncSession, resolution: str, agg: str, start, end) -> list:
+    """Cubetas completas desde `demanda_historico_rollup`: una fila por cubeta."""
+    rollup = DBDemandaHistoricoRollup
+    value = {"sum": rollup.kwh_sum, "mean": rollup.kwh_sum / rollup.n, "max": rollup.kwh_max}[agg]
+    stmt = select(rollup.bucket, value, rollup.n).where(rollup.resolucion == resolution)
+    if start is not None:
+        stmt = stmt.where(rollup.bucket >= start)
+    if end is not None:
+        stmt = stmt.where(rollup.bucket < end)
+    return (await db.execute(stmt.order_by(rollup.bucket.asc()))).all()
+
+
+async def _aggregate_raw(db: AsyncSession, resolution: str, agg: str, start, end) -> list:
+    """date_trunc en el reloj del histórico (hora de pared local) sobre las filas horarias (rangos arbitrarios)."""
+    hist = DBDemandaHistorico
+    # Literales (valores ya validados): el mismo texto en SELECT y GROUP BY
+    tz = literal_column(f"'{HISTORY_TZ}'")
+    bucket = func.timezone(tz, func.date_trunc(literal_column(f"'{resolution}'"), func.timezone(tz, hist.datetime)))
+    value = {"sum": func.sum(hist.kwh), "mean": func.avg(hist.kwh), "max": func.max(hist.kwh)}[agg]
+    stmt = select(bucket, value, func.count(hist.kwh)).where(hist.kwh.isnot(None))
+    if start is not None:
+        stmt = stmt.where(hist.datetime >= start)
+    if end is not None:
+        stmt = stmt.where(hist.datetime < end)
+    return (await db.execute(stmt.group_by(bucket).order_by(bucket))).all()
+
+
+@router.get(
+    "/historical/aggregate",
+    response_model=DemandaAgregadaResponse,
+    summary="Demanda histórica agregada por día, semana o mes",
+    description="Agrega el kWh horario por cubeta en hora local. Rangos alineados a cubetas se sirven desde "
+                "los rollups que mantiene la ingesta; cualquier otro rango se agrega con date_trunc. "
+                "Cada cubeta incluye cuántas horas con dato la componen."
+)
+async def read_historical_aggregate(
+    resolution: Literal["day", "week", "month"] = Query("day"),
+    agg: Literal["sum", "mean", "max"] = Query("sum"),
+    start_date: Optional[datetime] = Query(None, description="Inicio (incluido)"),
+    end_date: Optional[datetime] = Query(None, description="Fin (excluido)"),
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = _as_history_tz(start_date), _as_history_tz(end_date)
+    try:
+        rows, source = [], "raw"
+        if _is_bucket_start(start, resolution) and _is_bucket_start(end, resolution):
+            try:
+                rows, source = await _aggregate_from_rollup(db, resolution, agg, start, end), "rollup"
+            except ProgrammingError:
+                await db.rollback()  # La ingesta aún no creó la tabla de rollups
+                logger.warning("Tabla de rollups no disponible; se agrega desde el histórico.")
+        if not rows:
+            rows, source = await _aggregate_raw(db, resolution, agg, start, end), "raw"
+
+        return {
+            "resolution": resolution,
+            "agg": agg,
+            "source": source,
+            "results": [{"bucket": b, "value": v, "count": n} for b, v, n in rows],
+        }
+
+    except Exception as e:
+        logger.error(f"Error al agregar la demanda histórica: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Ocurrió un error interno al agregar la demanda histórica."
+        )
+
+
+# --- Reducción Visual (M4 / LTTB) ---
+@router.get(
+    "/historical/downsample",
+    response_model=DemandaSerieReducida,
+    summary="Serie horaria reducida para gráficos",
+    description="Devuelve a lo sumo `points` puntos que conservan la forma de la serie: M4 (primero, último, "
+                "mínimo y máximo por cubeta, calculado en SQL) o LTTB. Sirve para los reales y las predicciones."
+)
+async def read_downsampled_demand(
+    points: int = Query(1000, ge=4, le=MAX_PAGE_SIZE, description="Puntos máximos (≈ 2 × ancho del gráfico en px)"),
+    series: Literal["historical", "predictions"] = Query("historical"),
+    method: Literal["m4", "lttb"] = Query("m4"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    reduce = downsampling.m4_points if method == "m4" else downsampling.lttb_points
+    try:
+        results, n_source = await reduce(db, series, points, start_date, end_date)
+        logger.info(f"Serie {series} reducida con {method}: {n_source} -> {len(results)} puntos.")
+        return {
+            "series": series,
+            "method": method,
+            "n_source": n_source,
+            "results": [{"datetime": t, "kwh": v} for t, v in results],
+        }
+
+    except Exception as e:
+        logger.error(f"Error al reducir la serie {series}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Ocurrió un error interno al reducir la serie."
+        )
+
+
+# --- Exportación en Streaming ---
+@router.get(
+    "/export",
+    summary="Exportar demanda en streaming",
+    description="Envía la serie completa del rango por lotes desde un cursor del servidor, como CSV, NDJSON, "
+                "Arrow IPC (stream) o Parquet. La memoria del backend no depende del tamaño del rango.",
+    response_class=StreamingResponse,
+)
+async def export_demand(
+    series: Literal["historical", "predictions"] = Query("historical"),
+    export_format: Literal["csv", "ndjson", "arrow", "parquet"] = Query("csv", alias="format"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+):
+    # Sin Depends(get_db): el generador abre su propia sesión (ver core.export)
+    try:
+        export.require_format(export_format)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    if series == "historical":
+        columns, keys, time_col = HISTORICAL_COLUMNS, HISTORICAL_KEYS, HISTORICAL_TABLE.c.datetime
+    else:
+        columns, keys, time_col = PREDICTION_COLUMNS, PREDICTION_KEYS, PREDICTION_TABLE.c.prediction_for_datetime
+    stmt = select(*columns).order_by(time_col.asc())
+    if start_date:
+        stmt = stmt.where(time_col >= start_date)
+    if end_date:
+        stmt = stmt.where(time_col <= end_date)
+
+    logger.info(f"GET /demand/export series={series} format={export_format}")
+    filename = f"demanda_{series}.{export.EXPORT_EXTENSIONS[export_format]}"
+    return StreamingResponse(
+        export.export_stream(stmt, keys, export_format),
+        media_type=export.EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# --- Endpoint de Predicciones (paginado por cursor) ---
 @router.get(
     "/predictions",
     response_model=List[DemandaPrediccionRead],
     summary="Obtener predicciones de demanda",
-    description="Recupera las predicciones de demanda más recientes, ordenadas por fecha de ejecución y luego por fecha de predicción."
+    description="Recupera las predicciones de demanda más recientes, ordenadas por fecha de ejecución y luego por fecha de predicción. "
+                "Si hay más páginas, el cursor de la siguiente viene en el encabezado `X-Next-Cursor`."
 )
-def read_predicted_demand(
-    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
-    # ACTUALIZADO: Revisar si este límite también debe eliminarse o aumentarse
-    limit: Optional[int] = Query(100, ge=1, description="Número máximo de registros a devolver (opcional, default 100)"), # le=2000 eliminado
-    db: Session = Depends(get_db)
+async def read_predicted_demand(
+    skip: int = Query(0, ge=0, deprecated=True, description="Registros a saltar (OFFSET); usar `cursor`"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Tamaño de página (default 100)"),
+    cursor: Optional[str] = Query(None, description=f"Valor del encabezado `{NEXT_CURSOR_HEADER}` de la página anterior"),
+    db: AsyncSession = Depends(get_db)
 ):
-    logger.info(f"GET /demand/predictions?skip={skip}&limit={limit}")
+    logger.info(f"GET /demand/predictions?skip={skip}&limit={limit}&cursor={cursor}")
     try:
-        query = db.query(DBDemandaPrediccion)
+        after = decode_cursor(cursor, 2) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        run_ts = PREDICTION_TABLE.c.prediction_run_ts
+        for_dt = PREDICTION_TABLE.c.prediction_for_datetime
+        stmt = select(*PREDICTION_COLUMNS).order_by(run_ts.desc(), for_dt.asc())
+
+        if after is not None:
+            # Siguiente clave en orden (run_ts DESC, for ASC); run_ts <= cursor acota el rango del índice
+            after_run, after_for = after
+            stmt = stmt.where(run_ts <= after_run, or_(run_ts < after_run, for_dt > after_for))
+        elif skip:
+            stmt = stmt.offset(skip)
+
+        rows = (await db.execute(stmt.limit(limit + 1))).all()
+        headers = {}
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last.prediction_run_ts, last.prediction_for_datetime)
 
-        query = query.order_by(
-            DBDemandaPrediccion.prediction_run_ts.desc(),
-            DBDemandaPrediccion.prediction_for_datetime.asc()
+        logger.info(f"Devolviendo {min(len(rows), limit)} registros de predicciones.")
+        return json_response(PREDICTIONS_ADAPTER, as_records(rows[:limit], PREDICTION_KEYS), headers)
+
+    except Exception as e:
+        logger.error(f"Error al consultar predicciones de demanda: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Ocurrió un error interno al consultar las predicciones."
         )
 
-        query = query.offset(skip)
 
-        # Aplicar límite si se proporciona
-        if limit is not None:
-             query = query.limit(limit)
-             logger.info(f"Aplicando limit={limit} a predicciones")
-        else:
-             logger.warning("No se especificó límite para predicciones. Se devolverán todos.")
+# --- Endpoint de Predicción en Vivo (servidor de inferencia) ---
+@router.get(
+    "/forecast/live",
+    response_model=List[DemandaPrediccionRead],
+    summary="Predicción en vivo desde el servidor de inferencia",
+    description="Toma las últimas 336 horas de histórico y las envía al servidor de inferencia, que mantiene el modelo cargado."
+)
+async def read_live_forecast(db: AsyncSession = Depends(get_db)):
+    hist = HISTORICAL_TABLE.c
+    rows = (await db.execute(
+        select(*HISTORICAL_COLUMNS).order_by(hist.datetime.desc()).limit(inference.WINDOW_SIZE_HOURS)
+    )).all()
+    if len(rows) < inference.WINDOW_SIZE_HOURS:
+        raise HTTPException(status_code=409, detail=f"Datos históricos insuficientes ({len(rows)}/{inference.WINDOW_SIZE_HOURS}).")
+    rows.reverse()  # Orden ASC para el modelo
+    # Mismas validaciones que fetch_prediction_window en el DAG: horas contiguas y sin nulos
+    if any(cur.datetime - prev.datetime != timedelta(hours=1) for prev, cur in zip(rows, rows[1:])):
+        raise HTTPException(status_code=409, detail="La ventana histórica tiene huecos o duplicados horarios.")
+    window = [[getattr(r, col) for col in inference.FEATURE_COLUMNS] for r in rows]
+    if any(value is None for row in window for value in row):
+        raise HTTPException(status_code=409, detail="La ventana histórica contiene valores nulos.")
 
+    try:
+        # Cliente HTTP bloqueante: en el threadpool para no detener el event loop
+        preds, meta = await run_in_threadpool(inference.predict_windows, [window])
+    except Exception as e:
+        logger.error(f"Error llamando al servidor de inferencia: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Servidor de inferencia no disponible.")
 
-        results = query.all()
+    run_ts = datetime.now(timezone.utc)
+    first_ts = rows[-1].datetime + timedelta(hours=meta["offset_hours"])
+    return [
+        {
+            "prediction_run_ts": run_ts,
+            "prediction_for_datetime": first_ts + timedelta(hours=i),
+            "predicted_kwh": value,
+            "model_version": meta.get("model_version"),
+        }
+        for i, value in enumerate(preds[0])
+    ]
 
-        logger.info(f"Devolviendo {len(results)} registros de predicciones.")
-        return results
 
+# --- Endpoint de Nowcast (re-pronóstico horario) ---
+@router.get(
+    "/nowcast",
+    response_model=List[DemandaPrediccionRead],
+    summary="Obtener el nowcast horario vigente",
+    description="Pronóstico que el DAG de nowcast actualiza cada hora desde la última hora observada. "
+                "Se guarda aparte de `/demand/predictions`, que sirve la corrida semanal del modelo campeón."
+)
+async def read_nowcast(db: AsyncSession = Depends(get_db)):
+    nowcast = DBDemandaNowcast
+    latest = select(func.max(nowcast.origin_ts)).scalar_subquery()
+    stmt = (
+        select(*(getattr(nowcast, key) for key in PREDICTION_KEYS))
+        .where(nowcast.origin_ts == latest)
+        .order_by(nowcast.prediction_for_datetime.asc())
+    )
+    try:
+        rows = (await db.execute(stmt)).all()
+    except ProgrammingError:
+        logger.warning("Tabla de nowcast no disponible; el DAG aún no ha corrido.")
+        return []
     except Exception as e:
-        logger.error(f"Error al consultar predicciones de demanda: {e}", exc_info=True)
+        logger.error(f"Error al consultar el nowcast: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail="Ocurrió un error interno al consultar las predicciones."
-        )
\ No newline at end of file
+            detail="Ocurrió un error interno al consultar el nowcast."
+        )
+    return json_response(PREDICTIONS_ADAPTER, as_records(rows, PREDICTION_KEYS))
@@ -0,0 +1,122 @@
+# backend/benchmark_read_path.py
+"""Filas/s del camino de lectura de /demand/historical: ORM frente a Core.
+
+Mide, para varios tamaños de página, consulta + conversión + serialización a
+bytes JSON (lo que hace el endpoint, sin HTTP):
+
+    orm          db.query(DemandaHistorico) + validación from_attributes
+                 objeto por objeto (lo que hacía response_model) + JSON
+    core         select() de Core -> tuplas -> dicts -> TypeAdapter precompilado
+    core_series  select() de las columnas de la serie -> arreglos -> orjson
+
+Por defecto usa SQLite en memoria con un histórico sintético; con
+`--database-url` lee la tabla real `demanda_historico` (sólo lectura).
+
+Ejecución (desde backend/):
+    python benchmark_read_path.py --rows 1000 10000 50000 --output bench_read.json
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import numpy as np
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from core.read_path import HISTORICAL_COLUMNS, HISTORICAL_KEYS, HISTORICAL_PAGE_ADAPTER, HISTORICAL_TABLE, as_records
+from core.series import regular_series
+from db_models.demand import DemandaHistorico
+from schemas.demand import DemandaHistoricoRead
+
+logger = logging.getLogger(__name__)
+
+ORM_ADAPTER = TypeAdapter(List[DemandaHistoricoRead])
+
+
+def _synthetic_engine(n_rows: int):
+    """SQLite en memoria con `n_rows` horas sintéticas en `demanda_historico`."""
+    engine = create_engine("sqlite://")
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    rng = np.random.default_rng(0)
+    kwh = 1e6 + 2e5 * np.sin(np.arange(n_rows) * 2 * np.pi / 24) + rng.normal(0, 1e4, n_rows)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE demanda_historico (
+                datetime TIMESTAMP PRIMARY KEY, kwh FLOAT, mes INTEGER,
+                hour INTEGER, season INTEGER, dia_habil INTEGER
+            )
+        """))
+        conn.execute(HISTORICAL_TABLE.insert(), [
+            {"datetime": ts, "kwh": float(v), "mes": ts.month, "hour": ts.hour,
+             "season": 0, "dia_habil": int(ts.weekday() < 5)}
+            for ts, v in ((start + timedelta(hours=i), v) for i, v in enumerate(kwh))
+        ])
+    return engine
+
+
+def read_orm(db: Session, n: int) -> bytes:
+    objs = db.query(DemandaHistorico).order_by(DemandaHistorico.datetime.asc()).limit(n).all()
+    page = {"total": None, "results": ORM_ADAPTER.validate_python(objs, from_attributes=True), "next_cursor": None}
+    return orjson.dumps({**page, "results": [r.model_dump() for r in page["results"]]})
+
+
+def read_core(db: Session, n: int) -> bytes:
+    rows = db.execute(select(*HISTORICAL_COLUMNS).order_by(HISTORICAL_TABLE.c.datetime.asc()).limit(n)).all()
+    return HISTORICAL_PAGE_ADAPTER.dump_json(
+        {"total": None, "results": as_records(rows, HISTORICAL_KEYS), "next_cursor": None})
+
+
+def read_core_series(db: Session, n: int) -> bytes:
+    c = HISTORICAL_TABLE.c
+    rows = db.execute(select(c.datetime, c.kwh).order_by(c.datetime.asc()).limit(n)).all()
+    timestamps, kwh = zip(*rows)
+    epochs = np.fromiter((t.timestamp() for t in timestamps), dtype=np.int64, count=len(rows))
+    return orjson.dumps(regular_series(epochs, {"kwh": kwh}), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+READERS = {"orm": read_orm, "core": read_core, "core_series": read_core_series}
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    engine = create_engine(args.database_url) if args.database_url else _synthetic_engine(max(args.rows))
+    results = []
+    with Session(engine) as db:
+        for n in args.rows:
+            for name, reader in READERS.items():
+                reader(db, n)  # Calentamiento (caché de sentencias y de esquemas)
+                samples, size = [], 0
+                for _ in range(args.repeats):
+                    db.expunge_all()  # El ORM no reutiliza objetos del identity map
+                    t0 = time.perf_counter()
+                    size = len(reader(db, n))
+                    samples.append(time.perf_counter() - t0)
+                p50 = statistics.median(samples)
+                results.append({"reader": name, "rows": n, "p50_ms": 1e3 * p50,
+                                "rows_per_s": n / p50, "bytes": size})
+                logger.info(f"{name:12s} {n:7d} filas: {1e3 * p50:8.1f} ms, {n / p50:12,.0f} filas/s, {size:,} bytes")
+    return {"database": "sqlite-synthetic" if not args.database_url else engine.url.render_as_string(),
+            "repeats": args.repeats, "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Filas/s del camino de lectura ORM vs Core.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="Base real (sólo lectura) en lugar del sintético.")
+    parser.add_argument("--output", default="benchmark_read_path.json")
+    args = parser.parse_args(argv)
+    result = run_benchmarks(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    main()
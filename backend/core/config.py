@@ -17,12 +17,22 @@ class Settings(BaseSettings):
     POSTGRES_APP_HOST: str = "localhost" # Usará 'app-db' en Docker
     POSTGRES_APP_PORT: str = "5432"
 
-    # Construye la URL de la base de datos
+    # Servidor de inferencia caliente (http://host:puerto o unix:///ruta.sock)
+    INFERENCE_SERVER_URL: str = "http://inference-server:8500"
+    INFERENCE_TIMEOUT_SECONDS: float = 30.0
+
+    # Pool del engine asíncrono (por proceso/worker de uvicorn)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_ECHO: bool = True # Imprime las sentencias SQL, útil para debug
+
+    # Construye la URL de la base de datos (driver asyncpg)
     # Usa property para asegurar que use los valores cargados
     @property
     def DATABASE_URL(self) -> str:
         return (
-            f"postgresql+psycopg2://{self.POSTGRES_APP_USER}:{self.POSTGRES_APP_PASSWORD}@"
+            f"postgresql+asyncpg://{self.POSTGRES_APP_USER}:{self.POSTGRES_APP_PASSWORD}@"
             f"{self.POSTGRES_APP_HOST}:{self.POSTGRES_APP_PORT}/{self.POSTGRES_APP_DB}"
         )
 
@@ -38,4 +48,4 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Log para verificar que la URL se construye correctamente
-print(f"Database URL construida: postgresql+psycopg2://{settings.POSTGRES_APP_USER}:***@{settings.POSTGRES_APP_HOST}:{settings.POSTGRES_APP_PORT}/{settings.POSTGRES_APP_DB}")
\ No newline at end of file
+print(f"Database URL construida: postgresql+asyncpg://{settings.POSTGRES_APP_USER}:***@{settings.POSTGRES_APP_HOST}:{settings.POSTGRES_APP_PORT}/{settings.POSTGRES_APP_DB}")
\ No newline at end of file
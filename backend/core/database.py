@@ -1,26 +1,30 @@
 # backend/core/database.py
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from .config import settings # Importa la configuración
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-# echo=True imprime las sentencias SQL, útil para debug
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True, pool_pre_ping=True)
+# Engine asíncrono (asyncpg): las consultas no ocupan un hilo del threadpool mientras esperan a Postgres.
+# El pool se ajusta desde Settings (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS).
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    echo=settings.DB_ECHO,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+)
 
-# Cada instancia de SessionLocal será una sesión de base de datos
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Cada instancia de SessionLocal será una sesión asíncrona de base de datos
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Clase base para nuestros modelos ORM (SQLAlchemy)
 Base = declarative_base()
 
 # Dependencia de FastAPI para obtener una sesión de BD en los endpoints
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # Proporciona la sesión al endpoint
-    finally:
-        db.close() # Cierra la sesión al finalizar
+async def get_db():
+    async with SessionLocal() as db:
+        yield db # Proporciona la sesión al endpoint; se cierra al salir del bloque
 
-print("SQLAlchemy Engine y SessionLocal creados.")
\ No newline at end of file
+print("SQLAlchemy AsyncEngine y SessionLocal creados.")
@@ -0,0 +1,89 @@
+# backend/core/downsampling.py
+"""Reducción visual de series horarias para gráficos (M4 en SQL o LTTB en NumPy).
+
+Un gráfico de `w` píxeles sólo distingue ~2·w puntos. M4 conserva por cubeta
+de tiempo el primer, último, mínimo y máximo punto, así que el trazo
+rasterizado es idéntico al de la serie completa; LTTB elige un punto por
+cubeta maximizando el área del triángulo con sus vecinos y conserva la forma
+con menos puntos.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import lttb
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# (tabla, columna de tiempo, columna de valor) de cada serie
+SERIES_COLUMNS = {
+    "historical": ("demanda_historico", "datetime", "kwh"),
+    "predictions": ("demanda_prediccion", "prediction_for_datetime", "predicted_kwh"),
+}
+
+
+def _range_filters(time_col: str, start: Optional[datetime], end: Optional[datetime]) -> Tuple[str, dict]:
+    clauses, params = [], {}
+    if start is not None:
+        clauses.append(f"{time_col} >= :start")
+        params["start"] = start
+    if end is not None:
+        clauses.append(f"{time_col} <= :end")
+        params["end"] = end
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+async def m4_points(db: AsyncSession, series: str, points: int,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> Tuple[List[tuple], int]:
+    """
+    M4 calculado en el servidor: `points // 4` cubetas de igual duración y, por
+    cubeta, las filas primera, última, mínima y máxima (a lo sumo `points`).
+
+    Returns:
+        ([(datetime, valor), ...] en orden, filas de la serie en el rango).
+    """
+    table, t, v = SERIES_COLUMNS[series]
+    where, params = _range_filters(t, start, end)
+    rows = (await db.execute(text(f"""
+        WITH s AS (
+            SELECT {t} AS t, {v} AS v FROM {table} WHERE {v} IS NOT NULL{where}
+        ), b AS (
+            SELECT t, v, width_bucket(extract(epoch FROM t),
+                                      (SELECT extract(epoch FROM min(t)) FROM s),
+                                      (SELECT extract(epoch FROM max(t)) + 1 FROM s),
+                                      :n_buckets) AS bucket
+            FROM s
+        ), r AS (
+            SELECT t, v,
+                   row_number() OVER (PARTITION BY bucket ORDER BY t) AS first_rn,
+                   row_number() OVER (PARTITION BY bucket ORDER BY t DESC) AS last_rn,
+                   row_number() OVER (PARTITION BY bucket ORDER BY v, t) AS min_rn,
+                   row_number() OVER (PARTITION BY bucket ORDER BY v DESC, t) AS max_rn,
+                   count(*) OVER () AS n_source
+            FROM b
+        )
+        SELECT t, v, n_source FROM r
+        WHERE 1 IN (first_rn, last_rn, min_rn, max_rn)
+        ORDER BY t;
+    """), {**params, "n_buckets": max(points // 4, 1)})).all()
+    n_source = rows[0].n_source if rows else 0
+    return [(row.t, row.v) for row in rows], n_source
+
+
+async def lttb_points(db: AsyncSession, series: str, points: int,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> Tuple[List[tuple], int]:
+    """
+    LTTB sobre la serie leída como arreglo (epoch, valor); devuelve como `m4_points`.
+
+    Si la serie tiene `points` filas o menos se devuelve completa.
+    """
+    table, t, v = SERIES_COLUMNS[series]
+    where, params = _range_filters(t, start, end)
+    rows = (await db.execute(text(
+        f"SELECT extract(epoch FROM {t})::float8, {v} FROM {table} WHERE {v} IS NOT NULL{where} ORDER BY {t};"
+    ), params)).all()
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), 2)
+    if len(data) > points:
+        data = await run_in_threadpool(lttb.downsample, data, n_out=points)  # CPU fuera del event loop
+    return [(datetime.fromtimestamp(epoch, tz=timezone.utc), value) for epoch, value in data.tolist()], len(rows)
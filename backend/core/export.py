@@ -0,0 +1,129 @@
+# backend/core/export.py
+"""Exportación en streaming de la demanda (CSV, NDJSON, Arrow IPC, Parquet).
+
+Las filas salen de un cursor del servidor (`AsyncSession.stream` con
+`yield_per`) por lotes y cada lote se codifica y se envía antes de leer el
+siguiente: la memoria no depende del rango y el primer byte llega sin esperar
+la consulta completa.
+
+El generador asíncrono abre su propia `SessionLocal()`: FastAPI 0.115 cierra
+las dependencias con `yield` (como `get_db`) antes de terminar de enviar un
+`StreamingResponse`, así que una sesión inyectada ya estaría cerrada.
+"""
+import csv
+import io
+from typing import AsyncIterator, List, Sequence
+
+import orjson
+from sqlalchemy import Select
+
+from .database import SessionLocal
+
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "arrow": "arrows", "parquet": "parquet"}
+
+# Tipos Arrow por columna (los timestamps se guardan en UTC)
+ARROW_TYPES = {
+    "datetime": "timestamp", "prediction_run_ts": "timestamp", "prediction_for_datetime": "timestamp",
+    "kwh": "float64", "predicted_kwh": "float64",
+    "mes": "int32", "hour": "int32", "season": "int32", "dia_habil": "int32",
+    "model_version": "string",
+}
+
+
+def require_format(fmt: str) -> None:
+    """Verifica las dependencias opcionales del formato antes de abrir el stream."""
+    if fmt in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(f"El formato '{fmt}' requiere pyarrow instalado.") from e
+
+
+async def _iter_partitions(stmt: Select, chunk_rows: int) -> AsyncIterator[List[Sequence]]:
+    """Lotes de tuplas desde un cursor del servidor, con sesión propia."""
+    async with SessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_rows))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def _csv_chunks(stmt: Select, keys: Sequence[str], chunk_rows: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(keys)
+    yield buffer.getvalue().encode("utf-8")  # Encabezado antes de ejecutar la consulta
+    async for rows in _iter_partitions(stmt, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [value.isoformat() if hasattr(value, "isoformat") else value for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _ndjson_chunks(stmt: Select, keys: Sequence[str], chunk_rows: int) -> AsyncIterator[bytes]:
+    async for rows in _iter_partitions(stmt, chunk_rows):
+        yield b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de pyarrow que acumula lo escrito hasta `drain()` y lleva la posición absoluta."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks, self._position = [], 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _arrow_chunks(stmt: Select, keys: Sequence[str], chunk_rows: int, parquet: bool) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"timestamp": pa.timestamp("us", tz="UTC"), "float64": pa.float64(),
+             "int32": pa.int32(), "string": pa.string()}
+    schema = pa.schema([(k, types[ARROW_TYPES[k]]) for k in keys])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+    try:
+        yield sink.drain()  # Esquema (Arrow) o número mágico (Parquet)
+        async for rows in _iter_partitions(stmt, chunk_rows):
+            columns = list(zip(*rows))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(columns[i], type=schema.field(i).type) for i in range(len(keys))], schema=schema)
+            writer.write_batch(batch)  # En Parquet, un row group por lote
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # Fin del stream (Arrow) o footer (Parquet)
+
+
+def export_stream(stmt: Select, keys: Sequence[str], fmt: str,
+                  chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """Generador asíncrono de bytes de `stmt` (columnas en el orden de `keys`) en el formato pedido."""
+    if fmt == "csv":
+        return _csv_chunks(stmt, keys, chunk_rows)
+    if fmt == "ndjson":
+        return _ndjson_chunks(stmt, keys, chunk_rows)
+    return _arrow_chunks(stmt, keys, chunk_rows, parquet=(fmt == "parquet"))
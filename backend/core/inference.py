@@ -0,0 +1,59 @@
+# backend/core/inference.py
+"""Cliente del servidor de inferencia (HTTP o socket Unix)."""
+import http.client
+import json
+import socket
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+from .config import settings
+
+# Orden de features esperado por el modelo (igual que en el entrenamiento)
+FEATURE_COLUMNS = ["mes", "hour", "season", "dia_habil", "kwh"]
+WINDOW_SIZE_HOURS = 336
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection sobre socket Unix."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connection() -> http.client.HTTPConnection:
+    parsed = urlparse(settings.INFERENCE_SERVER_URL)
+    if parsed.scheme == "unix":
+        return UnixHTTPConnection(parsed.path, settings.INFERENCE_TIMEOUT_SECONDS)
+    if parsed.scheme == "http":
+        return http.client.HTTPConnection(
+            parsed.hostname, parsed.port or 80, timeout=settings.INFERENCE_TIMEOUT_SECONDS
+        )
+    raise ValueError(f"Esquema no soportado: {settings.INFERENCE_SERVER_URL}")
+
+
+def predict_windows(windows: List[List[List[float]]]) -> Tuple[List[List[float]], dict]:
+    """Envía un lote de ventanas sin escalar y devuelve (predicciones kWh, metadatos).
+
+    Las predicciones ya vienen recortadas; `metadatos["offset_hours"]` indica
+    cuántas horas después del último dato corresponde la primera.
+    """
+    conn = _connection()
+    try:
+        conn.request(
+            "POST", "/predict",
+            body=json.dumps({"windows": windows}),
+            headers={"Content-Type": "application/json"},
+        )
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"Servidor de inferencia respondió {response.status}: {payload.get('detail')}")
+    return payload.pop("predictions"), payload
@@ -0,0 +1,68 @@
+# backend/core/pagination.py
+"""Cursores opacos para paginación por clave (keyset).
+
+El cursor codifica la clave de orden de la última fila entregada; la página
+siguiente filtra `clave > cursor` sobre el índice, así cualquier página cuesta
+un recorrido de rango del índice sin importar su profundidad (a diferencia de
+OFFSET, que descarta las filas anteriores una a una).
+"""
+import base64
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, Optional, Tuple
+
+# Tamaños de página acotados
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*keys: datetime) -> str:
+    """Codifica la clave (uno o más timestamps) como texto base64 url-safe."""
+    payload = json.dumps([k.isoformat() for k in keys], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, n_keys: int) -> Tuple[datetime, ...]:
+    """Inverso de `encode_cursor`; lanza ValueError si el cursor no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        keys = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(keys, list) or len(keys) != n_keys:
+            raise ValueError
+        return tuple(datetime.fromisoformat(k) for k in keys)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+
+
+# Totales por rango en memoria del proceso; el histórico sólo crece una vez al día.
+# LRU acotado: la clave viene del cliente, así que el tamaño no puede depender de él.
+TOTAL_CACHE_TTL_SECONDS = 300
+TOTAL_CACHE_MAX_ENTRIES = 1024
+_total_cache: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+
+
+def cached_total(key: Hashable) -> Optional[int]:
+    """Total guardado para `key` si no ha vencido (lo marca como usado recientemente)."""
+    entry = _total_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _total_cache[key]
+        return None
+    _total_cache.move_to_end(key)
+    return entry[1]
+
+
+def store_total(key: Hashable, total: int) -> None:
+    """Guarda el total de un rango por `TOTAL_CACHE_TTL_SECONDS`; descarta vencidos y los menos usados."""
+    now = time.monotonic()
+    for stale in [k for k, (expires, _) in _total_cache.items() if expires < now]:
+        del _total_cache[stale]
+    _total_cache[key] = (now + TOTAL_CACHE_TTL_SECONDS, total)
+    _total_cache.move_to_end(key)
+    while len(_total_cache) > TOTAL_CACHE_MAX_ENTRIES:
+        _total_cache.popitem(last=False)
@@ -0,0 +1,38 @@
+# backend/core/read_path.py
+"""Camino de lectura sin ORM para los endpoints de demanda.
+
+Las consultas son `select()` de Core sobre las columnas de la tabla: el
+resultado son tuplas, sin hidratar objetos ORM ni el identity map. Cada fila
+se vuelve un dict y la respuesta completa se serializa a bytes con un
+`TypeAdapter` construido una sola vez (esquemas TypedDict en
+`schemas.demand`), sin validar objeto por objeto con `from_attributes`.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from db_models.demand import DemandaHistorico, DemandaPrediccion
+from schemas.demand import DemandaHistoricoPage, DemandaPrediccionRow
+
+HISTORICAL_TABLE = DemandaHistorico.__table__
+HISTORICAL_KEYS = ("datetime", "kwh", "mes", "hour", "season", "dia_habil")
+HISTORICAL_COLUMNS = tuple(HISTORICAL_TABLE.c[k] for k in HISTORICAL_KEYS)
+
+PREDICTION_TABLE = DemandaPrediccion.__table__
+PREDICTION_KEYS = ("prediction_run_ts", "prediction_for_datetime", "predicted_kwh", "model_version")
+PREDICTION_COLUMNS = tuple(PREDICTION_TABLE.c[k] for k in PREDICTION_KEYS)
+
+# Precompilados al importar: el esquema de serialización se construye una vez
+HISTORICAL_PAGE_ADAPTER = TypeAdapter(DemandaHistoricoPage)
+PREDICTIONS_ADAPTER = TypeAdapter(List[DemandaPrediccionRow])
+
+
+def as_records(rows: Iterable[Sequence], keys: Sequence[str]) -> List[dict]:
+    """Tuplas -> dicts con las claves del esquema."""
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(adapter: TypeAdapter, payload, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respuesta JSON ya serializada por `adapter` (FastAPI no vuelve a validarla)."""
+    return Response(adapter.dump_json(payload), media_type="application/json", headers=headers)
@@ -0,0 +1,53 @@
+# backend/core/series.py
+"""Formato compacto de series en rejilla regular (`format=series`).
+
+En lugar de un objeto por hora con todas las claves, se envía el inicio, el
+paso y un arreglo por campo pedido; `mes`, `hour`, `season` y `dia_habil` se
+derivan del timestamp, así que sólo viajan si se piden en `fields`. Las horas
+faltantes quedan como null para que la posición siga siendo el índice.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+from fastapi.responses import ORJSONResponse
+
+SERIES_STEP_SECONDS = 3600
+SERIES_FIELDS = ("kwh", "mes", "hour", "season", "dia_habil")
+INTEGER_FIELDS = {"mes", "hour", "season", "dia_habil"}
+
+
+def parse_fields(fields: str | None) -> List[str]:
+    """Campos pedidos en `fields=kwh,hour` (default: sólo kwh); ValueError si alguno no existe."""
+    names = [f.strip() for f in (fields or "kwh").split(",") if f.strip()]
+    unknown = [f for f in names if f not in SERIES_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Campos no válidos: {unknown or fields!r}. Opciones: {', '.join(SERIES_FIELDS)}")
+    return list(dict.fromkeys(names))
+
+
+def regular_series(epochs: np.ndarray, columns: Dict[str, Sequence], step: int = SERIES_STEP_SECONDS) -> dict:
+    """
+    Ubica cada fila en la rejilla `epochs[0] + i * step` (vectorizado).
+
+    Returns:
+        {"start_epoch", "step_seconds", "length", "values": {campo: ndarray}};
+        los huecos son NaN (null en JSON) y los campos enteros sin huecos
+        se envían como enteros.
+    """
+    if len(epochs) == 0:
+        return {"start_epoch": None, "step_seconds": step, "length": 0, "values": {name: [] for name in columns}}
+    index = (epochs - epochs[0]) // step
+    length = int(index[-1]) + 1
+    values = {}
+    for name, column in columns.items():
+        grid = np.full(length, np.nan)
+        grid[index] = np.asarray(column, dtype=np.float64)  # None -> NaN
+        if name in INTEGER_FIELDS and not np.isnan(grid).any():
+            grid = grid.astype(np.int64)
+        values[name] = grid
+    return {"start_epoch": int(epochs[0]), "step_seconds": step, "length": length, "values": values}
+
+
+def series_response(payload: dict) -> ORJSONResponse:
+    """Serializa con orjson (arreglos NumPy nativos, NaN -> null)."""
+    return ORJSONResponse(payload)
@@ -25,4 +25,79 @@ class DemandaPrediccion(Base):
     prediction_for_datetime = Column(DateTime(timezone=True), index=True, primary_key=True)
     predicted_kwh = Column(Float)
     model_version = Column(String, nullable=True)
-    __table_args__ = (Index('ix_demanda_prediccion_run_for', 'prediction_run_ts', 'prediction_for_datetime'),)
\ No newline at end of file
+    # Mismo orden que el endpoint (run_ts DESC, for ASC): cada página por cursor es un rango del índice
+    __table_args__ = (Index('ix_demanda_prediccion_run_for', prediction_run_ts.desc(), prediction_for_datetime.asc()),)
+
+# Metadatos de cada corrida de predicción (huella de entrada para memoización)
+class DemandaPrediccionCorrida(Base):
+    __tablename__ = "demanda_prediccion_corrida"
+    prediction_run_ts = Column(DateTime(timezone=True), primary_key=True)
+    model_version = Column(String, nullable=False)
+    artifact_etags = Column(String, nullable=True)
+    input_digest = Column(String(64), nullable=False, index=True)
+    last_input_ts = Column(DateTime(timezone=True), nullable=True)
+    n_predictions = Column(Integer, nullable=False)
+    reused_from = Column(DateTime(timezone=True), nullable=True)  # Corrida cuyo pronóstico se reutilizó
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Pronósticos retrospectivos: lo que el modelo habría predicho en cada origen histórico
+class DemandaHindcast(Base):
+    __tablename__ = "demanda_hindcast"
+    model_version = Column(String, primary_key=True)
+    origin_ts = Column(DateTime(timezone=True), primary_key=True)  # Última hora observada del origen
+    prediction_for_datetime = Column(DateTime(timezone=True), primary_key=True)
+    predicted_kwh = Column(Float)
+
+
+# Pronóstico vigente del nowcast horario; separado de demanda_prediccion (corrida semanal)
+class DemandaNowcast(Base):
+    __tablename__ = "demanda_nowcast"
+    model_version = Column(String, primary_key=True)
+    prediction_for_datetime = Column(DateTime(timezone=True), primary_key=True)
+    predicted_kwh = Column(Float)
+    origin_ts = Column(DateTime(timezone=True), nullable=False)  # Última hora observada
+    prediction_run_ts = Column(DateTime(timezone=True), nullable=False)
+
+
+# Predicciones de varias versiones de modelo (campeón y retadores) sobre la misma entrada
+class DemandaPrediccionModelo(Base):
+    __tablename__ = "demanda_prediccion_modelos"
+    model_version = Column(String, primary_key=True)
+    prediction_run_ts = Column(DateTime(timezone=True), primary_key=True)
+    prediction_for_datetime = Column(DateTime(timezone=True), primary_key=True)
+    predicted_kwh = Column(Float)
+
+
+# Histórico por entidad (agente/región): misma estructura que demanda_historico más la entidad
+class DemandaHistoricoEntidad(Base):
+    __tablename__ = "demanda_historico_entidad"
+    entidad = Column(String, primary_key=True)
+    datetime = Column(DateTime(timezone=True), primary_key=True)
+    kwh = Column(Float, nullable=True)
+    mes = Column(Integer, nullable=True)
+    hour = Column(Integer, nullable=True)
+    season = Column(Integer, nullable=True)
+    dia_habil = Column(Integer, nullable=True)
+
+
+# Predicciones por entidad, calculadas en una sola pasada para todas las series
+class DemandaPrediccionEntidad(Base):
+    __tablename__ = "demanda_prediccion_entidad"
+    entidad = Column(String, primary_key=True)
+    prediction_for_datetime = Column(DateTime(timezone=True), primary_key=True)
+    predicted_kwh = Column(Float)
+    model_version = Column(String, nullable=True)
+    prediction_run_ts = Column(DateTime(timezone=True), index=True)
+
+
+# Agregados de kWh por cubeta local (día/semana/mes), refrescados por la ingesta diaria
+class DemandaHistoricoRollup(Base):
+    __tablename__ = "demanda_historico_rollup"
+    resolucion = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    n = Column(Integer, nullable=False)
+    kwh_sum = Column(Float)
+    kwh_min = Column(Float)
+    kwh_max = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
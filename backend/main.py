@@ -14,12 +14,16 @@ logger = logging.getLogger(__name__)
 # Descomenta la siguiente línea si quieres que FastAPI cree las tablas
 # definidas en tus modelos SQLAlchemy al iniciar (si no existen).
 # ¡Cuidado en producción! Es mejor usar herramientas de migración como Alembic.
-# try:
-#    logger.info("Intentando crear tablas de base de datos si no existen...")
-#    Base.metadata.create_all(bind=engine)
-#    logger.info("Tablas verificadas/creadas.")
-# except Exception as e:
-#    logger.error(f"Error al crear las tablas de la base de datos: {e}")
+# Con el engine asíncrono, create_all corre vía run_sync en un evento de inicio (declarado tras crear `app`):
+# @app.on_event("startup")
+# async def create_tables():
+#     try:
+#         logger.info("Intentando crear tablas de base de datos si no existen...")
+#         async with engine.begin() as conn:
+#             await conn.run_sync(Base.metadata.create_all)
+#         logger.info("Tablas verificadas/creadas.")
+#     except Exception as e:
+#         logger.error(f"Error al crear las tablas de la base de datos: {e}")
 
 # --- Creación de la Aplicación FastAPI ---
 app = FastAPI(
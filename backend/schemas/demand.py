@@ -2,6 +2,7 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime # <--- Importa el TIPO datetime
 from typing import Optional, List
+from typing_extensions import TypedDict
 
 # --- Esquemas Base (campos comunes) ---
 class DemandaHistoricoBase(BaseModel):
@@ -34,5 +35,51 @@ class DemandaPrediccionRead(DemandaPrediccionBase):
 
 # --- Esquema para Respuesta Paginada de Históricos ---
 class DemandaHistoricoPaginated(BaseModel):
-    total: int
-    results: List[DemandaHistoricoRead] # Usará la versión actualizada de DemandaHistoricoRead
\ No newline at end of file
+    total: Optional[int] = None # Sólo con include_total=true
+    results: List[DemandaHistoricoRead] # Usará la versión actualizada de DemandaHistoricoRead
+    next_cursor: Optional[str] = None # Cursor de la página siguiente; None en la última
+
+# --- Esquemas de Agregación por Cubeta ---
+class DemandaAgregadaPunto(BaseModel):
+    bucket: datetime # Inicio de la cubeta (hora local)
+    value: Optional[float] = None
+    count: int # Horas con kWh en la cubeta (permite detectar cubetas parciales)
+
+class DemandaAgregadaResponse(BaseModel):
+    resolution: str
+    agg: str
+    source: str # 'rollup' (tabla mantenida por la ingesta) o 'raw' (date_trunc sobre el histórico)
+    results: List[DemandaAgregadaPunto]
+
+
+# --- Esquemas de Series Reducidas (M4/LTTB) ---
+class DemandaPuntoSerie(BaseModel):
+    datetime: datetime
+    kwh: float
+
+class DemandaSerieReducida(BaseModel):
+    series: str # 'historical' o 'predictions'
+    method: str # 'm4' o 'lttb'
+    n_source: int # Filas de la serie en el rango antes de reducir
+    results: List[DemandaPuntoSerie]
+
+
+# --- Filas planas para el camino de lectura sin ORM (serializadas con TypeAdapter) ---
+class DemandaHistoricoRow(TypedDict):
+    datetime: datetime
+    kwh: Optional[float]
+    mes: Optional[int]
+    hour: Optional[int]
+    season: Optional[int]
+    dia_habil: Optional[int]
+
+class DemandaHistoricoPage(TypedDict):
+    total: Optional[int]
+    results: List[DemandaHistoricoRow]
+    next_cursor: Optional[str]
+
+class DemandaPrediccionRow(TypedDict):
+    prediction_run_ts: datetime
+    prediction_for_datetime: datetime
+    predicted_kwh: float
+    model_version: Optional[str]
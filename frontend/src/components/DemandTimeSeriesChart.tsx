@@ -64,6 +64,31 @@ const formatDateToYYYYMMDD = (date: Date): string => {
     }
 };
 
+// Recorre todas las páginas del histórico siguiendo `next_cursor` (el backend pagina por clave)
+const fetchAllHistorical = async (start: string, end: string): Promise<HistoricalDemandPoint[]> => {
+    const results: HistoricalDemandPoint[] = [];
+    let cursor: string | null = null;
+    do {
+        const params = new URLSearchParams({ start_date: start, end_date: end, limit: '10000' });
+        if (cursor) params.set('cursor', cursor);
+        const url = `/api/v1/demand/historical?${params.toString()}`;
+        console.log("Solicitando datos históricos:", url);
+        const response = await fetch(url);
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(`Error HTTP Históricos (${response.status}): ${errorText || response.statusText}`);
+        }
+        const page = await response.json();
+        if (!page || typeof page !== 'object' || !Array.isArray(page.results)) {
+            console.error("Respuesta histórica inesperada:", page);
+            throw new Error('La respuesta de datos históricos no tiene el formato esperado.');
+        }
+        results.push(...page.results);
+        cursor = page.next_cursor ?? null;
+    } while (cursor);
+    return results;
+};
+
 // --- Componente Principal del Gráfico ---
 function DemandTimeSeriesChart() {
     // --- Estado del Componente ---
@@ -140,42 +165,25 @@ function DemandTimeSeriesChart() {
             console.log(`Iniciando carga con filtro: ${filterDates.start} a ${filterDates.end}`);
 
             try {
-                // Construir Parámetros y URLs Relativas
-                const historicalParams = new URLSearchParams({
-                    skip: '0', start_date: filterDates.start, end_date: filterDates.end
-                });
-                const historicalUrl = `/api/v1/demand/historical?${historicalParams.toString()}`;
                 // NOTA: La URL de predicciones sigue sin filtrar por fecha. Si tu API lo permite, considera añadir params.
-                const predictionsUrl = `/api/v1/demand/predictions?skip=0&limit=500`;
-
-                console.log("Solicitando datos históricos:", historicalUrl);
+                const predictionsUrl = `/api/v1/demand/predictions?limit=500`;
                 console.log("Solicitando datos de predicción:", predictionsUrl);
 
                 // Fetch y Procesamiento
-                const [historicalResponse, predictionsResponse] = await Promise.all([
-                    fetch(historicalUrl), fetch(predictionsUrl)
+                const [historicalRaw, predictionsResponse] = await Promise.all([
+                    fetchAllHistorical(filterDates.start, filterDates.end), fetch(predictionsUrl)
                 ]);
 
                 // Validación de Respuestas
-                if (!historicalResponse.ok) {
-                    const errorText = await historicalResponse.text();
-                    throw new Error(`Error HTTP Históricos (${historicalResponse.status}): ${errorText || historicalResponse.statusText}`);
-                }
                 if (!predictionsResponse.ok) {
                     const errorText = await predictionsResponse.text();
                     throw new Error(`Error HTTP Predicciones (${predictionsResponse.status}): ${errorText || predictionsResponse.statusText}`);
                 }
 
                 // Procesamiento de Datos
-                const historicalDataObj = await historicalResponse.json();
                 const predictionsRaw: PredictedDemandPoint[] = await predictionsResponse.json();
 
                 // Validación de formato
-                if (!historicalDataObj || typeof historicalDataObj !== 'object' || !Array.isArray(historicalDataObj.results)) {
-                     console.error("Respuesta histórica inesperada:", historicalDataObj);
-                     throw new Error('La respuesta de datos históricos no tiene el formato esperado.');
-                 }
-                const historicalRaw: HistoricalDemandPoint[] = historicalDataObj.results;
                 if (!Array.isArray(predictionsRaw)) {
                      console.error("Respuesta de predicciones inesperada:", predictionsRaw);
                      throw new Error('La respuesta de datos de predicciones no es un array.');